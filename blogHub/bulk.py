@@ -0,0 +1,106 @@
+import json
+
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def parse_ndjson(lines):
+    """Yield (line number, row or None, error or None) for every non-empty line."""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+
+
+def rows_from_request(request):
+    """Rows of an NDJSON body or a JSON list, None for any other body."""
+    if request.content_type.startswith('application/x-ndjson'):
+        return parse_ndjson(request.body.decode('utf-8').splitlines())
+    if isinstance(request.data, list):
+        return request.data
+    return None
+
+
+def rows_from_file(path):
+    """Rows of a JSON list or NDJSON file, for the management commands."""
+    try:
+        with open(path, encoding='utf-8') as handle:
+            text = handle.read()
+    except OSError as e:
+        raise CommandError(e)
+
+    if not text.lstrip().startswith('['):
+        return parse_ndjson(text.splitlines())
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise CommandError(f"Invalid JSON: {e}")
+
+
+def number_rows(rows, errors, normalize=None):
+    """
+    Pair every row with its row number. ``rows`` may contain parse_ndjson's
+    tuples: their line number is kept and parse failures go to ``errors``.
+    """
+    numbered = []
+    for number, row in enumerate(rows, start=1):
+        if isinstance(row, tuple):
+            number, row, error = row
+            if error:
+                errors.append({'row': number, 'errors': {'row': error}})
+                continue
+        numbered.append((number, normalize(row) if normalize else row))
+    return numbered
+
+
+def select_valid(numbered, validate, errors, unique, taken, duplicate_error):
+    """
+    Keep the rows passing ``validate`` whose ``unique`` field is not in
+    ``taken``; the others go to ``errors``. Returns the valid rows and the
+    duplicate values.
+    """
+    valid, duplicates = [], set()
+    for number, row in numbered:
+        row_errors = validate(row)
+        if not row_errors and row[unique] in taken:
+            row_errors = {unique: duplicate_error}
+            duplicates.add(row[unique])
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        taken.add(row[unique])  # Duplicates inside the import itself
+        valid.append((number, row))
+    return valid, duplicates
+
+
+def create_in_chunks(valid, create_chunk, errors, chunk_size):
+    """
+    Call ``create_chunk`` (which must write in a single transaction) on
+    ``chunk_size`` rows at a time. Returns the number created and sorts
+    ``errors``, which gains the rows of every chunk rolled back.
+    """
+    created = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            created += len(create_chunk([row for _, row in chunk]))
+        except IntegrityError as e:
+            # e.g. a unique value written concurrently; the whole chunk was rolled back
+            errors += [{'row': number, 'errors': {'row': f"Chunk rolled back: {e}"}} for number, _ in chunk]
+    errors.sort(key=lambda error: error['row'])
+    return created
+
+
+def report_response(report):
+    return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
+
+
+def write_errors(command, report):
+    for error in report['errors']:
+        command.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
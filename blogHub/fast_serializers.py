@@ -0,0 +1,139 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# Field types whose to_representation returns a value read from the database unchanged
+# (a ChoiceField maps str(value) back to the very same choice key)
+PASSTHROUGH_FIELDS = (drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField,
+                      drf_fields.ChoiceField, drf_fields.ReadOnlyField)
+
+
+def _datetime_converter():
+    """DateTimeField.to_representation for the default ISO 8601 output, minus the per-row field lookups."""
+    field = drf_fields.DateTimeField()
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() != drf_fields.ISO_8601:
+        return field.to_representation
+    enforce_timezone = field.enforce_timezone
+
+    def convert(value):
+        if not value:
+            return None
+        if isinstance(value, str):
+            return value
+        value = enforce_timezone(value).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+class FastSerializer:
+    """
+    Read-only, serializer-free stand-in for ``serializer_class(rows, many=True).data``.
+
+    The ModelSerializer's fields are compiled once into column names and
+    converters; rows are plain ``.values()`` dicts and each nested
+    ``many=True`` relation is filled from one query grouped by parent id.
+    The output is identical to the ModelSerializer's. Anything that cannot
+    be compiled (method fields, dotted sources...) raises ImproperlyConfigured.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.pk_name = self.model._meta.pk.attname
+        self._compiled = None
+
+    # Compilation ---------------------------------------------------------
+
+    def compile(self):
+        """Return ``(columns, nested)``: ``[(name, converter or None)]`` and ``{name: (model, query name, columns)}``."""
+        if self._compiled is None:
+            columns, nested = [], {}
+            for name, field in self.serializer_class().fields.items():
+                if isinstance(field, serializers.ListSerializer):
+                    nested[name] = self._compile_nested(field)
+                    columns.append((name, None))
+                else:
+                    columns.append((name, self._compile_field(field)))
+            self._compiled = columns, nested
+        return self._compiled
+
+    def _unsupported(self, field, reason):
+        return ImproperlyConfigured(f"{self.serializer_class.__name__}.{field.field_name}: {reason}")
+
+    def _compile_field(self, field):
+        if field.source != field.field_name:
+            raise self._unsupported(field, "only plain model fields can be compiled")
+        if isinstance(field, drf_fields.DateTimeField):
+            return _datetime_converter()
+        if isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        raise self._unsupported(field, f"{type(field).__name__} is not supported")
+
+    def _compile_nested(self, list_field):
+        relation = self.model._meta.get_field(list_field.source)
+        child_columns, child_nested = FastSerializer(type(list_field.child)).compile()
+        if child_nested or not relation.many_to_many:
+            raise self._unsupported(list_field, "only a flat many-to-many relation can be compiled")
+        return relation.related_model, relation.related_query_name(), child_columns
+
+    # Serialization -------------------------------------------------------
+
+    def values(self, queryset, *extra):
+        """``queryset.values()`` with the columns the output needs plus ``extra`` ones, e.g. ordering keys."""
+        columns, nested = self.compile()
+        names = [name for name, _ in columns if name not in nested]
+        return queryset.values(*dict.fromkeys(names + [self.pk_name, *extra]))
+
+    def nested_queries(self, rows):
+        """Yield ``(name, child columns, queryset of (parent id, values...))`` per nested relation."""
+        _, nested = self.compile()
+        ids = [row[self.pk_name] for row in rows]
+        for name, (related_model, query_name, child_columns) in nested.items():
+            queryset = (related_model.objects.filter(**{f'{query_name}__in': ids})
+                        .values_list(query_name, *[column for column, _ in child_columns]))
+            yield name, child_columns, queryset
+
+    @staticmethod
+    def group(child_columns, tuples):
+        grouped = {}
+        for parent_id, *values in tuples:
+            grouped.setdefault(parent_id, []).append({
+                column: value if converter is None else converter(value)
+                for (column, converter), value in zip(child_columns, values)
+            })
+        return grouped
+
+    def to_representation(self, rows, related):
+        columns, _ = self.compile()
+        data = []
+        for row in rows:
+            item = {}
+            for name, converter in columns:
+                if name in related:
+                    item[name] = related[name].get(row[self.pk_name], [])
+                elif converter is None:
+                    item[name] = row[name]
+                else:
+                    item[name] = converter(row[name])
+            data.append(item)
+        return data
+
+    def serialize(self, rows):
+        rows = list(rows)
+        related = {}
+        if rows:
+            for name, child_columns, queryset in self.nested_queries(rows):
+                related[name] = self.group(child_columns, queryset)
+        return self.to_representation(rows, related)
+
+    async def aserialize(self, rows):
+        rows = list(rows)
+        related = {}
+        if rows:
+            for name, child_columns, queryset in self.nested_queries(rows):
+                related[name] = self.group(child_columns, [values async for values in queryset])
+        return self.to_representation(rows, related)
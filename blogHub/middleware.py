@@ -0,0 +1,71 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('blogHub.queries')
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that counts and times every query."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Statements run more than once, the usual signature of an N+1."""
+        return {sql: hits for sql, hits in self.statements.items() if hits > 1}
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the number of queries, total DB time and duplicated SQL of each
+    request, reports them in ``X-DB-*`` response headers and logs them as a
+    single JSON line on the ``blogHub.queries`` logger.
+
+    Disabled unless ``QUERY_INSTRUMENTATION`` is set to True in settings.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        duplicates = recorder.duplicates
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f'{recorder.duration * 1000:.2f}'
+        response['X-DB-Duplicate-Queries'] = str(sum(duplicates.values()) - len(duplicates))
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_time_ms': round(recorder.duration * 1000, 2),
+            'duplicates': [{'sql': sql, 'count': hits} for sql, hits in duplicates.items()],
+        }))
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -62,6 +63,7 @@ INSTALLED_APPS += [
 ]
 
 MIDDLEWARE = [
+    'blogHub.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +74,9 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Per-request query count / DB time / duplicate SQL reporting (X-DB-* headers)
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', 'False') == 'True'
+
 ROOT_URLCONF = 'blogHub.urls'
 
 TEMPLATES = [
@@ -120,7 +125,7 @@ AUTH_USER_MODEL = 'user.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.JWTAuthentication',  # simplejwt's, plus an async path
         # 'rest_framework.authentication.SessionAuthentication',  # Optional
     ],
 }
@@ -152,8 +157,6 @@ SIMPLE_JWT = {
 }
 
 
-import os
-
 SOCIALACCOUNT_PROVIDERS = {
     'google': {
         'APP': {
@@ -226,6 +229,40 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
         'LOCATION': '/var/tmp/django_cache',
-    }
+    },
+    # The throttle counters: an atomic incr, and nothing else in there to cull them. Set
+    # THROTTLE_REDIS_URL when running several workers so they share one count.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('THROTTLE_REDIS_URL'),
+    } if os.getenv('THROTTLE_REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+        'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+    },
 }
 
+
+# Counter engine behind core.throttling.BlogAccessThrottle. 'cache' counts in the
+# CACHE_ALIAS cache, which must have an atomic incr (Redis, Memcached or LocMemCache;
+# checked at startup); 'local' keeps the counters in each worker's memory.
+BLOG_ACCESS_THROTTLE = {
+    'BACKEND': 'cache',
+    'CACHE_ALIAS': 'throttle',
+    'WINDOW': 'fixed',  # or 'sliding'
+}
+
+# Write-behind buffer of core.write_buffer for the like / follow toggles. Every worker
+# writes its buffered toggles in bulk each FLUSH_INTERVAL seconds, whenever MAX_PENDING
+# are waiting, and when it exits.
+WRITE_BUFFER = {
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_PENDING': 1000,
+}
+
+# Database job queue of core.jobs, run by `manage.py run_jobs` (start one or more workers
+# next to the web processes). Failed jobs are retried with exponential backoff.
+JOB_QUEUE = {
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 5,
+}
@@ -1,7 +1,232 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .fast_serializers import FastSerializer
+
+
+class KeysetPagination:
+    """
+    Cursor (keyset) pagination over a composite, unique ordering such as
+    ``('-created_at', '-id')``.
+
+    Every page is fetched with a ``WHERE (created_at, id) < (...)`` style
+    filter instead of an OFFSET, so page N costs the same as page 1 and no
+    COUNT(*) is issued unless the client asks for a total.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    total_query_param = 'with_total'
+    total_cache_timeout = 60
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, page_size=10, max_page_size=None):
+        self.ordering = tuple(ordering)
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+        self.page_size = page_size
+        self.max_page_size = max_page_size or page_size
+
+    # Cursor tokens -------------------------------------------------------
+
+    def encode_cursor(self, position, reverse=False):
+        values = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in position]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model=None):
+        """
+        The (position, reverse) of the request's cursor. With ``model``, each
+        value is converted by its field, so a tampered cursor is a 404 rather
+        than a database error.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        if model is not None:
+            try:
+                position = [self.to_python(model, name, value) for (name, _), value in zip(self.fields, position)]
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value  # An annotation; the database compares it as given
+        if value is None and not field.null:
+            raise ValidationError('null')
+        return field.to_python(value)
+
+    # Queryset handling ---------------------------------------------------
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def keyset_filter(self, position, reverse):
+        """Build ``(a, b) < (x, y)`` as ``a < x OR (a = x AND b < y)``."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.fields, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(name if descending else f'-{name}' for name, descending in self.fields)
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Return the sliced queryset for the requested page. Evaluating it is
+        left to the caller, so the same logic serves sync and async views.
+        """
+        self.request = request
+        self.base_queryset = queryset
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+        self.current_page_size = self.get_page_size(request)
+
+        if self.position is not None:
+            queryset = queryset.filter(self.keyset_filter(self.position, self.reverse))
+        return queryset.order_by(*self.get_ordering(self.reverse))[:self.current_page_size + 1]
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.fields]
+        return [getattr(row, name) for name, _ in self.fields]
+
+    def finish_page(self, rows):
+        """Trim the look-ahead row and work out the neighbouring cursors."""
+        rows = list(rows)
+        has_more = len(rows) > self.current_page_size
+        rows = rows[:self.current_page_size]
+        if self.reverse:
+            rows.reverse()
+            has_next, has_previous = self.position is not None, has_more
+        else:
+            has_next, has_previous = has_more, self.position is not None
+
+        self.next_cursor = self.encode_cursor(self.get_position(rows[-1])) if has_next and rows else None
+        self.previous_cursor = self.encode_cursor(self.get_position(rows[0]), reverse=True) if has_previous and rows else None
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request):
+        return self.finish_page(self.get_page_queryset(queryset, request))
+
+    def paginate_list(self, rows, request):
+        """
+        paginate_queryset for an in-memory list of dicts already sorted by the
+        ordering, e.g. a per-worker cache. Cursor values must survive JSON
+        unchanged (ids, strings), as they are compared as decoded.
+        """
+        self.request = request
+        self.base_queryset = None
+        self.list_total = len(rows)
+        self.position, self.reverse = self.decode_cursor(request)
+        self.current_page_size = self.get_page_size(request)
+
+        if self.reverse:
+            rows = rows[::-1]
+        if self.position is not None:
+            try:
+                rows = [row for row in rows if self.is_after_position(row)]
+            except TypeError:  # A value of the wrong type in a tampered cursor
+                raise NotFound(self.invalid_cursor_message)
+        return self.finish_page(rows[:self.current_page_size + 1])
+
+    def is_after_position(self, row):
+        """In-memory keyset_filter: does ``row`` come after the cursor position?"""
+        for (name, descending), value in zip(self.fields, self.position):
+            if row[name] != value:
+                return row[name] < value if descending != self.reverse else row[name] > value
+        return False
 
-def get_paginated_response(request, page_size, queryset, serializer_class, page_number=1):
+    async def apaginate_queryset(self, queryset, request):
+        return self.finish_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    # Response ------------------------------------------------------------
+
+    def wants_total(self):
+        return self.request.query_params.get(self.total_query_param) in ('1', 'true', 'True')
+
+    def get_approximate_total(self):
+        """
+        COUNT(*) of the unpaginated queryset, cached for a short while so that
+        clients polling the total do not pay for a full count on every page.
+        """
+        if self.base_queryset is None:
+            return self.list_total
+        cache_key = 'keyset_total_' + hashlib.md5(str(self.base_queryset.query).encode()).hexdigest()
+        total = cache.get(cache_key)
+        if total is None:
+            total = self.base_queryset.count()
+            cache.set(cache_key, total, timeout=self.total_cache_timeout)
+        return total
+
+    async def aget_approximate_total(self):
+        if self.base_queryset is None:
+            return self.list_total
+        cache_key = 'keyset_total_' + hashlib.md5(str(self.base_queryset.query).encode()).hexdigest()
+        total = await cache.aget(cache_key)
+        if total is None:
+            total = await self.base_queryset.acount()
+            await cache.aset(cache_key, total, timeout=self.total_cache_timeout)
+        return total
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_data(self, data, total=None):
+        payload = OrderedDict([
+            ('next', self.get_link(self.next_cursor)),
+            ('previous', self.get_link(self.previous_cursor)),
+        ])
+        if total is not None:
+            payload['count'] = total
+        payload['results'] = data
+        return payload
+
+    def get_paginated_response(self, data):
+        total = self.get_approximate_total() if self.wants_total() else None
+        return Response(self.get_paginated_data(data, total))
+
+    async def aget_paginated_response(self, data):
+        total = await self.aget_approximate_total() if self.wants_total() else None
+        return Response(self.get_paginated_data(data, total))
+
+
+def get_paginated_response(request, page_size, queryset, serializer_class, page_number=1, ordering=None,
+                           max_page_size=None):
     """
     Utility function to paginate a queryset and return a paginated response.
 
@@ -9,25 +234,81 @@ def get_paginated_response(request, page_size, queryset, serializer_class, page_
         request: The current HTTP request object.
         page_size: The number of items per page.
         queryset: The queryset to paginate.
-        serializer_class: The serializer class for serializing the data.
-        page_number (int, optional): The page number to retrieve. Defaults to 1.
+        serializer_class: The serializer class for serializing the data, or a FastSerializer
+            wrapping one, in which case the page is read with .values() instead of model instances.
+        page_number (int, optional): The page number used when the client does not send one. Defaults to 1.
+        ordering (tuple, optional): A unique ordering such as ('-created_at', '-id'). When given, the
+            queryset is paginated with opaque cursors instead of page numbers.
+        max_page_size (int, optional): Upper bound for a client supplied ?page_size= in cursor mode.
 
     Returns:
         Response: A DRF Response object containing paginated data and metadata.
     """
-    paginator = PageNumberPagination()
-    paginator.page_size = page_size
+    if ordering:
+        paginator = KeysetPagination(ordering, page_size=page_size, max_page_size=max_page_size)
+    else:
+        paginator = PageNumberPagination()
+        paginator.page_size = page_size
 
-    # Set the current page number in the request
-    request.query_params._mutable = True  # Allow modification of query_params
-    request.query_params['page'] = page_number
-    request.query_params._mutable = False  # Make it immutable again
+        # Only fall back to the default page number if the client did not ask for one
+        if paginator.page_query_param not in request.query_params:
+            request.query_params._mutable = True  # Allow modification of query_params
+            request.query_params[paginator.page_query_param] = page_number
+            request.query_params._mutable = False  # Make it immutable again
+
+    if isinstance(serializer_class, FastSerializer):
+        ordering_fields = [name for name, _ in paginator.fields] if ordering else []
+        rows = paginator.paginate_queryset(serializer_class.values(queryset, *ordering_fields), request)
+        return paginator.get_paginated_response(serializer_class.serialize(rows))
 
     # Paginate the queryset
     paginated_queryset = paginator.paginate_queryset(queryset, request)
-    
+
     # Serialize the paginated data
     serializer = serializer_class(paginated_queryset, many=True)
 
     # Return the paginated response
     return paginator.get_paginated_response(serializer.data)
+
+
+async def aget_paginated_response(request, page_size, queryset, serializer_class, ordering, max_page_size=None):
+    """
+    Async get_paginated_response for AsyncAPIView handlers. Cursor mode only:
+    the queryset must be fully loaded (prefetches included) by the async
+    iteration, as the serializer runs on the event loop.
+    """
+    paginator = KeysetPagination(ordering, page_size=page_size, max_page_size=max_page_size)
+    if isinstance(serializer_class, FastSerializer):
+        values = serializer_class.values(queryset, *[name for name, _ in paginator.fields])
+        rows = await paginator.apaginate_queryset(values, request)
+        return await paginator.aget_paginated_response(await serializer_class.aserialize(rows))
+
+    paginated_queryset = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(paginated_queryset, many=True)
+    return await paginator.aget_paginated_response(serializer.data)
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """
+    Answer If-None-Match / If-Modified-Since from precomputed validators.
+
+    Returns a 304 (or 412) response when the client's copy is still current and
+    None otherwise, so views can call this before loading or serializing rows.
+    """
+    response = get_conditional_response(
+        request,
+        etag=f'"{etag}"' if etag else None,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Attach the ETag / Last-Modified headers used by not_modified_response."""
+    if etag:
+        response['ETag'] = f'"{etag}"'
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        import core.signals
+        from core.throttling import get_counter_backend
+        get_counter_backend()  # A throttle cache without an atomic incr fails at startup
@@ -0,0 +1,357 @@
+"""
+End-to-end load benchmark: drives the API over HTTP at several concurrency
+levels and reports throughput, latency percentiles and queries per request.
+
+The runner prepares its fixtures (tokens, slugs, rows to delete) straight
+from this project's database, so it must point at a server using the same
+database, e.g. one filled by ``manage.py seed_data``. Queries per request
+are read from the ``X-DB-Query-Count`` header, which the server only sends
+with ``QUERY_INSTRUMENTATION=True``.
+"""
+import itertools
+import math
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.urls import reverse
+from django.utils import timezone
+
+from user.authentication import ClaimsRefreshToken
+from user.models import CustomUser
+from .models import BlogModel, CategoryModel, FollowModel
+from .seeding import SEED_PASSWORD, seed_email
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    rank = min(max(math.ceil(fraction * len(ordered)) - 1, 0), len(ordered) - 1)
+    return ordered[rank]
+
+
+def summarize(samples, elapsed):
+    """Aggregate (status, seconds, queries or None) samples of one scenario run."""
+    latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    statuses = {}
+    for status, _, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for status, _, _ in samples if status >= 400),
+        'statuses': statuses,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 2) if latencies else None,
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """
+    List the regressions of ``current`` against ``baseline`` (both benchmark
+    reports): p95 latency or throughput worse by more than ``tolerance``, or
+    more queries per request at all.
+    """
+    regressions = []
+    for name, levels in current['scenarios'].items():
+        for level, stats in levels.items():
+            before = baseline.get('scenarios', {}).get(name, {}).get(level)
+            if not before:
+                continue
+            old_p95, new_p95 = before['latency_ms']['p95'], stats['latency_ms']['p95']
+            if old_p95 and new_p95 and new_p95 > old_p95 * (1 + tolerance):
+                regressions.append(f"{name} {level}: p95 {old_p95}ms -> {new_p95}ms")
+            old_rps, new_rps = before['throughput_rps'], stats['throughput_rps']
+            if old_rps and new_rps and new_rps < old_rps * (1 - tolerance):
+                regressions.append(f"{name} {level}: throughput {old_rps} -> {new_rps} req/s")
+            old_queries = before['queries_per_request']['max']
+            new_queries = stats['queries_per_request']['max']
+            if old_queries is not None and new_queries is not None and new_queries > old_queries:
+                regressions.append(f"{name} {level}: queries per request {old_queries} -> {new_queries}")
+    return regressions
+
+
+# Scenarios -----------------------------------------------------------------
+
+class Scenario:
+    """
+    One route under load. ``build(fixtures, i, item)`` returns the i-th
+    request as ``(method, path, requests kwargs)``; ``prepare(fixtures, total)``
+    optionally creates one item per request (a row to delete, a refresh
+    token...) before timing starts.
+    """
+
+    def __init__(self, name, build, prepare=None):
+        self.name = name
+        self.build = build
+        self.prepare = prepare
+
+    def items(self, fixtures, total):
+        return self.prepare(fixtures, total) if self.prepare else [None] * total
+
+    def label(self, i):
+        """Name the i-th request is reported under."""
+        return self.name
+
+
+class MixedScenario:
+    """
+    Several scenarios interleaved in one run, ``weight`` requests of each
+    per round, e.g. a login storm next to blog reads. Each part is reported
+    on its own as ``name.part``, its throughput measured over the whole run.
+    """
+
+    def __init__(self, name, parts):
+        self.name = name
+        self.pattern = [scenario for scenario, weight in parts for _ in range(weight)]
+
+    def part(self, i):
+        return self.pattern[i % len(self.pattern)]
+
+    def items(self, fixtures, total):
+        positions = {}
+        for i in range(total):
+            positions.setdefault(self.part(i), []).append(i)
+        items = [None] * total
+        for scenario, indexes in positions.items():
+            for i, item in zip(indexes, scenario.items(fixtures, len(indexes))):
+                items[i] = item
+        return items
+
+    def build(self, fixtures, i, item):
+        return self.part(i).build(fixtures, i, item)
+
+    def label(self, i):
+        return f'{self.name}.{self.part(i).name}'
+
+
+SEARCH_QUERIES = ['python', 'cache query', 'async worker']
+
+
+def _auth(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+class Fixtures:
+    """Tokens and ids of seeded rows shared by every scenario."""
+
+    def __init__(self, prefix='bench', run_id=None):
+        self.prefix = prefix
+        self.run_id = run_id or str(int(time.time()))
+        self.admin = CustomUser.objects.filter(email=seed_email(prefix, 'admin')).first()
+        self.author = CustomUser.objects.filter(email__startswith=f'{prefix}-author-').order_by('id').first()
+        readers = CustomUser.objects.filter(email__startswith=f'{prefix}-reader-').order_by('id')
+        # A reader with a non-empty timeline, and a paid one who is never throttled
+        self.reader = readers.filter(id__in=FollowModel.objects.values('follower_id')).first() or readers.first()
+        self.paid_reader = readers.filter(profile__is_paid=True).first() or self.admin
+        if None in (self.admin, self.author, self.reader):
+            raise ValueError(f"No seeded users with the prefix '{prefix}'; run seed_data first")
+
+        self.tokens = {user.pk: str(ClaimsRefreshToken.for_user(user).access_token)
+                       for user in (self.admin, self.author, self.reader, self.paid_reader)}
+        published = BlogModel.objects.filter(status=1, title__startswith=f'{prefix} ')
+        self.slugs = list(published.values_list('slug', flat=True)[:200])
+        self.blog_ids = list(BlogModel.objects.filter(author=self.author).values_list('id', flat=True)[:50])
+        self.categories = list(CategoryModel.objects.filter(name__startswith=f'{prefix}-')
+                               .values_list('name', flat=True)[:5])
+        if not self.slugs or not self.blog_ids:
+            raise ValueError("The seeded authors have no blogs; run seed_data with --blogs-per-author")
+
+    def token(self, user):
+        return self.tokens[user.pk]
+
+
+def _blogs_to_delete(fixtures, total):
+    titles = [f'{fixtures.prefix} delete {fixtures.run_id}-{i}' for i in range(total)]
+    BlogModel.objects.bulk_create([BlogModel(title=title, slug=f'{fixtures.prefix}-delete-{fixtures.run_id}-{i}',
+                                             content='benchmark', author=fixtures.author)
+                                   for i, title in enumerate(titles)])
+    return list(BlogModel.objects.filter(title__in=titles).values_list('id', flat=True))
+
+
+def _categories_to_delete(fixtures, total):
+    names = [f'{fixtures.prefix}-delete-{fixtures.run_id}-{i}' for i in range(total)]
+    CategoryModel.objects.bulk_create([CategoryModel(name=name, slug=name) for name in names])
+    return list(CategoryModel.objects.filter(name__in=names).values_list('id', flat=True))
+
+
+def _refresh_tokens(fixtures, total):
+    return [str(ClaimsRefreshToken.for_user(fixtures.reader)) for _ in range(total)]
+
+
+def _blog_payload(f, i):
+    return {
+        'blog_data': {'title': f'{f.prefix} created {f.run_id}-{i}', 'content': 'benchmark ' * 300, 'status': 1},
+        'category': f.categories[:2],
+        'tags': [f'{f.prefix}-tag-{i % 10}'],
+        'author': {'author_id': f.author.pk},
+    }
+
+
+def _import_payload(f, i, rows=10):
+    return [{'title': f'{f.prefix} imported {f.run_id}-{i}-{n}', 'content': 'benchmark ' * 300,
+             'status': 1, 'category': f.categories[:1]} for n in range(rows)]
+
+
+def _provision_payload(f, i, rows=10):
+    return [{'email': f'{f.prefix}-provisioned-{f.run_id}-{i}-{n}@bloghub.test', 'user_type': 'reader'}
+            for n in range(rows)]
+
+
+def default_scenarios():
+    """Every route of core/urls.py and user/urls.py, then logins mixed with reads."""
+    scenarios = [
+        # core
+        Scenario('category_list', lambda f, i, _: (
+            'get', reverse('category_api'), {'headers': _auth(f.token(f.reader))})),
+        Scenario('category_create', lambda f, i, _: (
+            'post', reverse('category_api'), {'headers': _auth(f.token(f.admin)),
+                                              'json': {'name': f'{f.prefix}-new-{f.run_id}-{i}'}})),
+        Scenario('category_delete', lambda f, i, category_id: (
+            'delete', reverse('category_api'), {'headers': _auth(f.token(f.admin)),
+                                                'params': {'category_id': category_id}}),
+                 prepare=_categories_to_delete),
+        Scenario('author_blogs', lambda f, i, _: (
+            'get', reverse('get_all_blogs'), {'headers': _auth(f.token(f.author))})),
+        Scenario('public_feed', lambda f, i, _: (
+            'get', reverse('public_blogs'), {'headers': _auth(f.token(f.paid_reader))})),
+        Scenario('search', lambda f, i, _: (
+            'get', reverse('search_blogs'), {'params': {'q': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]}})),
+        Scenario('trending', lambda f, i, _: (
+            'get', reverse('trending_blogs'), {})),
+        Scenario('tag_autocomplete', lambda f, i, _: (
+            'get', reverse('tag_autocomplete'), {'headers': _auth(f.token(f.author)),
+                                                 'params': {'q': f'{f.prefix}-tag-{i % 10}'[:len(f.prefix) + 1 + i % 6]}})),
+        Scenario('timeline', lambda f, i, _: (
+            'get', reverse('timeline'), {'headers': _auth(f.token(f.reader))})),
+        Scenario('blog_detail', lambda f, i, _: (
+            'get', reverse('get_single_blog', args=[f.slugs[i % len(f.slugs)]]),
+            {'headers': _auth(f.token(f.paid_reader))})),
+        Scenario('related_blogs', lambda f, i, _: (
+            'get', reverse('related_blogs', args=[f.slugs[i % len(f.slugs)]]), {})),
+        Scenario('like_toggle', lambda f, i, _: (
+            'post', reverse('toggle_like', args=[f.slugs[i % len(f.slugs)]]), {'headers': _auth(f.token(f.reader))})),
+        Scenario('follow_toggle', lambda f, i, _: (
+            'post', reverse('toggle_follow', args=[f.author.pk]), {'headers': _auth(f.token(f.reader))})),
+        Scenario('blog_create', lambda f, i, _: (
+            'post', reverse('create_blog'), {'headers': _auth(f.token(f.author)), 'json': _blog_payload(f, i)})),
+        Scenario('blog_import', lambda f, i, _: (
+            'post', reverse('import_blogs'), {'headers': _auth(f.token(f.admin)), 'params': {'author_id': f.author.pk},
+                                              'json': _import_payload(f, i)})),
+        Scenario('blog_status', lambda f, i, _: (
+            'patch', reverse('change_blog_status'), {'headers': _auth(f.token(f.author)),
+                                                     'json': {'blog_id': f.blog_ids[i % len(f.blog_ids)],
+                                                              'status': i % 2}})),
+        Scenario('blog_delete', lambda f, i, blog_id: (
+            'delete', reverse('delete_blog'), {'headers': _auth(f.token(f.author)), 'json': {'blog_id': blog_id}}),
+                 prepare=_blogs_to_delete),
+        # user
+        Scenario('signup', lambda f, i, _: (
+            'post', reverse('signup'), {'json': {'username': f'signup-{f.run_id}-{i}',
+                                                 'email': f'{f.prefix}-signup-{f.run_id}-{i}@bloghub.test',
+                                                 'password': SEED_PASSWORD}})),
+        Scenario('login', lambda f, i, _: (
+            'post', reverse('login'), {'json': {'email': f.reader.email, 'password': SEED_PASSWORD}})),
+        Scenario('token_refresh', lambda f, i, refresh: (
+            'post', reverse('token_refresh'), {'json': {'refresh': refresh}}),
+                 prepare=_refresh_tokens),
+        Scenario('logout', lambda f, i, refresh: (
+            'post', reverse('logout'), {'headers': _auth(f.token(f.reader)), 'json': {'refresh': refresh}}),
+                 prepare=_refresh_tokens),
+        Scenario('userinfo', lambda f, i, _: (
+            'get', reverse('userinfo'), {'headers': _auth(f.token(f.reader))})),
+        Scenario('user_provision', lambda f, i, _: (
+            'post', reverse('provision_users'), {'headers': _auth(f.token(f.admin)), 'json': _provision_payload(f, i)})),
+    ]
+    by_name = {scenario.name: scenario for scenario in scenarios}
+    # Login throughput next to read latency: hashing must not starve the readers
+    scenarios.append(MixedScenario('login_storm', [(by_name['login'], 1), (by_name['blog_detail'], 1),
+                                                   (by_name['public_feed'], 1)]))
+    return scenarios
+
+
+# Runner --------------------------------------------------------------------
+
+class BenchmarkRunner:
+    """Fires ``requests`` requests per scenario and concurrency level from a thread pool."""
+
+    def __init__(self, base_url, scenarios, concurrency=(1, 8, 32), requests=200, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.scenarios = scenarios
+        self.concurrency = concurrency
+        self.requests = requests
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def session(self):
+        # One keep-alive connection per worker thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def send(self, method, path, kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session().request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            # Reported as status 599: no response at all (refused, reset or timed out)
+            return 599, time.perf_counter() - start, None
+        seconds = time.perf_counter() - start
+        queries = response.headers.get('X-DB-Query-Count')
+        return response.status_code, seconds, int(queries) if queries is not None else None
+
+    def run_level(self, scenario, fixtures, items, concurrency, offset):
+        """Return ``{label: stats}``; a plain scenario has the one label."""
+        indexes = range(offset, offset + self.requests)
+        calls = [scenario.build(fixtures, i, items[i]) for i in indexes]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(lambda call: self.send(*call), calls))
+        elapsed = time.perf_counter() - start
+        by_label = {}
+        for i, sample in zip(indexes, samples):
+            by_label.setdefault(scenario.label(i), []).append(sample)
+        return {label: summarize(group, elapsed) for label, group in by_label.items()}
+
+    def run(self, fixtures, progress=None):
+        started_at = timezone.now().isoformat()
+        results = {}
+        for scenario in self.scenarios:
+            # Items for every level at once, so nothing is consumed twice
+            items = scenario.items(fixtures, self.requests * len(self.concurrency))
+            offsets = itertools.count(0, self.requests)
+            for concurrency in self.concurrency:
+                for label, stats in self.run_level(scenario, fixtures, items, concurrency, next(offsets)).items():
+                    results.setdefault(label, {})[f'c{concurrency}'] = stats
+                    if progress:
+                        progress(label, concurrency, stats)
+        return {
+            'meta': {
+                'commit': git_commit(),
+                'base_url': self.base_url,
+                'requests_per_level': self.requests,
+                'concurrency': list(self.concurrency),
+                'started_at': started_at,
+            },
+            'scenarios': results,
+        }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,138 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from blogHub.bulk import create_in_chunks, number_rows, select_valid
+from user.models import CustomUser
+from . import related, search
+from .caching import bump_blog_list, bump_category_list, bump_tag_index
+from .content import render_content
+from .directory import category_directory
+from .models import BlogModel, CategoryModel, TagsModel, unique_slugs
+
+IMPORT_CHUNK_SIZE = 500
+TITLE_MAX_LENGTH = BlogModel._meta.get_field('title').max_length
+STATUSES = dict(BlogModel.STATUS)
+
+
+def resolve_tags(names):
+    """
+    Map tag names (lower-cased) to ids, creating the missing ones.
+    Costs two queries for existing names plus a bulk INSERT when some are new,
+    instead of a get_or_create per tag.
+    """
+    names = {name.lower() for name in names if name}
+    if not names:
+        return {}
+    tags = dict(TagsModel.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - tags.keys()
+    if missing:
+        # ignore_conflicts: another request may create the same tag concurrently
+        TagsModel.objects.bulk_create([TagsModel(name=name) for name in missing], ignore_conflicts=True)
+        tags.update(TagsModel.objects.filter(name__in=missing).values_list('name', 'id'))
+        bump_tag_index()  # bulk_create sends no post_save
+    return tags
+
+
+def resolve_categories(names):
+    """Map category names (lower-cased) to ids; unknown categories are ignored as in BlogAPI.post."""
+    return category_directory.resolve(names)
+
+
+def _validate(row, authors, default_author_id):
+    errors = {}
+    if not isinstance(row, dict):
+        return {'row': "Expected an object"}
+
+    title = row.get('title')
+    if not isinstance(title, str) or not title.strip():
+        errors['title'] = "This field is required."
+    elif len(title) > TITLE_MAX_LENGTH:
+        errors['title'] = f"Ensure this field has no more than {TITLE_MAX_LENGTH} characters."
+
+    if not isinstance(row.get('content'), str) or not row['content']:
+        errors['content'] = "This field is required."
+    if row.get('status', 0) not in STATUSES:
+        errors['status'] = f"\"{row.get('status')}\" is not a valid choice."
+
+    author_id = row.get('author_id', default_author_id)
+    if author_id not in authors:
+        errors['author_id'] = "Author not found"
+    for field in ('category', 'tags'):
+        names = row.get(field, [])
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            errors[field] = "Expected a list of names."
+    return errors
+
+
+def _create_chunk(chunk, category_ids, tag_ids):
+    """Insert one chunk of validated rows, their M2M links and counters in a single transaction."""
+    with transaction.atomic():
+        slugs = unique_slugs([row['title'] for row in chunk])
+        blogs = BlogModel.objects.bulk_create([
+            BlogModel(title=row['title'], slug=slug, content=row['content'], **render_content(row['content']),
+                      status=row.get('status', 0), author_id=row['author_id'])
+            for row, slug in zip(chunk, slugs)
+        ])
+
+        BlogCategory = BlogModel.categories.through
+        BlogTag = BlogModel.tags.through
+        category_links, tag_links = [], []
+        for blog, row in zip(blogs, chunk):
+            categories = {category_ids[name.lower()] for name in row.get('category', []) if name.lower() in category_ids}
+            tags = {tag_ids[name.lower()] for name in row.get('tags', []) if name}
+            category_links += [BlogCategory(blogmodel_id=blog.pk, categorymodel_id=pk) for pk in categories]
+            tag_links += [BlogTag(blogmodel_id=blog.pk, tagsmodel_id=pk) for pk in tags]
+        BlogCategory.objects.bulk_create(category_links)
+        BlogTag.objects.bulk_create(tag_links)
+
+        # bulk_create sends no signals and skips save(): keep the denormalized counters, the search index and related blogs in step here
+        per_category = Counter(link.categorymodel_id for link in category_links)
+        for amount, ids in _group_by_amount(per_category).items():
+            CategoryModel.objects.filter(pk__in=ids).update(blog_count=F('blog_count') + amount)
+        search.index_blogs(blogs, new=True)
+        related.refresh_related([blog.pk for blog in blogs if blog.status == 1])
+    return blogs
+
+
+def _group_by_amount(counter):
+    grouped = {}
+    for pk, amount in counter.items():
+        grouped.setdefault(amount, []).append(pk)
+    return grouped
+
+
+def import_blogs(rows, default_author_id=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Bulk-create blogs from dicts shaped like
+    ``{"title", "content", "status", "category": [...], "tags": [...], "author_id"}``.
+
+    ``rows`` may also contain ``(row number, None, error)`` tuples from
+    blogHub.bulk.parse_ndjson so parse failures are reported with the rest. Tag and
+    category names are resolved once for the whole import, and each chunk
+    is written in its own transaction. Returns a report with the number of
+    blogs created and the errors of every rejected row.
+    """
+    errors = []
+    numbered = number_rows(rows, errors)
+
+    candidates = [row for _, row in numbered if isinstance(row, dict)]
+    titles = [row['title'] for row in candidates if isinstance(row.get('title'), str)]
+    taken_titles = set(BlogModel.objects.filter(title__in=titles).values_list('title', flat=True))
+    author_ids = {row.get('author_id', default_author_id) for row in candidates}
+    authors = set(CustomUser.objects.filter(id__in=[pk for pk in author_ids if isinstance(pk, int)])
+                  .values_list('id', flat=True))
+
+    valid, _ = select_valid(numbered, lambda row: _validate(row, authors, default_author_id), errors,
+                            'title', taken_titles, "blog with this title already exists.")
+    valid = [(number, {**row, 'author_id': row.get('author_id', default_author_id)}) for number, row in valid]
+
+    category_ids = resolve_categories(name for _, row in valid for name in row.get('category', []))
+    tag_ids = resolve_tags(name for _, row in valid for name in row.get('tags', []))
+
+    created = create_in_chunks(valid, lambda chunk: _create_chunk(chunk, category_ids, tag_ids), errors, chunk_size)
+    if created:
+        bump_blog_list()
+        bump_category_list()
+    return {'created': created, 'errors': errors}
@@ -0,0 +1,165 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BlogModel
+from .serializers import GetBlogSerializer
+
+BLOG_DETAIL_TIMEOUT = 60 * 60  # one hour
+BLOG_DETAIL_GENERATION_KEY = 'blog_detail_generation'
+BLOG_LIST_VERSION_KEY = 'blog_list_version'
+CATEGORY_LIST_VERSION_KEY = 'category_list_version'
+TAG_INDEX_VERSION_KEY = 'tag_index_version'
+TAG_INDEX_GENERATION_KEY = 'tag_index_generation'
+TRENDING_VERSION_KEY = 'trending_version'
+
+
+def _version_key(slug):
+    return f'blog_detail_version_{slug}'
+
+
+def _detail_key(generation, slug):
+    return f'blog_detail_{generation}_{slug}'
+
+
+def _new_version():
+    # Seeding from the clock means an evicted counter never comes back at an
+    # old value that could still match a stale payload.
+    return time.time_ns() // 1000
+
+
+def get_versions(*keys):
+    """Return the current value of each version counter, creating missing ones."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(*keys):
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _new_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def bump_on_commit(*keys):
+    """
+    Bump the counters once the current transaction commits (at once in
+    autocommit). Bumping earlier would let a concurrent reader cache the
+    old rows under the new version.
+    """
+    transaction.on_commit(lambda: [bump_version(key) for key in keys])
+
+
+def get_detail_versions(slug):
+    """Return (generation, slug version), creating either counter on first use."""
+    return get_versions(BLOG_DETAIL_GENERATION_KEY, _version_key(slug))
+
+
+def bump_blog_detail(*slugs):
+    """Invalidate the cached detail payload of the given slugs."""
+    bump_on_commit(*(_version_key(slug) for slug in filter(None, set(slugs))))
+
+
+def bump_all_blog_details():
+    """Invalidate every cached detail payload, e.g. after a category rename."""
+    bump_on_commit(BLOG_DETAIL_GENERATION_KEY)
+
+
+def bump_blog_list():
+    """Mark every published-feed page as changed (an edit, delete or re-categorisation)."""
+    bump_on_commit(BLOG_LIST_VERSION_KEY)
+
+
+def bump_category_list():
+    """Mark the category list as changed (a rename or a blog_count change)."""
+    bump_on_commit(CATEGORY_LIST_VERSION_KEY)
+
+
+def bump_tag_index(rebuild=False):
+    """New tags were created; with ``rebuild``, tags were renamed or deleted and every worker reloads them all."""
+    bump_on_commit(TAG_INDEX_GENERATION_KEY if rebuild else TAG_INDEX_VERSION_KEY)
+
+
+def bump_trending():
+    """Make every worker reload the trending board now instead of when it ages out."""
+    bump_version(TRENDING_VERSION_KEY)
+
+
+# Validators for conditional GETs. None of them reads blog content, and the
+# detail one is answered from the cache alone.
+
+def _hash_etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+async def ablog_detail_etag(slug):
+    generation, version = await aget_versions(BLOG_DETAIL_GENERATION_KEY, _version_key(slug))
+    return f'{generation}-{version}'
+
+
+async def ablog_list_etag(request):
+    """Every blog save or delete and every re-categorisation bumps the version, so no query is needed."""
+    [version] = await aget_versions(BLOG_LIST_VERSION_KEY)
+    return _hash_etag(version, request.get_full_path())
+
+
+async def acategory_list_etag(request):
+    """Every category write and blog_count change bumps the version, so no query is needed."""
+    [version] = await aget_versions(CATEGORY_LIST_VERSION_KEY)
+    return _hash_etag(version, request.get_full_path())
+
+
+def get_blog_detail(slug):
+    """
+    Read-through cache of the serialized blog detail payload, keyed by slug.
+
+    Returns None when no blog has this slug. Entries are never deleted; a
+    bumped version simply makes the old entry unreachable until it expires.
+    """
+    generation, version = get_detail_versions(slug)
+    key = _detail_key(generation, slug)
+    data = cache.get(key, version=version)
+    if data is not None:
+        return data
+
+    try:
+        blog = BlogModel.objects.prefetch_related('categories', 'tags').get(slug=slug)
+    except BlogModel.DoesNotExist:
+        return None
+
+    data = dict(GetBlogSerializer(blog).data)
+    cache.set(key, data, timeout=BLOG_DETAIL_TIMEOUT, version=version)
+    return data
+
+
+async def aget_blog_detail(slug):
+    """Async get_blog_detail: same keys and payload, async cache and ORM calls."""
+    generation, version = await aget_versions(BLOG_DETAIL_GENERATION_KEY, _version_key(slug))
+    key = _detail_key(generation, slug)
+    data = await cache.aget(key, version=version)
+    if data is not None:
+        return data
+
+    try:
+        blog = await BlogModel.objects.prefetch_related('categories', 'tags').aget(slug=slug)
+    except BlogModel.DoesNotExist:
+        return None
+
+    data = dict(GetBlogSerializer(blog).data)
+    await cache.aset(key, data, timeout=BLOG_DETAIL_TIMEOUT, version=version)
+    return data
@@ -0,0 +1,34 @@
+import math
+import re
+
+from django.utils.html import linebreaks, strip_tags, urlize
+from django.utils.text import Truncator
+
+EXCERPT_WORDS = 40
+EXCERPT_MAX_LENGTH = 500
+WORDS_PER_MINUTE = 200
+
+# Columns of BlogModel derived from content by render_content()
+CONTENT_DERIVED_FIELDS = ('excerpt', 'word_count', 'reading_time', 'content_html')
+# The large columns: list endpoints defer these and show the excerpt instead
+BODY_FIELDS = ('content', 'content_html')
+
+
+def render_content(content):
+    """
+    Everything lists and previews need from a blog body, computed once per
+    save instead of per request: a plain-text excerpt, the word count, the
+    reading time in minutes and the HTML rendering.
+
+    The HTML is safe to embed: the text is escaped, then only paragraph,
+    line break and nofollow link tags are added.
+    """
+    content = content or ''
+    text = re.sub(r'\s+', ' ', strip_tags(content)).strip()
+    word_count = len(text.split())
+    return {
+        'excerpt': Truncator(text).words(EXCERPT_WORDS, truncate='…')[:EXCERPT_MAX_LENGTH],
+        'word_count': word_count,
+        'reading_time': math.ceil(word_count / WORDS_PER_MINUTE) if word_count else 0,
+        'content_html': linebreaks(urlize(content, nofollow=True, autoescape=True)),
+    }
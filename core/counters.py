@@ -0,0 +1,64 @@
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_of(queryset, field):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows whose ``field`` points at the outer row."""
+    counts = (queryset.filter(**{field: OuterRef('pk')})
+              .order_by().values(field).annotate(total=Count('*')).values('total'))
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _update_in_chunks(model, chunk_size, **counters):
+    """Run the recount UPDATE over primary key ranges so no single statement holds a long lock."""
+    last_pk = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last_pk + 1, chunk_size):
+        with transaction.atomic():
+            model.objects.filter(pk__gte=start, pk__lt=start + chunk_size).update(**counters)
+
+
+def recompute_counters(apps=global_apps, chunk_size=1000):
+    """
+    Recompute every denormalized counter from the source tables to repair drift.
+    ``apps`` lets migrations pass their historical app registry.
+    """
+    BlogModel = apps.get_model('core', 'BlogModel')
+    CategoryModel = apps.get_model('core', 'CategoryModel')
+    LikeModel = apps.get_model('core', 'LikeModel')
+    FollowModel = apps.get_model('core', 'FollowModel')
+    Profile = apps.get_model('user', 'Profile')
+    BlogCategory = BlogModel.categories.through
+
+    _update_in_chunks(BlogModel, chunk_size,
+                      like_count=_count_of(LikeModel.objects.all(), 'blog'))
+    _update_in_chunks(CategoryModel, chunk_size,
+                      blog_count=_count_of(BlogCategory.objects.all(), 'categorymodel'))
+
+    followers = FollowModel.objects.filter(author=OuterRef('user')).order_by().values('author')
+    following = FollowModel.objects.filter(follower=OuterRef('user')).order_by().values('follower')
+    _update_in_chunks(
+        Profile, chunk_size,
+        follower_count=Coalesce(Subquery(followers.annotate(total=Count('*')).values('total'),
+                                         output_field=IntegerField()), 0),
+        following_count=Coalesce(Subquery(following.annotate(total=Count('*')).values('total'),
+                                          output_field=IntegerField()), 0),
+    )
+
+
+def apply_counter_deltas(model, field, deltas, key='pk'):
+    """
+    Add ``{key value: amount}`` to ``field`` of ``model``: one
+    ``UPDATE ... SET field = field + amount`` per distinct amount, and a
+    decrement never takes a counter below zero.
+    """
+    by_amount = {}
+    for value, amount in deltas.items():
+        if amount:
+            by_amount.setdefault(amount, []).append(value)
+    for amount, values in by_amount.items():
+        rows = model.objects.filter(**{f'{key}__in': values})
+        if amount < 0:
+            rows = rows.filter(**{f'{field}__gte': -amount})
+        rows.update(**{field: F(field) + amount})
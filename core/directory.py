@@ -0,0 +1,67 @@
+import threading
+import time
+
+from .caching import CATEGORY_LIST_VERSION_KEY, aget_versions, get_versions
+from .models import CategoryModel
+
+# Reload at least this often (seconds), whatever the version says
+DIRECTORY_MAX_AGE = 300
+DIRECTORY_FIELDS = ('id', 'name', 'slug', 'blog_count')
+
+
+class CategoryDirectory:
+    """
+    Every category as ``{id, name, slug, blog_count}`` rows, ordered by id
+    and held in this worker's memory.
+
+    It is reloaded when CATEGORY_LIST_VERSION_KEY moves, which every
+    category write and blog_count change bumps (core.signals, the bulk
+    import, recompute_counters), so a read costs one cache get instead of
+    a query.
+    """
+
+    def __init__(self, max_age=DIRECTORY_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._state = (None, 0, [], {})  # version, loaded at, rows, {name: id}
+
+    def _is_current(self, version):
+        loaded_version, loaded_at, _, _ = self._state
+        return version == loaded_version and time.monotonic() - loaded_at < self.max_age
+
+    def _store(self, version, rows):
+        # The version was read before the rows, so a concurrent bump still triggers a reload
+        state = (version, time.monotonic(), rows, {row['name']: row['id'] for row in rows})
+        with self._lock:
+            self._state = state
+        return state
+
+    def _queryset(self):
+        return CategoryModel.objects.order_by('id').values(*DIRECTORY_FIELDS)
+
+    def _current_state(self):
+        [version] = get_versions(CATEGORY_LIST_VERSION_KEY)
+        if self._is_current(version):
+            return self._state
+        return self._store(version, list(self._queryset()))
+
+    def rows(self):
+        return self._current_state()[2]
+
+    async def arows(self):
+        [version] = await aget_versions(CATEGORY_LIST_VERSION_KEY)
+        if self._is_current(version):
+            return self._state[2]
+        return self._store(version, [row async for row in self._queryset()])[2]
+
+    def resolve(self, names):
+        """Map category names (lower-cased) to ids; unknown names are left out."""
+        by_name = self._current_state()[3]
+        return {name: by_name[name] for name in {name.lower() for name in names if name} if name in by_name}
+
+    def clear(self):
+        with self._lock:
+            self._state = (None, 0, [], {})
+
+
+category_directory = CategoryDirectory()
@@ -0,0 +1,129 @@
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+DEFAULT_JOB_QUEUE_SETTINGS = {
+    'BATCH_SIZE': 10,  # jobs claimed per round trip
+    'POLL_INTERVAL': 1.0,  # seconds a worker sleeps when nothing is ready
+    'MAX_ATTEMPTS': 5,
+    # Retry n waits BACKOFF * 2^(n - 1) seconds, jittered, at most MAX_BACKOFF
+    'BACKOFF': 5,
+    'MAX_BACKOFF': 60 * 60,
+    # A job running for longer than this is taken to belong to a dead worker
+    'LOCK_TIMEOUT': 10 * 60,
+}
+
+_handlers = {}
+
+
+def get_job_queue_settings():
+    return {**DEFAULT_JOB_QUEUE_SETTINGS, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+def job(name):
+    """Register the decorated function as the handler of jobs called ``name``; it gets the payload as kwargs."""
+    def register(handler):
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """
+    Queue a job. The row is written in the caller's transaction, so a job
+    exists exactly when the change that asked for it is committed.
+    """
+    if name not in _handlers:
+        raise ValueError(f"No job handler registered for {name!r}")
+    return Job.objects.create(name=name, payload=payload or {},
+                              run_after=timezone.now() + timedelta(seconds=delay),
+                              max_attempts=max_attempts or get_job_queue_settings()['MAX_ATTEMPTS'])
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_jobs(worker, batch_size, now=None):
+    """
+    Mark up to ``batch_size`` ready jobs as running for ``worker`` and return them.
+
+    On backends with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8,
+    Oracle) concurrent workers skip each other's rows instead of waiting;
+    elsewhere the conditional UPDATE decides which worker got a row, and
+    SQLite serializes the writers anyway.
+    """
+    now = now or timezone.now()
+    claim = f'{worker}:{uuid4().hex[:8]}'
+    with transaction.atomic():
+        ready = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            ready = ready.select_for_update(skip_locked=True)
+        ids = list(ready.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=claim, locked_at=now, attempts=F('attempts') + 1)
+    return list(Job.objects.filter(id__in=ids, locked_by=claim, status=Job.RUNNING).order_by('run_after', 'id'))
+
+
+def requeue_stale_jobs(now=None):
+    """Give the jobs of workers that died mid-run back to the queue; returns how many."""
+    now = now or timezone.now()
+    expired = now - timedelta(seconds=get_job_queue_settings()['LOCK_TIMEOUT'])
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=expired).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, run_after=now)
+
+
+def retry_delay(attempts, config=None):
+    config = config or get_job_queue_settings()
+    delay = min(config['BACKOFF'] * 2 ** (attempts - 1), config['MAX_BACKOFF'])
+    return delay * random.uniform(0.5, 1)  # Jitter keeps retries of one failure from landing together
+
+
+def run_job(claimed):
+    """
+    Run one claimed job. A job that succeeds is deleted; one that fails is
+    queued again after retry_delay() until its attempts run out, then kept
+    as failed with the error for inspection. Returns whether it succeeded.
+    """
+    # Matching the claim leaves alone a job requeued by requeue_stale_jobs() meanwhile
+    ours = Job.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by)
+    try:
+        handler = _handlers[claimed.name]
+        with transaction.atomic():
+            handler(**claimed.payload)
+            # Deleted with the handler's writes, so a crash in between cannot run it twice
+            ours.delete()
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            ours.update(status=Job.FAILED, last_error=error, locked_by='', locked_at=None)
+        else:
+            ours.update(status=Job.QUEUED, last_error=error, locked_by='', locked_at=None,
+                        run_after=timezone.now() + timedelta(seconds=retry_delay(claimed.attempts)))
+        return False
+    return True
+
+
+def run_pending(worker=None, batch_size=None):
+    """Claim and run one batch; returns (succeeded, failed). The worker command calls this in a loop."""
+    config = get_job_queue_settings()
+    requeue_stale_jobs()
+    succeeded = failed = 0
+    for claimed in claim_jobs(worker or worker_name(), batch_size or config['BATCH_SIZE']):
+        if run_job(claimed):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
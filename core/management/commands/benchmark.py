@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import BenchmarkRunner, Fixtures, compare, default_scenarios
+
+
+class Command(BaseCommand):
+    help = ("Load-test every API route at several concurrency levels and write throughput, "
+            "latency percentiles and queries per request as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help="Server to benchmark; it must use this project's database")
+        parser.add_argument('--concurrency', default='1,8,32', help="Comma separated concurrency levels")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario and level")
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help="Only run this scenario (repeatable)")
+        parser.add_argument('--prefix', default='bench', help="Prefix given to seed_data")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+        parser.add_argument('--baseline', help="Fail when regressing against this earlier report")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p95 / throughput change against the baseline (0.2 = 20%%)")
+
+    def handle(self, *args, **options):
+        try:
+            concurrency = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError("--concurrency expects numbers such as 1,8,32")
+
+        scenarios = default_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+
+        try:
+            fixtures = Fixtures(prefix=options['prefix'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        def progress(name, level, stats):
+            self.stderr.write(f"{name:<24} c{level:<4} {stats['throughput_rps']} req/s  "
+                              f"p95 {stats['latency_ms']['p95']}ms  queries {stats['queries_per_request']['max']}  "
+                              f"errors {stats['errors']}")
+
+        runner = BenchmarkRunner(options['base_url'], scenarios, concurrency=concurrency, requests=options['requests'])
+        report = runner.run(fixtures, progress=progress)
+
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read the baseline: {e}")
+            regressions = compare(baseline, report, tolerance=options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+            self.stderr.write(self.style.SUCCESS("No regressions against the baseline"))
@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.models import BlogModel, CategoryModel
+from core.serializers import (FastGetAllBlogSerializer, FastGetCategorySerializer,
+                              GetAllBlogSerializer, GetCategorySerializer)
+
+
+class Command(BaseCommand):
+    help = ("Time the DRF list serializers against their FastSerializer counterparts on large pages, "
+            "queries included, and check both render the same bytes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='100,500,1000', help="Comma separated page sizes")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per page size; the best one is kept")
+        parser.add_argument('--output', help="Also write the results as JSON here")
+
+    def handle(self, *args, **options):
+        try:
+            page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        except ValueError:
+            raise CommandError("--page-sizes expects numbers such as 100,500,1000")
+
+        cases = {
+            'blogs': (BlogModel.objects.order_by('-created_at', '-id'), GetAllBlogSerializer,
+                      FastGetAllBlogSerializer, lambda queryset: queryset.prefetch_related('categories')),
+            'categories': (CategoryModel.objects.order_by('id'), GetCategorySerializer,
+                           FastGetCategorySerializer, lambda queryset: queryset),
+        }
+        renderer = JSONRenderer()
+        results = {}
+        for name, (queryset, serializer_class, fast, prepare) in cases.items():
+            for size in page_sizes:
+                def drf():
+                    return renderer.render(serializer_class(prepare(queryset)[:size], many=True).data)
+
+                def fast_path():
+                    return renderer.render(fast.serialize(fast.values(queryset)[:size]))
+
+                if drf() != fast_path():
+                    raise CommandError(f"{name}: the fast path output differs at page size {size}")
+                rows = len(queryset[:size])
+                drf_ms, fast_ms = self.best_of(drf, options['repeat']), self.best_of(fast_path, options['repeat'])
+                results[f'{name}_{size}'] = {'rows': rows, 'drf_ms': drf_ms, 'fast_ms': fast_ms,
+                                             'speedup': round(drf_ms / fast_ms, 2) if fast_ms else None}
+                self.stdout.write(f"{name:<10} {rows:>6} rows  drf {drf_ms:>9.2f}ms  "
+                                  f"fast {fast_ms:>9.2f}ms  x{results[f'{name}_{size}']['speedup']}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+                handle.write('\n')
+
+    @staticmethod
+    def best_of(function, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            function()
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return round(best, 2)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.trending import REBUILD_CHUNK_SIZE, decay_trending, rebuild_trending
+
+
+class Command(BaseCommand):
+    help = "Drop blogs whose trending score has decayed away; run it periodically, e.g. hourly from cron"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute every score from the recent likes instead")
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE,
+                            help="Number of likes read per query when rebuilding")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            total = rebuild_trending(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"Trending scores rebuilt for {total} blogs"))
+        else:
+            dropped = decay_trending()
+            self.stdout.write(self.style.SUCCESS(f"{dropped} blogs dropped from trending"))
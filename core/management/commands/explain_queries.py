@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.models import BlogModel, FollowModel, LikeModel, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = "Print the database query plans of the hot read paths (run before and after index changes)"
+
+    def handle(self, *args, **options):
+        blog = BlogModel.objects.order_by('id').first()
+        if blog is None:
+            self.stderr.write("No blogs to explain against; seed some data first")
+            return
+        user_id = blog.author_id
+
+        queries = {
+            "Public feed page": BlogModel.objects.filter(status=1).order_by('-created_at', '-id')[:11],
+            "Author listing page": BlogModel.objects.filter(author_id=user_id).order_by('-created_at', '-id')[:11],
+            "Blog by slug": BlogModel.objects.filter(slug=blog.slug)[:1],
+            "Has the reader liked the blog": LikeModel.objects.filter(reader_id=user_id, blog_id=blog.id)[:1],
+            "Does the reader follow the author": FollowModel.objects.filter(follower_id=user_id, author_id=user_id)[:1],
+            "Timeline page": TimelineEntry.objects.filter(reader_id=user_id).order_by('-created_at', '-blog_id')[:11],
+        }
+        for title, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
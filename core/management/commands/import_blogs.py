@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blogHub.bulk import rows_from_file, write_errors
+from core.bulk_import import IMPORT_CHUNK_SIZE, import_blogs
+
+
+class Command(BaseCommand):
+    help = "Import blogs from a JSON list or an NDJSON file (one blog per line)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .json or .ndjson file")
+        parser.add_argument('--author-id', type=int, help="Author for rows without an author_id")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                            help="Blogs written per transaction")
+
+    def handle(self, *args, **options):
+        rows = rows_from_file(options['path'])
+        report = import_blogs(rows, default_author_id=options['author_id'], chunk_size=options['chunk_size'])
+        write_errors(self, report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} blogs, rejected {len(report['errors'])} rows"))
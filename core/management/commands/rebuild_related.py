@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.related import RELATED_CHUNK_SIZE, rebuild_related
+
+
+class Command(BaseCommand):
+    help = "Recompute the related blogs of every published blog from their shared tags and categories"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=RELATED_CHUNK_SIZE,
+                            help="Number of blogs recomputed per batch")
+
+    def handle(self, *args, **options):
+        total = rebuild_related(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Related blogs rebuilt for {total} blogs"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.caching import bump_category_list
+from core.counters import recompute_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute like, follower, following and category blog counters from the source tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Number of rows updated per statement")
+
+    def handle(self, *args, **options):
+        recompute_counters(chunk_size=options['chunk_size'])
+        bump_category_list()
+        self.stdout.write(self.style.SUCCESS("Counters recomputed"))
@@ -0,0 +1,41 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import get_job_queue_settings, run_pending, worker_name
+
+
+class Command(BaseCommand):
+    help = ("Run queued background jobs (e.g. publish notifications) until stopped; "
+            "start as many as needed, they never claim the same job")
+
+    def add_arguments(self, parser):
+        config = get_job_queue_settings()
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'],
+                            help="Jobs claimed at a time")
+        parser.add_argument('--poll-interval', type=float, default=config['POLL_INTERVAL'],
+                            help="Seconds to wait when no job is ready")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit as soon as no job is ready instead of waiting for more")
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Finish the jobs already claimed, then exit
+            signal.signal(signum, lambda *_: stopping.set())
+
+        worker = worker_name()
+        total_succeeded = total_failed = 0
+        while not stopping.is_set():
+            succeeded, failed = run_pending(worker, options['batch_size'])
+            close_old_connections()
+            total_succeeded += succeeded
+            total_failed += failed
+            if not succeeded and not failed:
+                if options['once']:
+                    break
+                stopping.wait(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total_succeeded} jobs done, {total_failed} failed"))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import SEED_BATCH_SIZE, SEED_PASSWORD, clear_seed_data, seed_data, seed_email
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert a synthetic data set (users, blogs, categories, tags, likes, follows) for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=100)
+        parser.add_argument('--authors', type=int, default=10)
+        parser.add_argument('--blogs-per-author', type=int, default=20)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--likes-per-blog', type=int, default=5)
+        parser.add_argument('--follows-per-reader', type=int, default=5)
+        parser.add_argument('--paid-ratio', type=float, default=0.1, help="Share of readers on a paid plan")
+        parser.add_argument('--draft-ratio', type=float, default=0.1, help="Share of blogs left as drafts")
+        parser.add_argument('--min-words', type=int, default=150, help="Shortest blog content, in words")
+        parser.add_argument('--max-words', type=int, default=3000, help="Longest blog content, in words")
+        parser.add_argument('--prefix', default='bench', help="Prefix of every seeded email, name and title")
+        parser.add_argument('--password', default=SEED_PASSWORD, help="Password of every seeded user")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for a repeatable data set")
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete the data of a previous run with the same prefix first")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['clear']:
+            clear_seed_data(prefix)
+        elif CustomUser.objects.filter(email=seed_email(prefix, 'admin')).exists():
+            raise CommandError(f"Data with the prefix '{prefix}' already exists; pass --clear or another --prefix")
+
+        counts = seed_data(
+            readers=options['readers'], authors=options['authors'],
+            blogs_per_author=options['blogs_per_author'], categories=options['categories'],
+            tags=options['tags'], likes_per_blog=options['likes_per_blog'],
+            follows_per_reader=options['follows_per_reader'], paid_ratio=options['paid_ratio'],
+            draft_ratio=options['draft_ratio'], min_words=options['min_words'], max_words=options['max_words'],
+            prefix=prefix, password=options['password'], seed=options['seed'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items())))
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    from core.counters import recompute_counters
+    recompute_counters(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_followmodel_likemodel'),
+        ('user', '0003_profile_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogmodel',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='categorymodel',
+            name='blog_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    from core.search import create_fts_table, index_blogs
+    create_fts_table(schema_editor)
+    BlogModel = apps.get_model('core', 'BlogModel')
+    blogs = BlogModel.objects.only('id', 'title', 'content').order_by('pk')
+    batch = []
+    for blog in blogs.iterator(chunk_size=500):
+        batch.append(blog)
+        if len(batch) == 500:
+            index_blogs(batch)
+            batch = []
+    index_blogs(batch)
+
+
+def drop_search_index(apps, schema_editor):
+    from core.search import drop_fts_table
+    drop_fts_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=0)),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.blogmodel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'blog'), name='unique_search_term_per_blog')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
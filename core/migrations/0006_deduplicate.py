@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:32
+
+from django.db import migrations, transaction
+from django.db.models import Count, Min
+
+BATCH_SIZE = 1000
+
+
+def delete_duplicates(model, fields):
+    """Keep the oldest row of every duplicate group, deleting the rest in batches."""
+    groups = (model.objects.values(*fields).order_by()
+              .annotate(rows=Count('id'), keep=Min('id')).filter(rows__gt=1))
+    while True:
+        batch = list(groups[:BATCH_SIZE])
+        if not batch:
+            break
+        with transaction.atomic():
+            for group in batch:
+                model.objects.filter(**{field: group[field] for field in fields}).exclude(id=group['keep']).delete()
+
+
+def deduplicate_likes_and_follows(apps, schema_editor):
+    delete_duplicates(apps.get_model('core', 'LikeModel'), ['reader', 'blog'])
+    delete_duplicates(apps.get_model('core', 'FollowModel'), ['follower', 'author'])
+    # Duplicates inflated the stored counters
+    from core.counters import recompute_counters
+    recompute_counters(apps)
+
+
+def deduplicate_slugs(apps, schema_editor):
+    BlogModel = apps.get_model('core', 'BlogModel')
+    duplicated = (BlogModel.objects.values('slug').order_by()
+                  .annotate(rows=Count('id'), keep=Min('id')).filter(rows__gt=1))
+    for group in list(duplicated):
+        # The oldest blog keeps the slug; the others get the next free -2, -3... as in core.models.unique_slugs
+        slug = group['slug']
+        prefix = f'{slug[:190]}-'
+        taken = set(BlogModel.objects.filter(slug__startswith=prefix).values_list('slug', flat=True))
+        clashes = list(BlogModel.objects.filter(slug=slug).exclude(id=group['keep']).order_by('id').only('id', 'slug'))
+        suffix = 2
+        for blog in clashes:
+            while f'{prefix}{suffix}' in taken:
+                suffix += 1
+            blog.slug = f'{prefix}{suffix}'
+            taken.add(blog.slug)
+        with transaction.atomic():
+            BlogModel.objects.bulk_update(clashes, ['slug'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+    """
+    Clean up the rows that would violate the constraints added in 0007:
+    duplicate slugs, likes and follows. Kept apart from the schema change so
+    no backend has to alter a table with pending deletes in one transaction,
+    and not atomic so each batch commits on its own.
+    """
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_timeline'),
+        ('user', '0003_profile_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.RunPython(deduplicate_likes_and_follows, migrations.RunPython.noop),
+    ]
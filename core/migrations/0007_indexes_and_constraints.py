@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_deduplicate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blogmodel',
+            name='slug',
+            field=models.SlugField(max_length=200, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='blogmodel',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['-created_at', '-id'], name='blog_published_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='blogmodel',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='blog_status_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='blogmodel',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='blog_author_recent'),
+        ),
+        migrations.AddConstraint(
+            model_name='followmodel',
+            constraint=models.UniqueConstraint(fields=('follower', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='likemodel',
+            constraint=models.UniqueConstraint(fields=('reader', 'blog'), name='unique_like'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indexes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogmodel',
+            name='content_html',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='blogmodel',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='blogmodel',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blogmodel',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
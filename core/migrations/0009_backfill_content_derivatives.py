@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:46
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 500
+
+
+def backfill(apps, schema_editor):
+    from core.content import CONTENT_DERIVED_FIELDS, render_content
+
+    BlogModel = apps.get_model('core', 'BlogModel')
+    last_id = 0
+    while True:
+        batch = list(BlogModel.objects.filter(id__gt=last_id).order_by('id')
+                     .only('id', 'content')[:BATCH_SIZE])
+        if not batch:
+            break
+        for blog in batch:
+            for field, value in render_content(blog.content).items():
+                setattr(blog, field, value)
+        with transaction.atomic():
+            BlogModel.objects.bulk_update(batch, CONTENT_DERIVED_FIELDS)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    """Fill the content derived columns of existing blogs, one short transaction per batch."""
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_content_derivatives'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backfill_content_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBlog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='core.blogmodel')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_to', to='core.blogmodel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['blog', '-score', '-related'], name='related_blog_best')],
+                'constraints': [models.UniqueConstraint(fields=('blog', 'related'), name='unique_related_blog')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 20:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_related_blogs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBlog',
+            fields=[
+                ('blog', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='core.blogmodel')),
+                ('log_score', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-log_score'], name='trending_best')],
+            },
+        ),
+    ]
@@ -1,16 +1,39 @@
 from typing import Iterable
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 
+from .content import CONTENT_DERIVED_FIELDS, render_content
+
 User = get_user_model()
 # Create your models here.
 
+def unique_slugs(titles):
+    """
+    Slugify ``titles``, suffixing -2, -3... where a slug is already taken in
+    the database or earlier in the list. One query for the whole list.
+    """
+    slugs = [slugify(title) or 'blog' for title in titles]
+    taken = set(BlogModel.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+    unique = []
+    for slug in slugs:
+        candidate, suffix = slug, 2
+        while candidate in taken:
+            candidate = f'{slug[:190]}-{suffix}'
+            suffix += 1
+        taken.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
 # Category Model
 class CategoryModel(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
+    # Denormalized number of blogs in this category, kept in sync by core.signals
+    blog_count = models.PositiveIntegerField(default=0)
 
     def __str__(self) -> str:
         return self.name 
@@ -39,7 +62,7 @@ class BlogModel(models.Model):
     )
 
     title = models.CharField(max_length=255, unique=True)
-    slug = models.SlugField(max_length=200)
+    slug = models.SlugField(max_length=200, unique=True)
     content = models.TextField()
     status = models.IntegerField(choices=STATUS, default=0)
     
@@ -47,23 +70,103 @@ class BlogModel(models.Model):
     categories = models.ManyToManyField(CategoryModel, related_name='categories')
     tags = models.ManyToManyField(TagsModel, related_name='tags')
 
+    # Denormalized number of likes, kept in sync by core.signals
+    like_count = models.PositiveIntegerField(default=0)
+
+    # Derived from content on save (core.content) so lists never load the body
+    excerpt = models.CharField(max_length=500, blank=True, default='')
+    word_count = models.PositiveIntegerField(default=0)
+    reading_time = models.PositiveSmallIntegerField(default=0)  # minutes
+    content_html = models.TextField(blank=True, default='')
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at', '-updated_at']
         verbose_name = 'Blog'
+        indexes = [
+            # Published feed: WHERE status = 1 ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status=1), name='blog_published_recent'),
+            models.Index(fields=['status', '-created_at', '-id'], name='blog_status_recent'),
+            # Author listing: WHERE author_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['author', '-created_at', '-id'], name='blog_author_recent'),
+        ]
 
     def save(self, *args, **kwargs):
-        # If slug is not provided, generate it from the title
+        # If slug is not provided, generate a unique one from the title
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = unique_slugs([self.title])[0]
+        # Skipped when content was deferred and is not being written
+        if 'content' in self.__dict__:
+            for field, value in render_content(self.content).items():
+                setattr(self, field, value)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'content' in update_fields:
+                kwargs['update_fields'] = {*update_fields, *CONTENT_DERIVED_FIELDS}
         super().save(*args, **kwargs)  
 
     def __str__(self) -> str:
         return self.title
 
 
+# Materialized "blogs from authors I follow" feed, filled on publish by core.timeline
+class TimelineEntry(models.Model):
+    reader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline')
+    blog = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    # Copy of blog.created_at so a timeline page is one range scan of this table
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['reader', '-created_at', '-blog'], name='timeline_reader_recent'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'blog'], name='unique_timeline_entry'),
+        ]
+
+
+# Precomputed "related posts" of each published blog, kept by core.related
+class RelatedBlog(models.Model):
+    blog = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='related_to')
+    # Weighted number of shared tags and categories
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['blog', '-score', '-related'], name='related_blog_best'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['blog', 'related'], name='unique_related_blog'),
+        ]
+
+
+# Time-decayed like score of each recently liked blog, kept by core.trending
+class TrendingBlog(models.Model):
+    blog = models.OneToOneField(BlogModel, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    # log(sum of e^(t / tau)) over the blog's likes, t counted from core.trending.TRENDING_EPOCH
+    log_score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-log_score'], name='trending_best'),
+        ]
+
+
+# Inverted index used by core.search on databases without SQLite FTS5
+class BlogSearchTerm(models.Model):
+    term = models.CharField(max_length=64)
+    blog = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'blog'], name='unique_search_term_per_blog'),
+        ]
+
+
 # # Comment Model
 # class CommentModel(models.Model):
 #     content = models.CharField(max_length= 255)
@@ -87,20 +190,70 @@ class FollowModel(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='following')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='unique_follow'),
+        ]
+
 # # Like Model
 class LikeModel(models.Model):
     reader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='likedBy')
     blog = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='likedBlog')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'blog'], name='unique_like'),
+        ]
 
-# class NotificationModel(models.Model):
-#     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='creator', default=None)
-#     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipients')
-#     blog_post = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='blogs', null=True, blank=True, default=None)
-#     message = models.TextField()
-#     created_at = models.DateTimeField(auto_now_add=True)
-#     is_read = models.BooleanField(default=False)
 
-#     def __str__(self):
-#         return f"Notification for {self.recipient.username}"
\ No newline at end of file
+class NotificationModel(models.Model):
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='creator', default=None)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipients')
+    blog_post = models.ForeignKey(BlogModel, on_delete=models.CASCADE, related_name='blogs', null=True, blank=True, default=None)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='notification_recipient_recent'),
+        ]
+        constraints = [
+            # A retried or repeated fan-out never notifies anyone twice about the same blog
+            models.UniqueConstraint(fields=['recipient', 'blog_post'], name='unique_blog_notification'),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.recipient.username}"
+
+
+# Background job stored in the database and run by `manage.py run_jobs` (core.jobs)
+class Job(models.Model):
+    QUEUED, RUNNING, FAILED = 0, 1, 2
+    STATUS = (
+        (QUEUED, 'queued'),
+        (RUNNING, 'running'),
+        (FAILED, 'failed'),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.SmallIntegerField(choices=STATUS, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Not claimed before this time; pushed back after each failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: WHERE status = 0 AND run_after <= now ORDER BY run_after, id
+            models.Index(fields=['status', 'run_after', 'id'], name='job_ready'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk}"
@@ -0,0 +1,35 @@
+from .jobs import enqueue, job
+from .models import BlogModel, FollowModel, NotificationModel
+
+# Followers notified per job; a larger audience continues in a follow-up job
+NOTIFY_CHUNK_SIZE = 1000
+
+
+def queue_publish_notifications(blog):
+    """Called when ``blog`` gets published; the followers are notified by the job worker."""
+    enqueue('notify_followers', {'blog_id': blog.pk})
+
+
+@job('notify_followers')
+def notify_followers(blog_id, after_follower_id=0):
+    """
+    Notify the next NOTIFY_CHUNK_SIZE followers of the blog's author, by
+    follower id, and queue the rest as another job. Every chunk is a short
+    transaction, and a retried chunk skips who was already notified.
+    """
+    blog = BlogModel.objects.filter(pk=blog_id, status=1).select_related('author').only(
+        'id', 'title', 'author__email', 'author__username').first()
+    if blog is None:
+        return  # Deleted or unpublished since
+
+    follower_ids = list(FollowModel.objects.filter(author_id=blog.author_id, follower_id__gt=after_follower_id)
+                        .order_by('follower_id').values_list('follower_id', flat=True)[:NOTIFY_CHUNK_SIZE])
+    author = blog.author.username or blog.author.email
+    NotificationModel.objects.bulk_create(
+        [NotificationModel(created_by_id=blog.author_id, recipient_id=follower_id, blog_post_id=blog.pk,
+                           message=f"{author} published \"{blog.title}\"")
+         for follower_id in follower_ids],
+        ignore_conflicts=True,
+    )
+    if len(follower_ids) == NOTIFY_CHUNK_SIZE:
+        enqueue('notify_followers', {'blog_id': blog_id, 'after_follower_id': follower_ids[-1]})
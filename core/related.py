@@ -0,0 +1,153 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+
+from .models import BlogModel, RelatedBlog
+
+# Related blogs kept per blog, and what each shared tag / category adds to a pair's score
+RELATED_LENGTH = getattr(settings, 'RELATED_LENGTH', 10)
+RELATED_TAG_WEIGHT = getattr(settings, 'RELATED_TAG_WEIGHT', 2)
+RELATED_CATEGORY_WEIGHT = getattr(settings, 'RELATED_CATEGORY_WEIGHT', 1)
+RELATED_CHUNK_SIZE = 100
+RELATED_ORDERING = ('-score', '-related_id')
+
+
+def _chunks(ids, size=RELATED_CHUNK_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def overlap_scores(blog_ids):
+    """
+    ``{blog id: {published blog id: score}}`` for every other published blog
+    sharing a tag or a category with one of ``blog_ids``. The overlap is
+    counted by the database, one grouped self-join per relation.
+    """
+    scores = defaultdict(Counter)
+    for relation, weight in (('tags__tags', RELATED_TAG_WEIGHT), ('categories__categories', RELATED_CATEGORY_WEIGHT)):
+        shared = (BlogModel.objects.filter(status=1, **{f'{relation}__in': blog_ids})
+                  .values(relation, 'id').annotate(shared=Count('*')).values_list(relation, 'id', 'shared').order_by())
+        for blog_id, other_id, count in shared:
+            if blog_id != other_id:
+                scores[blog_id][other_id] += count * weight
+    return scores
+
+
+def _top(scores):
+    # Ties go to the newer blog, as in RELATED_ORDERING
+    return heapq.nlargest(RELATED_LENGTH, ((score, other_id) for other_id, score in scores.items()))
+
+
+def _store_lists(blog_ids, published, scores):
+    RelatedBlog.objects.filter(blog_id__in=blog_ids).delete()
+    return RelatedBlog.objects.bulk_create(
+        [RelatedBlog(blog_id=blog_id, related_id=other_id, score=score)
+         for blog_id in published for score, other_id in _top(scores.get(blog_id, {}))],
+        ignore_conflicts=True,
+    )
+
+
+def _published(blog_ids):
+    return set(BlogModel.objects.filter(pk__in=blog_ids, status=1).values_list('id', flat=True))
+
+
+def compute_related(blog_ids, chunk_size=RELATED_CHUNK_SIZE):
+    """
+    Recompute the related list of each of ``blog_ids`` from scratch; drafts
+    get none. Returns the number of entries written.
+    """
+    stored = 0
+    for chunk in _chunks(blog_ids, chunk_size):
+        published = _published(chunk)
+        stored += len(_store_lists(chunk, published, overlap_scores(list(published)) if published else {}))
+    return stored
+
+
+def trim_related(blog_ids):
+    """Drop everything past the best RELATED_LENGTH entries of each blog."""
+    ranked = (RelatedBlog.objects.filter(blog_id__in=blog_ids)
+              .annotate(position=Window(RowNumber(), partition_by=F('blog_id'),
+                                        order_by=[F('score').desc(), F('related_id').desc()]))
+              .filter(position__gt=RELATED_LENGTH)
+              .values_list('id', flat=True))
+    stale = list(ranked)
+    for chunk in _chunks(stale, 1000):
+        RelatedBlog.objects.filter(id__in=chunk).delete()
+
+
+def refresh_related(blog_ids):
+    """
+    The tags, categories or status of ``blog_ids`` changed. Their own lists
+    are recomputed, and the score of every pair involving them is merged
+    into the other blog's list instead of recomputing that list too.
+
+    Scores are symmetric, so the scores just computed are the new scores of
+    these blogs in everyone else's list. A higher score is written or
+    inserted in place and the list trimmed back to RELATED_LENGTH; a lower
+    one could let a blog outside a full list overtake it, so only then is
+    that list recomputed.
+    """
+    blog_ids = list(blog_ids)
+    for chunk in _chunks(blog_ids):
+        published = _published(chunk)
+        scores = overlap_scores(list(published)) if published else {}
+        _store_lists(chunk, published, scores)
+
+        # Every pair as seen from the other blog: {(other blog, changed blog): score}
+        pairs = {(other_id, blog_id): score for blog_id in published for other_id, score in scores[blog_id].items()
+                 if other_id not in chunk}
+        listed = {(row.blog_id, row.related_id): row
+                  for row in RelatedBlog.objects.filter(related_id__in=chunk).exclude(blog_id__in=chunk)}
+        others = {other_id for other_id, _ in pairs} | {other_id for other_id, _ in listed}
+        sizes, lows = {}, {}
+        for others_chunk in _chunks(others, 1000):
+            for other_id, size, low in (RelatedBlog.objects.filter(blog_id__in=others_chunk).values('blog_id')
+                                        .annotate(size=Count('*'), low=Min('score'))
+                                        .values_list('blog_id', 'size', 'low').order_by()):
+                sizes[other_id], lows[other_id] = size, low
+
+        rescored, added, dropped, recompute = [], [], [], set()
+        for key, row in listed.items():
+            score = pairs.get(key, 0)
+            if score > row.score:
+                row.score = score
+                rescored.append(row)
+            elif score < row.score:
+                if sizes.get(row.blog_id, 0) >= RELATED_LENGTH:
+                    recompute.add(row.blog_id)
+                elif score:
+                    row.score = score
+                    rescored.append(row)
+                else:
+                    dropped.append(row.id)
+        for (other_id, blog_id), score in pairs.items():
+            if (other_id, blog_id) in listed or other_id in recompute:
+                continue
+            # A full list only takes a pair at least as good as its last entry; a tie is settled by the trim
+            if sizes.get(other_id, 0) < RELATED_LENGTH or score >= lows[other_id]:
+                added.append(RelatedBlog(blog_id=other_id, related_id=blog_id, score=score))
+
+        RelatedBlog.objects.bulk_update(rescored, ['score'], batch_size=1000)
+        RelatedBlog.objects.filter(id__in=dropped).delete()
+        RelatedBlog.objects.bulk_create(added, batch_size=1000, ignore_conflicts=True)
+        trim_related({row.blog_id for row in added} - recompute)
+        compute_related(sorted(recompute))
+
+
+def get_related(slug, limit=RELATED_LENGTH):
+    """The blogs related to the published blog ``slug``, best first, as a queryset of dicts."""
+    return (BlogModel.objects.filter(status=1, related_to__blog__slug=slug, related_to__blog__status=1)
+            .order_by('-related_to__score', '-id')
+            .values('id', 'title', 'slug', 'excerpt', 'reading_time', score=F('related_to__score'))[:limit])
+
+
+def rebuild_related(chunk_size=RELATED_CHUNK_SIZE):
+    """Recompute every blog's related list, ``chunk_size`` blogs at a time. Returns the number of blogs."""
+    RelatedBlog.objects.exclude(blog__status=1).delete()
+    blog_ids = list(BlogModel.objects.filter(status=1).order_by('id').values_list('id', flat=True))
+    compute_related(blog_ids, chunk_size=chunk_size)
+    return len(blog_ids)
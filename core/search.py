@@ -0,0 +1,183 @@
+import re
+from collections import Counter
+from contextlib import nullcontext
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils.html import escape
+
+from .models import BlogModel, BlogSearchTerm, CategoryModel, TagsModel
+
+FTS_TABLE = 'core_blog_fts'
+TITLE_WEIGHT = 10
+SNIPPET_WORDS = 16
+MAX_TERM_LENGTH = 64
+# FTS5 marks the matches with these; the snippet is escaped before they become <b> tags
+MATCH_START, MATCH_END = '\ue000', '\ue001'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def uses_fts():
+    """SQLite ships FTS5; every other backend uses the BlogSearchTerm table."""
+    return connection.vendor == 'sqlite'
+
+
+def tokenize(text):
+    return [word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.lower())]
+
+
+def create_fts_table(schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, content, tokenize='porter unicode61')"
+        )
+
+
+def drop_fts_table(schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+# Indexing ----------------------------------------------------------------
+
+def _term_rows(blog_id, title, content):
+    weights = Counter()
+    for term in tokenize(title):
+        weights[term] += TITLE_WEIGHT
+    for term in tokenize(content):
+        weights[term] += 1
+    return [BlogSearchTerm(term=term, blog_id=blog_id, weight=weight) for term, weight in weights.items()]
+
+
+def index_blogs(blogs, new=False):
+    """
+    (Re)index an iterable of blogs; used by the save signal and bulk imports.
+    ``new`` skips removing previous entries for blogs that were just created.
+    """
+    blogs = [(blog.pk, blog.title, blog.content) for blog in blogs]
+    if not blogs:
+        return
+    ids = [blog_id for blog_id, _, _ in blogs]
+    # A fresh blog is a single INSERT; a reindex must swap old and new rows atomically
+    with nullcontext() if new else transaction.atomic():
+        if uses_fts():
+            with connection.cursor() as cursor:
+                if not new:
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+                cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)", blogs)
+        else:
+            if not new:
+                BlogSearchTerm.objects.filter(blog_id__in=ids).delete()
+            rows = [row for blog in blogs for row in _term_rows(*blog)]
+            BlogSearchTerm.objects.bulk_create(rows, batch_size=1000)
+
+
+def index_blog(blog, new=False):
+    index_blogs([blog], new=new)
+
+
+def remove_blog(blog_id):
+    # BlogSearchTerm rows go away with the blog through the foreign key cascade
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [blog_id])
+
+
+# Querying ----------------------------------------------------------------
+
+def _fts_query(terms):
+    # Quote every term so user input can never be read as FTS5 syntax;
+    # the last term is a prefix so results follow the user as they type.
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _search_fts(terms, category, tag, limit):
+    blog_table = BlogModel._meta.db_table
+    sql = [
+        f"SELECT b.id, b.title, b.slug, "
+        f"snippet({FTS_TABLE}, 1, '{MATCH_START}', '{MATCH_END}', '...', {SNIPPET_WORDS}) "
+        f"FROM {FTS_TABLE} JOIN {blog_table} b ON b.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND b.status = 1"
+    ]
+    params = [_fts_query(terms)]
+    if category:
+        through = BlogModel.categories.through._meta.db_table
+        sql.append(
+            f"AND EXISTS (SELECT 1 FROM {through} bc JOIN {CategoryModel._meta.db_table} c "
+            f"ON c.id = bc.categorymodel_id WHERE bc.blogmodel_id = b.id AND c.slug = %s)"
+        )
+        params.append(category)
+    if tag:
+        through = BlogModel.tags.through._meta.db_table
+        sql.append(
+            f"AND EXISTS (SELECT 1 FROM {through} bt JOIN {TagsModel._meta.db_table} t "
+            f"ON t.id = bt.tagsmodel_id WHERE bt.blogmodel_id = b.id AND t.name = %s)"
+        )
+        params.append(tag)
+    sql.append(f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}.0, 1.0) LIMIT %s")
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [{'id': blog_id, 'title': title, 'slug': slug, 'snippet': _highlight(snippet)}
+                for blog_id, title, slug, snippet in cursor.fetchall()]
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(MATCH_START, '<b>').replace(MATCH_END, '</b>')
+
+
+def _make_snippet(content, terms):
+    words = content.split()
+    lowered = [word.lower() for word in words]
+    start = next((i for i, word in enumerate(lowered) if any(term in word for term in terms)), 0)
+    start = max(0, start - SNIPPET_WORDS // 4)
+    window = []
+    for word in words[start:start + SNIPPET_WORDS]:
+        word = escape(word)
+        window.append(f'<b>{word}</b>' if any(term in word.lower() for term in terms) else word)
+    prefix = '...' if start else ''
+    suffix = '...' if start + SNIPPET_WORDS < len(words) else ''
+    return prefix + ' '.join(window) + suffix
+
+
+def _search_terms(terms, category, tag, limit):
+    # Every term must match (like FTS5); the last one may be a prefix
+    match = Q(term__in=terms[:-1]) | Q(term__startswith=terms[-1])
+    hits = BlogSearchTerm.objects.filter(match, blog__status=1)
+    if category:
+        hits = hits.filter(blog__categories__slug=category)
+    if tag:
+        hits = hits.filter(blog__tags__name=tag)
+    ranked = (hits.values('blog_id')
+              .annotate(score=Sum('weight'), prefix=Count('term', filter=Q(term__startswith=terms[-1])))
+              .filter(prefix__gte=1))
+    exact = set(terms[:-1])
+    if exact:
+        ranked = (ranked.annotate(exact=Count('term', filter=Q(term__in=exact), distinct=True))
+                  .filter(exact=len(exact)))
+    ranked = ranked.order_by('-score', '-blog_id')[:limit]
+    scores = [row['blog_id'] for row in ranked]
+
+    blogs = BlogModel.objects.defer('content_html').in_bulk(scores)
+    return [{'id': blog.id, 'title': blog.title, 'slug': blog.slug, 'snippet': _make_snippet(blog.content, terms)}
+            for blog in (blogs[blog_id] for blog_id in scores)]
+
+
+def search_blogs(query, category=None, tag=None, limit=20):
+    """
+    Ranked full-text search over published blogs' title and content, with
+    an HTML snippet of the matching text. Optionally restricted to a
+    category slug and/or a tag name.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if uses_fts():
+        return _search_fts(terms, category, tag, limit)
+    return _search_terms(terms, category, tag, limit)
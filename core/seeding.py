@@ -0,0 +1,159 @@
+import math
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from user.models import CustomUser, Profile
+from . import related, search, trending
+from .caching import bump_blog_list, bump_category_list
+from .content import render_content
+from .counters import recompute_counters
+from .models import BlogModel, CategoryModel, FollowModel, LikeModel, TagsModel, TimelineEntry, unique_slugs
+from .timeline import TIMELINE_LENGTH
+
+SEED_BATCH_SIZE = 1000
+SEED_DOMAIN = 'bloghub.test'
+SEED_PASSWORD = 'benchmark'
+
+WORDS = (
+    "the a of to and in is it that for on with as was at by be this from are or an have not they which "
+    "blog post python django database query index cache latency throughput request response server client "
+    "author reader category tag content design performance system data model view test deploy release "
+    "write read update delete create search feed timeline follow like publish draft scale load memory "
+    "thread process async event loop worker queue job batch stream network storage disk page row column"
+).split()
+
+
+def seed_email(prefix, role, number=None):
+    """Deterministic addresses so the benchmark can log in as seeded users."""
+    name = f'{prefix}-{role}' if number is None else f'{prefix}-{role}-{number}'
+    return f'{name}@{SEED_DOMAIN}'
+
+
+def _content(rng, min_words, max_words):
+    """Paragraphs of filler text with a long-tailed length, like real posts."""
+    mu = math.log(max(min_words, 1) * 3)
+    words = int(min(max(rng.lognormvariate(mu, 0.6), min_words), max_words))
+    paragraphs, remaining = [], words
+    while remaining > 0:
+        size = min(remaining, rng.randint(40, 120))
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(size))
+        paragraphs.append(sentence.capitalize() + '.')
+        remaining -= size
+    return '\n\n'.join(paragraphs)
+
+
+def _bulk(model, rows, batch_size, **kwargs):
+    return model.objects.bulk_create(rows, batch_size=batch_size, **kwargs)
+
+
+def clear_seed_data(prefix):
+    """Delete everything a previous seed_data run with this prefix created."""
+    with transaction.atomic():
+        CustomUser.objects.filter(email__startswith=f'{prefix}-', email__endswith=f'@{SEED_DOMAIN}').delete()
+        CategoryModel.objects.filter(name__startswith=f'{prefix}-').delete()
+        TagsModel.objects.filter(name__startswith=f'{prefix}-').delete()
+    recompute_counters()
+    bump_blog_list()
+    bump_category_list()
+
+
+def seed_data(readers=100, authors=10, blogs_per_author=20, categories=10, tags=50, likes_per_blog=5,
+              follows_per_reader=5, paid_ratio=0.1, draft_ratio=0.1, min_words=150, max_words=3000,
+              prefix='bench', password=SEED_PASSWORD, seed=0, batch_size=SEED_BATCH_SIZE):
+    """
+    Bulk-insert a synthetic data set: an admin, authors and readers with
+    profiles, categories, tags, blogs with their links, likes, follows,
+    the materialized timelines and related blogs, then the search index,
+    counters and trending scores.
+
+    Every table is written with bulk_create, so no signal fires; the
+    derived data those signals maintain is rebuilt here in bulk instead.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    password_hash = make_password(password)  # One hash for everybody; hashing is the slow part
+
+    with transaction.atomic():
+        users = [CustomUser(email=seed_email(prefix, 'admin'), username=f'{prefix}-admin',
+                            user_type='admin', is_staff=True, password=password_hash)]
+        users += [CustomUser(email=seed_email(prefix, 'author', i), username=f'{prefix}-author-{i}',
+                             user_type='author', password=password_hash) for i in range(authors)]
+        users += [CustomUser(email=seed_email(prefix, 'reader', i), username=f'{prefix}-reader-{i}',
+                             user_type='reader', password=password_hash) for i in range(readers)]
+        users = _bulk(CustomUser, users, batch_size)
+        author_ids = [user.pk for user in users if user.user_type == 'author']
+        reader_ids = [user.pk for user in users if user.user_type == 'reader']
+        paid_readers = set(rng.sample(reader_ids, int(len(reader_ids) * paid_ratio)))
+        _bulk(Profile, [Profile(user_id=user.pk, is_paid=user.pk in paid_readers or user.user_type == 'admin')
+                        for user in users], batch_size)
+
+        category_rows = _bulk(CategoryModel, [CategoryModel(name=f'{prefix}-category-{i}', slug=f'{prefix}-category-{i}')
+                                              for i in range(categories)], batch_size)
+        tag_rows = _bulk(TagsModel, [TagsModel(name=f'{prefix}-tag-{i}') for i in range(tags)], batch_size)
+
+        titles = [f'{prefix} blog {author_id}-{i}' for author_id in author_ids for i in range(blogs_per_author)]
+        blogs = []
+        for start in range(0, len(titles), batch_size):
+            chunk = titles[start:start + batch_size]
+            rows = []
+            for offset, (title, slug) in enumerate(zip(chunk, unique_slugs(chunk))):
+                content = _content(rng, min_words, max_words)
+                rows.append(BlogModel(title=title, slug=slug, content=content, **render_content(content),
+                                      status=0 if rng.random() < draft_ratio else 1,
+                                      author_id=author_ids[(start + offset) // blogs_per_author]))
+            blogs += _bulk(BlogModel, rows, batch_size)
+
+        BlogCategory = BlogModel.categories.through
+        BlogTag = BlogModel.tags.through
+        category_links, tag_links = [], []
+        for blog in blogs:
+            if category_rows:
+                category_links += [BlogCategory(blogmodel_id=blog.pk, categorymodel_id=category.pk)
+                                   for category in rng.sample(category_rows, min(2, len(category_rows)))]
+            if tag_rows:
+                tag_links += [BlogTag(blogmodel_id=blog.pk, tagsmodel_id=tag.pk)
+                              for tag in rng.sample(tag_rows, min(4, len(tag_rows)))]
+        _bulk(BlogCategory, category_links, batch_size)
+        _bulk(BlogTag, tag_links, batch_size)
+
+        likes = [LikeModel(reader_id=reader_id, blog_id=blog.pk)
+                 for blog in blogs
+                 for reader_id in rng.sample(reader_ids, min(likes_per_blog, len(reader_ids)))]
+        _bulk(LikeModel, likes, batch_size)
+
+        follows = [FollowModel(follower_id=reader_id, author_id=author_id)
+                   for reader_id in reader_ids
+                   for author_id in rng.sample(author_ids, min(follows_per_reader, len(author_ids)))]
+        _bulk(FollowModel, follows, batch_size)
+
+        # What the publish and follow signals would have fanned out
+        published = {}
+        for blog in blogs:
+            if blog.status == 1:
+                published.setdefault(blog.author_id, []).append(blog)
+        entries = [TimelineEntry(reader_id=follow.follower_id, blog_id=blog.pk, author_id=blog.author_id,
+                                 created_at=blog.created_at)
+                   for follow in follows
+                   for blog in published.get(follow.author_id, [])[-TIMELINE_LENGTH:]]
+        _bulk(TimelineEntry, entries, batch_size, ignore_conflicts=True)
+
+        for start in range(0, len(blogs), batch_size):
+            search.index_blogs(blogs[start:start + batch_size], new=True)
+        related_entries = related.compute_related([blog.pk for blog in blogs if blog.status == 1])
+
+    recompute_counters(chunk_size=batch_size)
+    trending.rebuild_trending(chunk_size=batch_size)
+    bump_blog_list()
+    bump_category_list()
+    return {
+        'users': len(users),
+        'categories': len(category_rows),
+        'tags': len(tag_rows),
+        'blogs': len(blogs),
+        'likes': len(likes),
+        'follows': len(follows),
+        'timeline entries': len(entries),
+        'related blogs': related_entries,
+    }
@@ -1,5 +1,6 @@
 from rest_framework.serializers import ModelSerializer
 from rest_framework import serializers
+from blogHub.fast_serializers import FastSerializer
 from .models import (BlogModel, 
                      CategoryModel, 
                      TagsModel)
@@ -36,7 +37,7 @@ class GetAllBlogSerializer(ModelSerializer):
 
     class Meta:
         model = BlogModel
-        fields = ['id','title', 'status', 'categories', 'created_at']
+        fields = ['id','title', 'excerpt', 'reading_time', 'status', 'categories', 'created_at']
 
 class GetBlogSerializer(ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
@@ -44,5 +45,10 @@ class GetBlogSerializer(ModelSerializer):
 
     class Meta:
         model = BlogModel
-        fields = ['id','title', 'content', 'status', 'categories', 'tags', 'created_at', 'updated_at']
+        fields = ['id','title', 'content', 'content_html', 'word_count', 'reading_time', 'status', 'categories', 'tags', 'created_at', 'updated_at']
 
+
+
+# Serializer-free read paths for the list endpoints; same output, built from .values() rows
+FastGetAllBlogSerializer = FastSerializer(GetAllBlogSerializer)
+FastGetCategorySerializer = FastSerializer(GetCategorySerializer)
@@ -0,0 +1,255 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.caching import (bump_all_blog_details, bump_blog_detail, bump_blog_list, bump_category_list,
+                          bump_tag_index)
+from core import notifications, related, search, timeline, trending
+from core.models import BlogModel, CategoryModel, FollowModel, LikeModel, RelatedBlog, TagsModel
+from user.models import Profile
+
+
+TRACKED_BLOG_FIELDS = ('slug', 'title', 'content', 'status')
+
+
+@receiver(post_init, sender=BlogModel)
+def remember_loaded_state(sender, instance, **kwargs):
+    # Snapshot of the values as loaded so post_save handlers can tell what changed.
+    # Read through __dict__ so deferred fields are never fetched.
+    instance._loaded = {field: instance.__dict__.get(field) for field in TRACKED_BLOG_FIELDS}
+
+
+def blog_changed(instance, *fields):
+    return any(field in instance.__dict__ and instance.__dict__[field] != instance._loaded[field]
+               for field in fields)
+
+
+@receiver(post_save, sender=BlogModel)
+@receiver(post_delete, sender=BlogModel)
+def invalidate_blog_detail(sender, instance, **kwargs):
+    bump_blog_detail(instance.slug, instance._loaded['slug'])
+
+
+@receiver(m2m_changed, sender=BlogModel.categories.through)
+@receiver(m2m_changed, sender=BlogModel.tags.through)
+def invalidate_blog_detail_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        bump_blog_detail(instance.slug)
+    elif pk_set:
+        bump_blog_detail(*BlogModel.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+    else:
+        # A category or tag was cleared from every blog it had
+        bump_all_blog_details()
+
+
+@receiver(post_save, sender=CategoryModel)
+@receiver(post_delete, sender=CategoryModel)
+@receiver(post_save, sender=TagsModel)
+@receiver(post_delete, sender=TagsModel)
+def invalidate_all_blog_details(sender, instance, created=False, **kwargs):
+    # A brand new category or tag is not attached to any blog yet
+    if not created:
+        bump_all_blog_details()
+
+
+# Version stamps behind the list ETags (see core.caching); the feed and the
+# category list revalidate on the stamp alone.
+
+@receiver(post_save, sender=BlogModel)
+@receiver(post_delete, sender=BlogModel)
+def invalidate_blog_list(sender, **kwargs):
+    bump_blog_list()
+
+
+@receiver(post_save, sender=CategoryModel)
+@receiver(post_delete, sender=CategoryModel)
+def invalidate_category_list(sender, **kwargs):
+    bump_category_list()
+    bump_blog_list()
+
+
+@receiver(post_save, sender=TagsModel)
+@receiver(post_delete, sender=TagsModel)
+def invalidate_tag_index(sender, created=False, **kwargs):
+    # A new tag is added to every worker's index on its own; anything else reloads it
+    bump_tag_index(rebuild=not created)
+
+
+@receiver(m2m_changed, sender=BlogModel.categories.through)
+def invalidate_lists_on_recategorisation(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_category_list()
+        bump_blog_list()
+
+
+# Denormalized counters. Every change is a single ``UPDATE ... SET x = x +/- n``
+# so concurrent writers never lose an increment; decrements never go below zero.
+
+def _increment(queryset, field, amount=1):
+    if amount > 0:
+        queryset.update(**{field: F(field) + amount})
+    elif amount < 0:
+        queryset.filter(**{f'{field}__gte': -amount}).update(**{field: F(field) + amount})
+
+
+@receiver(post_save, sender=LikeModel)
+def count_like(sender, instance, created, **kwargs):
+    if created:
+        _increment(BlogModel.objects.filter(pk=instance.blog_id), 'like_count')
+
+
+@receiver(post_delete, sender=LikeModel)
+def uncount_like(sender, instance, **kwargs):
+    _increment(BlogModel.objects.filter(pk=instance.blog_id), 'like_count', -1)
+
+
+@receiver(post_save, sender=LikeModel)
+def score_like(sender, instance, created, **kwargs):
+    if created:
+        trending.apply_likes(added=[(instance.blog_id, instance.created_at)])
+
+
+@receiver(post_delete, sender=LikeModel)
+def unscore_like(sender, instance, **kwargs):
+    trending.apply_likes(removed=[(instance.blog_id, instance.created_at)])
+
+
+@receiver(post_save, sender=FollowModel)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        _increment(Profile.objects.filter(user_id=instance.author_id), 'follower_count')
+        _increment(Profile.objects.filter(user_id=instance.follower_id), 'following_count')
+
+
+@receiver(post_delete, sender=FollowModel)
+def uncount_follow(sender, instance, **kwargs):
+    _increment(Profile.objects.filter(user_id=instance.author_id), 'follower_count', -1)
+    _increment(Profile.objects.filter(user_id=instance.follower_id), 'following_count', -1)
+
+
+@receiver(m2m_changed, sender=BlogModel.categories.through)
+def count_blog_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    through_field, other_field = ('categorymodel_id', 'blogmodel_id') if reverse else ('blogmodel_id', 'categorymodel_id')
+
+    if action in ('pre_remove', 'pre_clear'):
+        # pk_set holds what was asked for, not what exists; remember the rows actually removed
+        links = sender.objects.filter(**{through_field: instance.pk})
+        if pk_set is not None:
+            links = links.filter(**{f'{other_field}__in': pk_set})
+        instance._removed_category_links = list(links.values_list(other_field, flat=True))
+        return
+
+    if action == 'post_add' and pk_set:
+        removed, changed = 1, list(pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        removed, changed = -1, getattr(instance, '_removed_category_links', [])
+    else:
+        return
+
+    if not changed:
+        return
+    if reverse:
+        _increment(CategoryModel.objects.filter(pk=instance.pk), 'blog_count', removed * len(changed))
+    else:
+        _increment(CategoryModel.objects.filter(pk__in=changed), 'blog_count', removed)
+
+
+@receiver(pre_delete, sender=BlogModel)
+def uncount_deleted_blog(sender, instance, **kwargs):
+    # The category links are cascade-deleted without an m2m_changed signal
+    _increment(CategoryModel.objects.filter(categories=instance), 'blog_count', -1)
+    bump_category_list()
+
+
+@receiver(post_save, sender=BlogModel)
+def index_blog(sender, instance, created, **kwargs):
+    if created or blog_changed(instance, 'title', 'content'):
+        search.index_blog(instance, new=created)
+
+
+@receiver(post_delete, sender=BlogModel)
+def unindex_blog(sender, instance, **kwargs):
+    search.remove_blog(instance.pk)
+
+
+@receiver(post_save, sender=BlogModel)
+def update_timelines(sender, instance, created, **kwargs):
+    published = int(instance.status) == 1
+    was_published = not created and instance._loaded['status'] is not None and int(instance._loaded['status']) == 1
+    if published and not was_published:
+        # Queued in the same transaction as the status change; the job worker fans out and notifies
+        timeline.queue_fan_out(instance)
+        notifications.queue_publish_notifications(instance)
+    elif was_published and not published:
+        timeline.remove_blog(instance)
+
+
+@receiver(post_save, sender=FollowModel)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill_follow(instance.follower_id, instance.author_id)
+
+
+@receiver(post_delete, sender=FollowModel)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.remove_follow(instance.follower_id, instance.author_id)
+
+
+# Related blogs (core.related) follow each blog's tags, categories and status
+
+@receiver(m2m_changed, sender=BlogModel.categories.through)
+@receiver(m2m_changed, sender=BlogModel.tags.through)
+def refresh_related_blogs(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # A tag or category is taken off every blog; remember which blogs had it
+        links = sender.objects.filter(**{f'{instance._meta.model_name}_id': instance.pk})
+        instance._related_blog_ids = list(links.values_list('blogmodel_id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear') or (action != 'post_clear' and not pk_set):
+        return
+    if not reverse:
+        related.refresh_related([instance.pk])
+    else:
+        related.refresh_related(pk_set or getattr(instance, '_related_blog_ids', []))
+
+
+@receiver(post_save, sender=BlogModel)
+def refresh_related_on_status(sender, instance, created, **kwargs):
+    # A new blog has no tags or categories yet; adding them refreshes it
+    was = instance._loaded['status']
+    if not created and was is not None and blog_changed(instance, 'status') and int(instance.status) != int(was):
+        related.refresh_related([instance.pk])
+
+
+@receiver(pre_delete, sender=BlogModel)
+@receiver(pre_delete, sender=CategoryModel)
+@receiver(pre_delete, sender=TagsModel)
+def remember_related_blogs(sender, instance, **kwargs):
+    # What goes away with it is cascade-deleted without an m2m_changed signal
+    if sender is BlogModel:
+        blog_ids = RelatedBlog.objects.filter(related_id=instance.pk).values_list('blog_id', flat=True)
+    else:
+        relation = 'categories' if sender is CategoryModel else 'tags'
+        blog_ids = BlogModel.objects.filter(**{relation: instance}).values_list('id', flat=True)
+    instance._related_blog_ids = list(blog_ids)
+
+
+@receiver(post_delete, sender=BlogModel)
+@receiver(post_delete, sender=CategoryModel)
+@receiver(post_delete, sender=TagsModel)
+def refresh_related_after_delete(sender, instance, **kwargs):
+    blog_ids = getattr(instance, '_related_blog_ids', [])
+    if sender is BlogModel:
+        # These lists just lost an entry; recompute them to fill the gap
+        related.compute_related(blog_ids)
+    else:
+        related.refresh_related(blog_ids)
+
+
+# Keep this receiver last: it moves the loaded snapshot forward once every
+# other post_save handler has compared against it.
+@receiver(post_save, sender=BlogModel)
+def reset_loaded_state(sender, instance, **kwargs):
+    remember_loaded_state(sender, instance)
@@ -0,0 +1,88 @@
+import bisect
+import heapq
+import threading
+import time
+
+from django.db.models import Count
+
+from .caching import TAG_INDEX_GENERATION_KEY, TAG_INDEX_VERSION_KEY, aget_versions
+from .models import TagsModel
+
+# Full reload at least this often (seconds); it also refreshes the usage counts
+TAG_INDEX_MAX_AGE = 300
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+class TagIndex:
+    """
+    Every tag in this worker's memory, sorted by lower-cased name, with the
+    number of blogs using it.
+
+    A prefix is two bisects into the sorted keys, and the top ``limit``
+    matches by usage are picked from that slice, so autocomplete never runs
+    a LIKE query. Tags created since the last load are added on their own
+    when TAG_INDEX_VERSION_KEY moves; renames and deletions bump
+    TAG_INDEX_GENERATION_KEY, which reloads everything, as does
+    TAG_INDEX_MAX_AGE passing.
+    """
+
+    def __init__(self, max_age=TAG_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.versions = None
+            self.loaded_at = 0
+            self.last_id = 0
+            # sorted [(lower-cased name, id)] and {id: (name, usage)}, swapped as one
+            self.index = ([], {})
+
+    def _queryset(self, after_id=0):
+        return (TagsModel.objects.filter(id__gt=after_id).annotate(usage=Count('tags'))
+                .order_by('id').values_list('id', 'name', 'usage'))
+
+    def _apply(self, versions, rows, rebuild):
+        with self._lock:
+            if rebuild:
+                keys, tags = [], {}
+                self.last_id = 0
+            else:
+                # Copy on write: readers keep using the index they already hold
+                keys, tags = list(self.index[0]), dict(self.index[1])
+            for tag_id, name, usage in rows:
+                if tag_id not in tags:
+                    bisect.insort(keys, (name.lower(), tag_id))
+                tags[tag_id] = (name, usage)
+                self.last_id = max(self.last_id, tag_id)
+            if rebuild:
+                self.loaded_at = time.monotonic()
+            self.index, self.versions = (keys, tags), versions
+
+    async def arefresh(self):
+        versions = await aget_versions(TAG_INDEX_GENERATION_KEY, TAG_INDEX_VERSION_KEY)
+        rebuild = (self.versions is None or versions[0] != self.versions[0]
+                   or time.monotonic() - self.loaded_at >= self.max_age)
+        if rebuild:
+            self._apply(versions, [row async for row in self._queryset()], rebuild=True)
+        elif versions[1] != self.versions[1]:
+            self._apply(versions, [row async for row in self._queryset(self.last_id)], rebuild=False)
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """The ``limit`` most used tags whose name starts with ``prefix`` (any case)."""
+        keys, tags = self.index
+        prefix = prefix.lower()
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + '\U0010ffff',), lo=start)
+        best = heapq.nsmallest(limit, (tag_id for _, tag_id in keys[start:end]),
+                               key=lambda tag_id: (-tags[tag_id][1], tags[tag_id][0]))
+        return [{'id': tag_id, 'name': tags[tag_id][0], 'usage': tags[tag_id][1]} for tag_id in best]
+
+    async def acomplete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        await self.arefresh()
+        return self.complete(prefix, limit)
+
+
+tag_index = TagIndex()
@@ -1,3 +1,1189 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from blogHub.fast_serializers import FastSerializer
+from blogHub.utils import KeysetPagination
+from user.authentication import ClaimsRefreshToken
+from user.models import CustomUser, Profile
+from .models import BlogModel, CategoryModel, FollowModel, LikeModel, TagsModel, TimelineEntry
+from .directory import category_directory
+from . import jobs, notifications, related, trending
+from .models import Job, NotificationModel, RelatedBlog, TrendingBlog
+from .write_buffer import FOLLOW, LIKE, WRITERS, ToggleBuffer, toggle_buffer
+from .tag_index import tag_index
+from .benchmark import BenchmarkRunner, MixedScenario, Scenario, compare, default_scenarios, summarize
+from .serializers import (FastGetAllBlogSerializer, FastGetCategorySerializer,
+                          GetAllBlogSerializer, GetCategorySerializer)
+from .throttling import LocalCounterBackend, SlidingWindow, get_counter_backend
+
+
+# The throttle counters keep the shipped cache
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+               'throttle': settings.CACHES['throttle']}
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+class BlogHubTestCase(APITestCase):
+    """Shared fixtures: an admin, an author and a reader with a few blogs."""
+
+    def setUp(self):
+        cache.clear()
+        get_counter_backend().clear()
+        self.admin = CustomUser.objects.create_user(email='admin@bloghub.com', password='pass', user_type='admin')
+        self.author = CustomUser.objects.create_user(email='author@bloghub.com', password='pass', user_type='author')
+        self.reader = CustomUser.objects.create_user(email='reader@bloghub.com', password='pass')
+        self.seeded = 0
+        self.seed(1)
+
+    def seed(self, count):
+        """Add ``count`` published blogs, each with a fresh category and tag."""
+        for i in range(self.seeded, self.seeded + count):
+            category = CategoryModel.objects.create(name=f'category {i}')
+            tag = TagsModel.objects.create(name=f'tag {i}')
+            blog = BlogModel.objects.create(title=f'Blog {i}', content='content ' * 50,
+                                            status=1, author=self.author)
+            blog.categories.add(category)
+            blog.tags.add(tag)
+        self.seeded += count
+        return blog
+
+    def login(self, user, token_class=ClaimsRefreshToken):
+        self.logged_in = user, token_class
+        token = token_class.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+
+    def assertQueryBudget(self, budget, request, prepare=lambda: None, grow=5):
+        """
+        Run ``request`` before and after adding ``grow`` more blogs, categories
+        and tags; both runs must stay within the same fixed query budget.
+        ``prepare`` runs outside the counted block and its result is passed
+        to ``request``.
+        """
+        for _ in range(2):
+            cache.clear()
+            if getattr(self, 'logged_in', None):
+                # Clearing the cache dropped the user version the token was issued at
+                self.login(*self.logged_in)
+            argument = prepare()
+            with self.assertNumQueries(budget):
+                response = request(argument)
+            self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            self.seed(grow)
+        return response
+
+
+class CategoryQueryBudgetTests(BlogHubTestCase):
+
+    def test_list_categories(self):
+        self.login(self.reader)
+        self.assertQueryBudget(1, lambda _: self.client.get(reverse('category_api')))
+
+    def test_create_category(self):
+        self.login(self.admin)
+        names = iter(range(100))
+        self.assertQueryBudget(2, lambda name: self.client.post(reverse('category_api'), {'name': name}, format='json'),
+                               prepare=lambda: f'New {next(names)}')
+
+    def test_delete_category(self):
+        self.login(self.admin)
+        self.assertQueryBudget(9, lambda category_id: self.client.delete(
+            reverse('category_api') + f'?category_id={category_id}'),
+            prepare=lambda: CategoryModel.objects.last().id)
+
+
+class CategoryDirectoryTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(1, 13):
+            CategoryModel.objects.create(name=f'category {i}')
+        self.login(self.reader)
+
+    def test_list_is_served_from_memory(self):
+        url = reverse('category_api')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0], {'id': CategoryModel.objects.first().id,
+                                                       'name': 'category 0', 'blog_count': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CategoryModel.objects.create(name='added')
+        self.assertEqual(self.client.get(url, {'with_total': 1}).data['count'], 14)
+
+    def test_cursors_match_the_database(self):
+        url = reverse('category_api')
+        first = self.client.get(url, {'with_total': 1}).data
+        self.assertEqual(first['count'], 13)
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['name'] for row in second['results']], ['category 10', 'category 11', 'category 12'])
+        self.assertIsNone(second['next'])
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_name_resolution_without_a_query(self):
+        category_id = CategoryModel.objects.get(name='category 1').id
+        category_directory.rows()
+        with self.assertNumQueries(0):
+            self.assertEqual(category_directory.resolve(['Category 1', 'missing', '']), {'category 1': category_id})
+
+
+class TagAutocompleteTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tag_index.clear()
+        for name, uses in (('python', 3), ('Pytest', 1), ('pyramid', 0), ('django', 2)):
+            tag = TagsModel.objects.create(name=name)
+            for i in range(uses):
+                self.seed(1).tags.add(tag)
+        self.login(self.reader)
+
+    def complete(self, q, **params):
+        return [tag['name'] for tag in self.client.get(reverse('tag_autocomplete'), {'q': q, **params}).data['results']]
+
+    def test_most_used_first_without_a_query(self):
+        self.complete('py')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.complete('PY'), ['python', 'Pytest', 'pyramid'])
+        self.assertEqual(self.complete('py', limit=2), ['python', 'Pytest'])
+        self.assertEqual(self.complete('pyx'), [])
+
+    def test_prefix_is_required(self):
+        response = self.client.get(reverse('tag_autocomplete'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_new_tags_are_added_incrementally(self):
+        self.complete('py')
+        with self.captureOnCommitCallbacks(execute=True):
+            TagsModel.objects.create(name='pypy')
+        with self.assertNumQueries(1):
+            self.assertIn('pypy', self.complete('pyp'))
+
+    def test_renames_and_deletes_reload_the_index(self):
+        self.complete('py')
+        with self.captureOnCommitCallbacks(execute=True):
+            TagsModel.objects.filter(name='pyramid').get().delete()
+            tag = TagsModel.objects.get(name='Pytest')
+            tag.name = 'testing'
+            tag.save()
+        self.assertEqual(self.complete('py'), ['python'])
+        self.assertEqual(self.complete('test'), ['testing'])
+
+
+class RelatedBlogTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tags = [TagsModel.objects.create(name=f'shared {i}') for i in range(3)]
+        self.category = CategoryModel.objects.create(name='shared')
+        self.blogs = []
+        for i in range(5):
+            blog = BlogModel.objects.create(title=f'Related {i}', content='body', status=1, author=self.author)
+            self.blogs.append(blog)
+
+    def related(self, blog):
+        return [(row['title'], row['score']) for row in self.client.get(reverse('related_blogs', args=[blog.slug])).data['results']]
+
+    def table(self):
+        return sorted(RelatedBlog.objects.values_list('blog_id', 'related_id', 'score'))
+
+    def test_ranked_by_weighted_overlap_in_one_query(self):
+        first, second, third, fourth, _ = self.blogs
+        first.tags.add(*self.tags[:2])
+        first.categories.add(self.category)
+        second.tags.add(*self.tags[:2])
+        third.tags.add(self.tags[0])
+        fourth.categories.add(self.category)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.related(first), [('Related 1', 4), ('Related 2', 2), ('Related 3', 1)])
+        self.assertEqual(self.related(third), [('Related 1', 2), ('Related 0', 2)])
+
+    def test_status_changes_and_deletes(self):
+        first, second, third, _, _ = self.blogs
+        for blog in (first, second, third):
+            blog.tags.add(self.tags[0])
+
+        second.status = 0
+        second.save()
+        self.assertEqual(self.related(first), [('Related 2', 2)])
+        self.assertEqual(self.related(second), [])
+
+        second.status = 1
+        second.save()
+        third.delete()
+        self.assertEqual(self.related(first), [('Related 1', 2)])
+
+        self.tags[0].delete()
+        self.assertEqual(self.related(first), [])
+
+    def test_full_lists_skip_lower_scores(self):
+        first, second, third, _, _ = self.blogs
+        first.tags.add(*self.tags[:2])
+        second.tags.add(*self.tags[:2])
+        with mock.patch.object(related, 'RELATED_LENGTH', 1), \
+                mock.patch.object(related, 'trim_related', wraps=related.trim_related) as trim:
+            third.tags.add(self.tags[0])
+        # first and second each hold the other (4), so third (2) was never inserted into their lists
+        trim.assert_called_once_with(set())
+        self.assertEqual(self.related(first), [('Related 1', 4)])
+        self.assertEqual(self.related(third), [('Related 1', 2)])
+
+    def test_incremental_updates_match_a_rebuild(self):
+        blogs = self.blogs + [self.seed(1) for _ in range(3)]
+        tags = self.tags + list(TagsModel.objects.filter(name__startswith='tag '))
+        with mock.patch.object(related, 'RELATED_LENGTH', 2):
+            for i in range(40):
+                blog, tag = blogs[i * 7 % len(blogs)], tags[i * 5 % len(tags)]
+                if i % 3 == 2:
+                    blog.tags.remove(tag)
+                else:
+                    blog.tags.add(tag)
+                if i % 11 == 10:
+                    blog.categories.add(self.category)
+                if i % 13 == 12:
+                    self.category.categories.clear()
+            incremental = self.table()
+            self.assertGreater(len(incremental), 8)
+            out = StringIO()
+            call_command('rebuild_related', chunk_size=3, stdout=out)
+            self.assertEqual(self.table(), incremental)
+        self.assertIn('rebuilt for 9 blogs', out.getvalue())
+
+
+class TrendingTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        trending.trending_board.clear()
+        self.seed(2)
+        self.blogs = list(BlogModel.objects.order_by('id'))
+        self.readers = [CustomUser.objects.create_user(email=f'fan{i}@bloghub.com', password='pass') for i in range(3)]
+
+    def trending(self, **params):
+        return self.client.get(reverse('trending_blogs'), params).data['results']
+
+    def test_recent_likes_outrank_older_ones(self):
+        now = timezone.now()
+        two_half_lives_ago = now - timedelta(seconds=2 * trending.TRENDING_HALF_LIFE)
+        trending.apply_likes(added=[(self.blogs[0].id, two_half_lives_ago)] * 3 + [(self.blogs[1].id, now)])
+
+        results = self.trending()
+        self.assertEqual([row['title'] for row in results], ['Blog 1', 'Blog 0'])
+        self.assertAlmostEqual(results[0]['score'], 1, places=2)
+        self.assertAlmostEqual(results[1]['score'], 0.75, places=2)
+
+    def test_served_from_memory_between_reloads(self):
+        LikeModel.objects.create(reader=self.readers[0], blog=self.blogs[2])
+        self.trending()
+        with self.assertNumQueries(0):
+            self.assertEqual([row['title'] for row in self.trending()], ['Blog 2'])
+
+        LikeModel.objects.create(reader=self.readers[0], blog=self.blogs[1])
+        LikeModel.objects.create(reader=self.readers[1], blog=self.blogs[1])
+        self.assertEqual(len(self.trending()), 1)
+        trending.decay_trending()
+        self.assertEqual([(row['title'], row['like_count']) for row in self.trending()], [('Blog 1', 2), ('Blog 2', 1)])
+
+    def test_unlikes_and_decay_pass(self):
+        like = LikeModel.objects.create(reader=self.readers[0], blog=self.blogs[0])
+        LikeModel.objects.create(reader=self.readers[1], blog=self.blogs[1])
+        like.delete()
+        self.assertEqual(trending.decay_trending(), 1)
+        self.assertEqual([row['title'] for row in self.trending()], ['Blog 1'])
+
+        week_later = timezone.now() + timedelta(days=7)
+        self.assertEqual(trending.decay_trending(now=week_later), 1)
+        self.assertFalse(TrendingBlog.objects.exists())
+
+    def test_rebuild_matches_incremental_scores(self):
+        for reader in self.readers:
+            for blog in self.blogs[:reader.id % 3 + 1]:
+                LikeModel.objects.create(reader=reader, blog=blog)
+        LikeModel.objects.filter(reader=self.readers[0]).first().delete()
+        incremental = dict(TrendingBlog.objects.values_list('blog_id', 'log_score'))
+
+        out = StringIO()
+        call_command('decay_trending', rebuild=True, stdout=out)
+        rebuilt = dict(TrendingBlog.objects.values_list('blog_id', 'log_score'))
+        self.assertEqual(rebuilt.keys(), {blog_id for blog_id, score in incremental.items()
+                                          if score >= trending.log_floor()})
+        for blog_id, score in rebuilt.items():
+            self.assertAlmostEqual(incremental[blog_id], score, places=6)
+        self.assertIn(f'rebuilt for {len(rebuilt)} blogs', out.getvalue())
+
+
+@override_settings(WRITE_BUFFER={'FLUSH_INTERVAL': None, 'MAX_PENDING': 1000})
+class ToggleBufferTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(toggle_buffer.drain)
+        self.blog = BlogModel.objects.get()
+        self.login(self.reader)
+
+    def like(self, method='post'):
+        return getattr(self.client, method)(reverse('toggle_like', args=[self.blog.slug])).data
+
+    def test_likes_are_written_behind_and_read_back(self):
+        self.assertEqual(self.like(), {'liked': True, 'like_count': 1})
+        self.assertFalse(LikeModel.objects.exists())
+        self.assertEqual(self.like('get'), {'liked': True, 'like_count': 1})
+        self.like()
+        self.like()
+
+        self.assertEqual(toggle_buffer.flush(), 1)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 1)
+        self.assertTrue(LikeModel.objects.filter(reader=self.reader, blog=self.blog).exists())
+        self.assertTrue(TrendingBlog.objects.filter(blog=self.blog).exists())
+        self.assertEqual(self.like('get'), {'liked': True, 'like_count': 1})
+
+    def test_cancelling_toggles_write_nothing(self):
+        self.like()
+        self.assertEqual(self.like(), {'liked': False, 'like_count': 0})
+        self.assertEqual(toggle_buffer.flush(), 0)
+        self.assertFalse(LikeModel.objects.exists())
+
+    def test_flush_cost_does_not_grow_with_toggles(self):
+        LikeModel.objects.create(reader=self.admin, blog=self.blog)
+        for count in (5, 25):
+            readers = [CustomUser.objects.create_user(email=f'fan{count}-{i}@bloghub.com') for i in range(count)]
+            for reader in readers:
+                toggle_buffer.toggle(LIKE, reader.id, self.blog.id, False)
+            with self.assertNumQueries(9):
+                self.assertEqual(toggle_buffer.flush(), count)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 31)
+
+        for reader in readers:
+            toggle_buffer.toggle(LIKE, reader.id, self.blog.id, True)
+        self.assertEqual(toggle_buffer.flush(), 25)
+        self.blog.refresh_from_db()
+        self.assertEqual((self.blog.like_count, LikeModel.objects.count()), (6, 6))
+
+    def test_follows_update_counters_and_timelines(self):
+        url = reverse('toggle_follow', args=[self.author.id])
+        self.assertEqual(self.client.post(url).data, {'following': True, 'follower_count': 1})
+        toggle_buffer.flush()
+        self.assertEqual(Profile.objects.get(user=self.author).follower_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.reader).following_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(reader=self.reader).count(), 1)
+
+        self.assertEqual(self.client.post(url).data, {'following': False, 'follower_count': 0})
+        toggle_buffer.drain()
+        self.assertEqual(Profile.objects.get(user=self.author).follower_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(reader=self.reader).exists())
+
+        self.assertEqual(self.client.post(reverse('toggle_follow', args=[self.reader.id])).status_code, 400)
+        self.assertEqual(self.client.post(reverse('toggle_follow', args=[self.admin.id])).status_code, 404)
+
+    def test_a_deleted_target_does_not_block_the_batch(self):
+        gone = self.seed(1)
+        toggle_buffer.toggle(LIKE, self.reader.id, gone.id, False)
+        toggle_buffer.toggle(LIKE, self.admin.id, self.blog.id, False)
+        gone.delete()
+        self.assertEqual(toggle_buffer.flush(), 1)
+        self.assertEqual(len(toggle_buffer), 0)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 1)
+        self.assertEqual(list(LikeModel.objects.values_list('reader_id', 'blog_id')), [(self.admin.id, self.blog.id)])
+
+    def test_an_intent_toggled_during_the_flush_stays_visible(self):
+        other = ToggleBuffer()
+        toggle_buffer.toggle(LIKE, self.reader.id, self.blog.id, False)
+        write = WRITERS[LIKE]
+
+        def toggle_meanwhile(intents):
+            other.toggle(LIKE, self.reader.id, self.blog.id, True)
+            return write(intents)
+
+        with mock.patch.dict(WRITERS, {LIKE: toggle_meanwhile}):
+            toggle_buffer.flush()
+        self.assertFalse(toggle_buffer.state(LIKE, self.reader.id, self.blog.id, True))
+        other.flush()
+        self.assertFalse(LikeModel.objects.exists())
+
+    def test_latest_intent_wins_across_workers(self):
+        first, second = ToggleBuffer(), ToggleBuffer()
+        self.assertTrue(first.toggle(LIKE, self.reader.id, self.blog.id, False))
+        self.assertTrue(second.state(LIKE, self.reader.id, self.blog.id, False))
+        self.assertFalse(second.toggle(LIKE, self.reader.id, self.blog.id, False))
+        self.assertEqual(first.flush() + second.flush(), 0)
+        self.assertFalse(LikeModel.objects.exists())
+
+    @override_settings(WRITE_BUFFER={'FLUSH_INTERVAL': None, 'MAX_PENDING': 2})
+    def test_a_full_buffer_is_flushed_by_the_request(self):
+        toggle_buffer.toggle(FOLLOW, self.reader.id, self.author.id, False)
+        self.like()
+        self.assertEqual(len(toggle_buffer), 0)
+        self.assertEqual(FollowModel.objects.count() + LikeModel.objects.count(), 2)
+
+
+class JobQueueTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.draft = BlogModel.objects.create(title='Draft', content='body', status=0, author=self.author)
+        self.followers = [CustomUser.objects.create_user(email=f'follower{i}@bloghub.com') for i in range(5)]
+        for follower in self.followers:
+            FollowModel.objects.create(follower=follower, author=self.author)
+        Job.objects.all().delete()  # The seeded blog was published as it was created
+
+    def publish(self):
+        self.login(self.author)
+        return self.client.patch(reverse('change_blog_status'), {'blog_id': self.draft.id, 'status': 1}, format='json')
+
+    def test_publishing_queues_the_fan_out_and_notifications(self):
+        self.publish()
+        self.assertEqual(list(Job.objects.order_by('id').values_list('name', 'payload')),
+                         [('fan_out_timeline', {'blog_id': self.draft.id}),
+                          ('notify_followers', {'blog_id': self.draft.id})])
+        self.assertFalse(NotificationModel.objects.exists())
+        self.assertFalse(TimelineEntry.objects.filter(blog=self.draft).exists())
+
+        self.assertEqual(jobs.run_pending(), (2, 0))
+        self.assertEqual(set(NotificationModel.objects.values_list('recipient_id', flat=True)),
+                         {follower.id for follower in self.followers})
+        self.assertEqual(set(TimelineEntry.objects.filter(blog=self.draft).values_list('reader_id', flat=True)),
+                         {follower.id for follower in self.followers})
+        self.assertFalse(Job.objects.exists())
+
+    def test_large_audiences_continue_in_follow_up_jobs(self):
+        self.publish()
+        out = StringIO()
+        with mock.patch.object(notifications, 'NOTIFY_CHUNK_SIZE', 2), \
+                mock.patch('core.timeline.FANOUT_BATCH_SIZE', 2):
+            call_command('run_jobs', once=True, stdout=out)
+        self.assertIn('6 jobs done, 0 failed', out.getvalue())
+        self.assertEqual(NotificationModel.objects.filter(blog_post=self.draft).count(), 5)
+        self.assertEqual(TimelineEntry.objects.filter(blog=self.draft).count(), 5)
+
+        # Republishing never notifies anyone twice
+        BlogModel.objects.filter(pk=self.draft.pk).update(status=0)
+        self.publish()
+        jobs.run_pending()
+        self.assertEqual(NotificationModel.objects.count(), 5)
+
+    def test_failures_back_off_then_stop(self):
+        calls = []
+
+        @jobs.job('always_fails')
+        def always_fails(**payload):
+            calls.append(payload)
+            raise RuntimeError("boom")
+
+        failing = jobs.enqueue('always_fails', {'n': 1}, max_attempts=2)
+        self.assertEqual(jobs.run_pending(), (0, 1))
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (Job.QUEUED, 1))
+        self.assertGreater(failing.run_after, timezone.now())
+        self.assertEqual(jobs.run_pending(), (0, 0))
+
+        Job.objects.filter(pk=failing.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_pending(), (0, 1))
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, Job.FAILED)
+        self.assertIn('RuntimeError: boom', failing.last_error)
+        self.assertEqual(calls, [{'n': 1}, {'n': 1}])
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown')
+
+    def test_claims_are_exclusive_and_stale_claims_expire(self):
+        for blog in BlogModel.objects.all():
+            notifications.queue_publish_notifications(blog)
+        first = jobs.claim_jobs('first', batch_size=1)
+        second = jobs.claim_jobs('second', batch_size=5)
+        self.assertEqual(len(first) + len(second), 2)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(jobs.claim_jobs('third', batch_size=5), [])
+
+        later = timezone.now() + timedelta(seconds=jobs.get_job_queue_settings()['LOCK_TIMEOUT'] + 1)
+        self.assertEqual(jobs.requeue_stale_jobs(now=later), 2)
+        self.assertEqual(len(jobs.claim_jobs('third', batch_size=5, now=later)), 2)
+
+
+class BlogQueryBudgetTests(BlogHubTestCase):
+
+    def test_author_blog_list(self):
+        self.login(self.author)
+        self.assertQueryBudget(2, lambda _: self.client.get(reverse('get_all_blogs')))
+
+    def test_public_feed(self):
+        self.assertQueryBudget(2, lambda _: self.client.get(reverse('public_blogs')))
+
+    def test_single_blog_anonymous(self):
+        slug = BlogModel.objects.first().slug
+        self.assertQueryBudget(3, lambda _: self.client.get(reverse('get_single_blog', args=[slug])))
+
+    def test_single_blog_authenticated(self):
+        self.login(self.reader)
+        slug = BlogModel.objects.first().slug
+        self.assertQueryBudget(3, lambda _: self.client.get(reverse('get_single_blog', args=[slug])))
+
+    def test_create_blog(self):
+        self.login(self.author)
+        counter = iter(range(100))
+
+        def create(i):
+            return self.client.post(reverse('create_blog'), {
+                'blog_data': {'title': f'Created {i}', 'content': 'body', 'status': 0},
+                'category': ['category 0'],
+                'tags': ['tag 0', f'brand new {i}'],
+                'author': {'author_id': self.author.id},
+            }, format='json')
+        self.assertQueryBudget(22, create, prepare=lambda: next(counter))
+
+    def test_delete_blog(self):
+        self.login(self.author)
+        self.assertQueryBudget(13, lambda blog_id: self.client.delete(
+            reverse('delete_blog'), {'blog_id': blog_id}, format='json'),
+            prepare=lambda: BlogModel.objects.last().id)
+
+    def test_change_blog_status(self):
+        self.login(self.author)
+        blog_id = BlogModel.objects.first().id
+        self.assertQueryBudget(8, lambda _: self.client.patch(
+            reverse('change_blog_status'), {'blog_id': blog_id, 'status': 0}, format='json'),
+            prepare=lambda: BlogModel.objects.filter(id=blog_id).update(status=1))
+
+
+class BlogDetailCacheTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.blog = BlogModel.objects.first()
+        self.url = reverse('get_single_blog', args=[self.blog.slug])
+
+    def test_second_read_is_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['blogs']['title'], self.blog.title)
+
+    def test_save_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.content = 'edited'
+            self.blog.save()
+        self.assertEqual(self.client.get(self.url).data['blogs']['content'], 'edited')
+
+    def test_tag_change_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.tags.add(TagsModel.objects.create(name='fresh'))
+        names = [tag['name'] for tag in self.client.get(self.url).data['blogs']['tags']]
+        self.assertIn('fresh', names)
+
+    def test_category_rename_invalidates(self):
+        self.client.get(self.url)
+        category = self.blog.categories.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = 'renamed'
+            category.save()
+        self.assertEqual(self.client.get(self.url).data['blogs']['categories'], [{'name': 'renamed'}])
+
+    def test_unknown_slug(self):
+        response = self.client.get(reverse('get_single_blog', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.blog = BlogModel.objects.first()
+        self.url = reverse('get_single_blog', args=[self.blog.slug])
+
+    def test_blog_detail_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.content = 'edited'
+            self.blog.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_blog_detail_ignores_if_modified_since(self):
+        # updated_at misses tag and category changes, so only the ETag revalidates
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.tags.add(TagsModel.objects.create(name='fresh'))
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('fresh', [tag['name'] for tag in response.data['blogs']['tags']])
+
+    def test_public_feed(self):
+        url = reverse('public_blogs')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.categories.add(CategoryModel.objects.create(name='extra'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # Each page has its own validator; the anonymous throttle only allows three reads
+        get_counter_backend().clear()
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+    def test_category_list(self):
+        self.login(self.reader)
+        url = reverse('category_api')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):  # The token's claims stand in for the user lookup
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        category = CategoryModel.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            category.name = 'renamed'
+            category.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_slug_has_no_validators(self):
+        response = self.client.get(reverse('get_single_blog', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class AsyncReadPathTests(BlogHubTestCase):
+
+    def test_read_views_are_coroutines(self):
+        for name, args in (('get_single_blog', ['blog-0']), ('public_blogs', []), ('category_api', []), ('userinfo', [])):
+            view = resolve(reverse(name, args=args)).func
+            self.assertTrue(iscoroutinefunction(view), name)
+
+    async def test_async_client(self):
+        blog = await BlogModel.objects.afirst()
+        response = await self.async_client.get(reverse('get_single_blog', args=[blog.slug]))
+        self.assertEqual(response.json()['blogs']['title'], blog.title)
+        response = await self.async_client.get(reverse('public_blogs'))
+        self.assertEqual([row['id'] for row in response.json()['results']], [blog.id])
+
+        token = (await sync_to_async(RefreshToken.for_user)(self.reader)).access_token
+        response = await self.async_client.get(reverse('userinfo'), headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.json()['email'], self.reader.email)
+
+    def test_sync_handlers_still_work(self):
+        self.login(self.admin)
+        response = self.client.post(reverse('category_api'), {'name': 'Async'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(reverse('category_api')).data['results'][-1]['name'], 'async')
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer nonsense')
+        self.assertEqual(self.client.get(reverse('category_api')).status_code, 401)
+
+
+class CounterTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.blog = BlogModel.objects.first()
+        self.category = self.blog.categories.get()
+
+    def test_like_count(self):
+        like = LikeModel.objects.create(reader=self.reader, blog=self.blog)
+        LikeModel.objects.create(reader=self.admin, blog=self.blog)
+        like.delete()
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.like_count, 1)
+
+    def test_follow_counts(self):
+        FollowModel.objects.create(follower=self.reader, author=self.author)
+        self.assertEqual(Profile.objects.get(user=self.author).follower_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.reader).following_count, 1)
+        FollowModel.objects.get().delete()
+        self.assertEqual(Profile.objects.get(user=self.author).follower_count, 0)
+
+    def test_category_blog_count(self):
+        other = BlogModel.objects.create(title='Other', content='x', author=self.author)
+        other.categories.add(self.category)
+        self.category.categories.remove(other, self.blog)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.blog_count, 0)
+        other.categories.set([self.category])
+        self.blog.categories.add(self.category)
+        self.blog.delete()
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.blog_count, 1)
+
+    def test_recompute_repairs_drift(self):
+        LikeModel.objects.create(reader=self.reader, blog=self.blog)
+        BlogModel.objects.update(like_count=7)
+        CategoryModel.objects.update(blog_count=0)
+        call_command('recompute_counters', stdout=StringIO())
+        self.blog.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual((self.blog.like_count, self.category.blog_count), (1, 1))
+
+
+class ConstraintTests(BlogHubTestCase):
+
+    def test_clashing_titles_get_unique_slugs(self):
+        first = BlogModel.objects.create(title='Hello, world', content='x', author=self.author)
+        second = BlogModel.objects.create(title='Hello world!', content='x', author=self.author)
+        self.assertEqual((first.slug, second.slug), ('hello-world', 'hello-world-2'))
+
+    def test_duplicate_like_and_follow_are_rejected(self):
+        blog = BlogModel.objects.first()
+        LikeModel.objects.create(reader=self.reader, blog=blog)
+        FollowModel.objects.create(follower=self.reader, author=self.author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LikeModel.objects.create(reader=self.reader, blog=blog)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FollowModel.objects.create(follower=self.reader, author=self.author)
+
+
+class BlogSearchTests(BlogHubTestCase):
+
+    def create_blogs(self):
+        python = CategoryModel.objects.create(name='python')
+        django = BlogModel.objects.create(title='Django signals', status=1, author=self.author,
+                                          content='Signals let decoupled apps get notified when models change.')
+        django.categories.add(python)
+        BlogModel.objects.create(title='Cooking', status=1, author=self.author,
+                                 content='A recipe that never mentions web frameworks or signals.')
+        BlogModel.objects.create(title='Signals draft', content='signals', author=self.author)
+        return django
+
+    def search(self, query):
+        return self.client.get(reverse('search_blogs') + query).data['results']
+
+    def assertSearchBehaviour(self):
+        django = self.create_blogs()
+        results = self.search('?q=signals')
+        self.assertEqual([r['title'] for r in results], ['Django signals', 'Cooking'])
+        self.assertIn('<b>', results[0]['snippet'])
+        self.assertEqual([r['id'] for r in self.search('?q=signals&category=python')], [django.id])
+        self.assertEqual([r['id'] for r in self.search('?q=decoupled noti')], [django.id])
+
+        django.content = 'Rewritten without the keyword.'
+        django.title = 'Django'
+        django.save()
+        self.assertEqual([r['title'] for r in self.search('?q=signals')], ['Cooking'])
+        self.assertEqual(self.search('?q="OR) NEAR('), [])
+
+    def assertSnippetEscaped(self, title):
+        BlogModel.objects.create(title=title, status=1, author=self.author,
+                                 content='<script>alert(1)</script> mentions signals')
+        [result] = self.search('?q=signals')
+        self.assertNotIn('<script>', result['snippet'])
+        self.assertIn('&lt;script&gt;', result['snippet'])
+        self.assertIn('<b>signals</b>', result['snippet'])
+
+    def test_snippets_are_escaped(self):
+        self.assertSnippetEscaped('Unsafe')
+        with mock.patch('core.search.uses_fts', return_value=False):
+            self.assertSnippetEscaped('Unsafe too')
+
+    def test_fts5_search(self):
+        self.assertSearchBehaviour()
+
+    def test_inverted_index_fallback(self):
+        with mock.patch('core.search.uses_fts', return_value=False):
+            self.assertSearchBehaviour()
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(reverse('search_blogs')).status_code, 400)
+
+
+class TimelineTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        FollowModel.objects.create(follower=self.reader, author=self.author)
+        self.login(self.reader)
+
+    def publish(self, title):
+        blog = BlogModel.objects.create(title=title, content='x', status=1, author=self.author)
+        jobs.run_pending()
+        return blog
+
+    def timeline_titles(self):
+        return [blog['title'] for blog in self.client.get(reverse('timeline')).data['results']]
+
+    def test_follow_backfills_and_publish_fans_out(self):
+        self.publish('Fresh')
+        self.assertEqual(self.timeline_titles(), ['Fresh', 'Blog 0'])
+
+    def test_unpublish_and_unfollow_remove_entries(self):
+        blog = self.publish('Fresh')
+        blog.status = 0
+        blog.save()
+        self.assertEqual(self.timeline_titles(), ['Blog 0'])
+        FollowModel.objects.get().delete()
+        self.assertEqual(self.timeline_titles(), [])
+
+    def test_timelines_are_trimmed(self):
+        with mock.patch('core.timeline.TIMELINE_LENGTH', 2):
+            for i in range(3):
+                self.publish(f'Fresh {i}')
+        self.assertEqual(TimelineEntry.objects.filter(reader=self.reader).count(), 2)
+        self.assertEqual(self.timeline_titles(), ['Fresh 2', 'Fresh 1'])
+
+    def test_popular_authors_are_merged_on_read(self):
+        with mock.patch('core.timeline.TIMELINE_FANOUT_LIMIT', 0):
+            self.publish('Fresh')
+            self.assertFalse(TimelineEntry.objects.filter(blog__title='Fresh').exists())
+            self.assertEqual(self.timeline_titles(), ['Fresh', 'Blog 0'])
+
+    def test_query_budget(self):
+        self.assertQueryBudget(3, lambda _: self.client.get(reverse('timeline')),
+                               prepare=lambda: self.publish(f'Fresh {TimelineEntry.objects.count()}'))
+
+
+class BlogAccessThrottleTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('get_single_blog', args=[BlogModel.objects.first().slug])
+
+    def assertLimit(self, limit):
+        for _ in range(limit):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_unregistered_limit(self):
+        self.assertLimit(3)
+
+    def test_shipped_counter_cache_is_atomic_and_never_culled(self):
+        # TEST_CACHES keeps the shipped throttle cache; only 'default' is swapped
+        backend = get_counter_backend()
+        self.assertIs(backend.cache, caches['throttle'])
+        self.assertIsNot(backend.cache, cache)
+
+        def hit():
+            for _ in range(50):
+                backend.incr('race', 60)
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(backend.get('race'), 400)
+
+        self.assertLimit(3)
+        for i in range(600):
+            backend.incr(f'other client {i}', 60)
+            cache.set(f'unrelated {i}', i)
+        self.assertEqual(self.client.get(self.url).status_code, 429)
+
+    @override_settings(BLOG_ACCESS_THROTTLE={'CACHE_ALIAS': 'default'},
+                       CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'unused_cache_table'}})
+    def test_a_cache_without_atomic_incr_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_counter_backend()
+
+    def test_free_limit(self):
+        self.login(self.reader)
+        self.assertLimit(10)
+
+    def test_paid_users_are_not_limited(self):
+        Profile.objects.filter(user=self.reader).update(is_paid=True)
+        self.login(CustomUser.objects.get(pk=self.reader.pk))
+        for _ in range(15):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(BLOG_ACCESS_THROTTLE={'BACKEND': 'cache', 'WINDOW': 'sliding'})
+    def test_shared_sliding_window(self):
+        self.assertLimit(3)
+
+    @override_settings(BLOG_ACCESS_THROTTLE={'BACKEND': 'local'})
+    def test_per_process_counters_opt_in(self):
+        get_counter_backend().clear()
+        self.assertLimit(3)
+
+    def test_sliding_window_weighs_previous_window(self):
+        window = SlidingWindow(LocalCounterBackend(), duration=100)
+        for _ in range(4):
+            window.hit('key', 4, now=150)
+        # A quarter into the next window, 75% of the previous 4 hits still count
+        self.assertEqual(window.hit('key', 4, now=225), (True, 0))
+        allowed, wait = window.hit('key', 4, now=225)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 25)
+
+
+class SeedDataTests(BlogHubTestCase):
+
+    def test_seeds_consistent_data(self):
+        call_command('seed_data', readers=6, authors=2, blogs_per_author=3, categories=2, tags=4,
+                     likes_per_blog=2, follows_per_reader=1, draft_ratio=0, stdout=StringIO())
+        self.assertEqual(CustomUser.objects.filter(email__startswith='bench-').count(), 9)
+        self.assertEqual(Profile.objects.filter(user__email__startswith='bench-').count(), 9)
+        blogs = BlogModel.objects.filter(title__startswith='bench ')
+        self.assertEqual(blogs.count(), 6)
+        self.assertEqual(LikeModel.objects.count(), 12)
+        # Derived data matches what the signals would have produced
+        self.assertEqual(sum(blogs.values_list('like_count', flat=True)), 12)
+        self.assertEqual(sum(CategoryModel.objects.filter(name__startswith='bench-')
+                             .values_list('blog_count', flat=True)), 12)
+        self.assertEqual(TimelineEntry.objects.count(), 6 * 3)
+        self.assertTrue(self.client.get(reverse('search_blogs'), {'q': 'the'}).data['results'])
+
+    def test_rerun_requires_clear(self):
+        options = dict(readers=2, authors=1, blogs_per_author=1, stdout=StringIO())
+        call_command('seed_data', **options)
+        with self.assertRaises(CommandError):
+            call_command('seed_data', **options)
+        call_command('seed_data', clear=True, **options)
+        self.assertEqual(BlogModel.objects.filter(title__startswith='bench ').count(), 1)
+
+
+class BenchmarkReportTests(SimpleTestCase):
+
+    def test_summary(self):
+        samples = [(200, ms / 1000, 3) for ms in range(1, 101)] + [(500, 0.2, None)]
+        stats = summarize(samples, elapsed=2)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['statuses'], {'200': 100, '500': 1})
+        self.assertEqual(stats['throughput_rps'], 50.5)
+        self.assertEqual(stats['latency_ms']['p50'], 51)
+        self.assertEqual(stats['latency_ms']['p99'], 100)
+        self.assertEqual(stats['queries_per_request'], {'mean': 3, 'max': 3})
+
+    def test_compare(self):
+        stats = summarize([(200, 0.01, 2)] * 10, elapsed=1)
+        baseline = {'scenarios': {'feed': {'c1': stats}}}
+        self.assertEqual(compare(baseline, baseline), [])
+        slower = summarize([(200, 0.02, 3)] * 10, elapsed=2)
+        regressions = compare(baseline, {'scenarios': {'feed': {'c1': slower}}})
+        self.assertEqual(len(regressions), 3)
+
+    def test_mixed_scenario_reports_each_part(self):
+        login = Scenario('login', lambda f, i, item: ('post', '/login', {'item': item}),
+                         prepare=lambda f, total: [f'token {n}' for n in range(total)])
+        read = Scenario('read', lambda f, i, item: ('get', '/read', {}))
+        mixed = MixedScenario('storm', [(login, 1), (read, 2)])
+        runner = BenchmarkRunner('http://testserver', [mixed], concurrency=(2,), requests=6)
+        sent = []
+        runner.send = lambda method, path, kwargs: sent.append((path, kwargs)) or (200, 0.01, None)
+        report = runner.run(fixtures=None)
+        self.assertEqual(sorted(report['scenarios']), ['storm.login', 'storm.read'])
+        self.assertEqual(report['scenarios']['storm.login']['c2']['requests'], 2)
+        self.assertEqual(report['scenarios']['storm.read']['c2']['requests'], 4)
+        self.assertEqual(sorted(kwargs['item'] for path, kwargs in sent if path == '/login'), ['token 0', 'token 1'])
+
+    def test_every_route_has_a_scenario(self):
+        from core.urls import urlpatterns as core_urls
+        from user.urls import urlpatterns as user_urls
+        user = mock.Mock(pk=1)
+        fixtures = mock.Mock(prefix='bench', run_id='1', admin=user, author=user, reader=user, paid_reader=user,
+                             slugs=['a-blog'], blog_ids=[1], categories=['bench-0'])
+        fixtures.token.return_value = 'token'
+        routes = {resolve(scenario.build(fixtures, 0, None)[1]).url_name
+                  for scenario in default_scenarios() if isinstance(scenario, Scenario)}
+        self.assertEqual(routes, {pattern.name for pattern in core_urls + user_urls})
+
+
+class FastSerializerTests(BlogHubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.seed(3)
+        blog = BlogModel.objects.create(title='Many categories', content='x', status=0, author=self.author)
+        blog.categories.set(CategoryModel.objects.all())
+        BlogModel.objects.create(title='No categories', content='x', author=self.author)
+
+    def assertSameBytes(self, queryset, serializer_class, fast, prefetch=()):
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer_class(queryset.prefetch_related(*prefetch), many=True).data)
+        self.assertEqual(renderer.render(fast.serialize(fast.values(queryset))), expected)
+        return expected
+
+    def test_blog_list_is_byte_identical(self):
+        self.assertSameBytes(BlogModel.objects.order_by('-created_at', '-id'),
+                             GetAllBlogSerializer, FastGetAllBlogSerializer, prefetch=['categories'])
+        with timezone.override('Asia/Kolkata'):
+            rendered = self.assertSameBytes(BlogModel.objects.order_by('id'),
+                                            GetAllBlogSerializer, FastGetAllBlogSerializer, prefetch=['categories'])
+        self.assertIn(b'+05:30', rendered)
+
+    def test_category_list_is_byte_identical(self):
+        self.assertSameBytes(CategoryModel.objects.order_by('id'), GetCategorySerializer, FastGetCategorySerializer)
+
+    def test_empty_page(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(FastGetAllBlogSerializer.serialize(FastGetAllBlogSerializer.values(BlogModel.objects.none())), [])
+
+    def test_unsupported_fields_are_rejected(self):
+        class WithMethod(GetAllBlogSerializer):
+            author = serializers.SerializerMethodField()
+
+            class Meta(GetAllBlogSerializer.Meta):
+                fields = GetAllBlogSerializer.Meta.fields + ['author']
+
+        with self.assertRaises(ImproperlyConfigured):
+            FastSerializer(WithMethod).compile()
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_serializers', page_sizes='5', repeat=1, stdout=out)
+        self.assertIn('blogs', out.getvalue())
+
+
+class BlogImportTests(BlogHubTestCase):
+
+    def rows(self, count, prefix='Imported'):
+        return [{'title': f'{prefix} {i}', 'content': f'body {i}', 'status': 1,
+                 'category': ['category 0'], 'tags': [f'{prefix} tag {i % 3}', 'imported'],
+                 'author_id': self.author.id} for i in range(count)]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.login(self.admin)
+        # The only extra queries for the larger import are the related blog entries, inserted in batches
+        for prefix, count, budget in (('Small', 5, 23), ('Large', 50, 25)):
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(budget):
+                response = self.client.post(reverse('import_blogs'), self.rows(count, prefix), format='json')
+            self.assertEqual(response.data, {'created': count, 'errors': []})
+        category = CategoryModel.objects.get(name='category 0')
+        self.assertEqual(category.blog_count, 56)
+        self.assertEqual(TagsModel.objects.get(name='imported').tags.count(), 55)
+
+    def test_ndjson_with_row_errors(self):
+        self.login(self.admin)
+        rows = self.rows(3)
+        rows[1]['title'] = 'Blog 0'
+        body = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n'
+        response = self.client.post(reverse('import_blogs'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4])
+        found = self.client.get(reverse('search_blogs') + '?q=body').data['results']
+        self.assertEqual(sorted(r['title'] for r in found), ['Imported 0', 'Imported 2'])
+
+    def test_admin_only(self):
+        self.login(self.author)
+        response = self.client.post(reverse('import_blogs'), self.rows(1), format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ContentDerivativeTests(BlogHubTestCase):
+
+    def test_computed_on_save(self):
+        blog = BlogModel.objects.create(title='Rendered', author=self.author,
+                                        content='<script>alert(1)</script> see https://example.com\n\n' + 'word ' * 450)
+        blog.refresh_from_db()
+        self.assertEqual(blog.word_count, 453)
+        self.assertEqual(blog.reading_time, 3)
+        self.assertTrue(blog.excerpt.startswith('alert(1) see https://example.com word'))
+        self.assertTrue(blog.excerpt.endswith('…'))
+        self.assertIn('&lt;script&gt;', blog.content_html)
+        self.assertNotIn('<script>', blog.content_html)
+        self.assertIn('rel="nofollow"', blog.content_html)
+
+    def test_update_fields_with_content(self):
+        blog = BlogModel.objects.get(title='Blog 0')
+        blog.content = 'short body'
+        blog.save(update_fields=['content'])
+        blog.refresh_from_db()
+        self.assertEqual((blog.excerpt, blog.word_count, blog.reading_time), ('short body', 2, 1))
+
+    def test_deferred_content_is_left_alone(self):
+        blog = BlogModel.objects.defer('content').get(title='Blog 0')
+        blog.status = 0
+        blog.save(update_fields=['status'])
+        self.assertEqual(BlogModel.objects.get(pk=blog.pk).word_count, 50)
+
+    def test_computed_on_import(self):
+        self.login(self.admin)
+        self.client.post(reverse('import_blogs'), [{'title': 'Imported', 'content': 'one two three',
+                                                    'author_id': self.author.id}], format='json')
+        blog = BlogModel.objects.get(title='Imported')
+        self.assertEqual((blog.excerpt, blog.word_count, blog.content_html), ('one two three', 3, '<p>one two three</p>'))
+
+    def test_lists_do_not_load_the_body(self):
+        for url, user in ((reverse('public_blogs'), self.reader), (reverse('get_all_blogs'), self.author)):
+            self.login(user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.data['results'][0]['reading_time'], 1)
+            blog_queries = [q['sql'] for q in queries if 'FROM "core_blogmodel"' in q['sql']]
+            self.assertTrue(blog_queries)
+            for sql in blog_queries:
+                self.assertNotIn('"core_blogmodel"."content', sql)
+
+
+class KeysetPaginationTests(BlogHubTestCase):
+
+    def test_walks_every_blog_once(self):
+        self.seed(24)
+        seen = []
+        url = reverse('public_blogs')
+        while url:
+            data = self.client.get(url).data
+            seen += [blog['id'] for blog in data['results']]
+            url = data['next']
+        self.assertEqual(sorted(seen, reverse=True), seen)
+        self.assertEqual(len(set(seen)), BlogModel.objects.filter(status=1).count())
+
+    def test_page_size_is_bounded(self):
+        self.seed(60)
+        data = self.client.get(reverse('public_blogs') + '?page_size=1000').data
+        self.assertEqual(len(data['results']), 50)
+
+    def test_drafts_are_not_public(self):
+        draft = BlogModel.objects.create(title='Draft', content='x', author=self.author)
+        ids = [blog['id'] for blog in self.client.get(reverse('public_blogs')).data['results']]
+        self.assertNotIn(draft.id, ids)
+
+
+    def test_tampered_cursors_are_not_found(self):
+        feed = KeysetPagination(('-created_at', '-id'))
+        for position in (['yesterday', 1], ['2024-01-01T00:00:00+00:00', 'one'], [None, 1],
+                         [{'a': 1}, [2]], ['2024-01-01T00:00:00+00:00']):
+            get_counter_backend().clear()
+            response = self.client.get(reverse('public_blogs'), {'cursor': feed.encode_cursor(position)})
+            self.assertEqual(response.status_code, 404, position)
+
+        self.login(self.reader)
+        categories = KeysetPagination(('id',))
+        for position in (['1'], [None], [[1]]):
+            response = self.client.get(reverse('category_api'), {'cursor': categories.encode_cursor(position)})
+            # The category view answers every error with a 400
+            self.assertEqual(response.data, {'Error': 'Invalid cursor'}, position)
+
+
+class QueryBudgetMiddlewareTests(BlogHubTestCase):
+
+    def test_headers_absent_by_default(self):
+        response = self.client.get(reverse('public_blogs'))
+        self.assertNotIn('X-DB-Query-Count', response)
+
+    @override_settings(QUERY_INSTRUMENTATION=True)
+    def test_reports_queries_in_headers(self):
+        client = self.client_class()
+        with self.assertLogs('blogHub.queries', level='INFO') as logs:
+            response = client.get(reverse('public_blogs'))
+        self.assertEqual(response['X-DB-Query-Count'], '2')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertIn('"queries": 2', logs.output[0])
@@ -1,63 +1,241 @@
-from rest_framework.throttling import BaseThrottle
-from rest_framework.exceptions import Throttled
-from django.core.cache import cache
+import threading
 import time
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from user.models import Profile
+
+ONE_MONTH = 30 * 24 * 60 * 60  # seconds in a month
+
+DEFAULT_THROTTLE_SETTINGS = {
+    # 'cache' keeps the counters in the CACHE_ALIAS cache, which must have an
+    # atomic incr (see ATOMIC_CACHES); every worker agrees when it is shared
+    # (Redis/Memcached). 'local' opts in to this process' memory only.
+    'BACKEND': 'cache',
+    'CACHE_ALIAS': 'throttle',
+    # 'fixed' resets at the window boundary; 'sliding' weighs in the previous window
+    'WINDOW': 'fixed',
+    'DURATION': ONE_MONTH,
+    'RATES': {
+        'unregistered': 3,
+        'free': 10,
+        'paid': None,  # No limit for paid users
+    },
+}
+
+
+def get_throttle_settings():
+    return {**DEFAULT_THROTTLE_SETTINGS, **getattr(settings, 'BLOG_ACCESS_THROTTLE', {})}
+
+
+# Counter backends ----------------------------------------------------------
+
+class LocalCounterBackend:
+    """Expiring counters in this process' memory, guarded by a lock."""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, ttl, delta=1):
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._counters.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + ttl
+            value += delta
+            self._counters[key] = (value, expires)
+            if len(self._counters) > 10000:
+                self._evict(now)
+            return value
+
+    def get(self, key):
+        value, expires = self._counters.get(key, (0, 0))
+        return value if expires > time.monotonic() else 0
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+    def _evict(self, now):
+        for key in [key for key, (_, expires) in self._counters.items() if expires <= now]:
+            del self._counters[key]
+
+
+# Caches whose incr is a single atomic operation. BaseCache.incr (file,
+# database) is a get then a set, which loses concurrent hits.
+ATOMIC_CACHES = (RedisCache, BaseMemcachedCache, LocMemCache)
+
+
+class CacheCounterBackend:
+    """
+    Counters in a Django cache with an atomic ``incr``: shared by every
+    worker with Redis or Memcached, per process with LocMemCache. Any other
+    cache is refused, as are the counters of a cache that culls them.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+        if not isinstance(self.cache, ATOMIC_CACHES):
+            raise ImproperlyConfigured(
+                f"The throttle cache {alias!r} ({type(self.cache).__name__}) has no atomic incr; "
+                f"use Redis, Memcached or LocMemCache")
+
+    def incr(self, key, ttl, delta=1):
+        if delta > 0 and self.cache.add(key, delta, timeout=ttl):
+            return delta
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # Expired between add() and incr(); start a fresh window
+            self.cache.add(key, 0, timeout=ttl)
+            return self.cache.incr(key, delta)
+
+    def get(self, key):
+        return self.cache.get(key, 0)
+
+    def clear(self):
+        self.cache.clear()
+
+
+_local_backend = LocalCounterBackend()
+
+
+def get_counter_backend(config=None):
+    config = config or get_throttle_settings()
+    if config['BACKEND'] == 'cache':
+        return CacheCounterBackend(config['CACHE_ALIAS'])
+    return _local_backend
+
+
+# Window strategies ---------------------------------------------------------
+
+class FixedWindow:
+    """At most ``limit`` hits per aligned window of ``duration`` seconds."""
+
+    def __init__(self, backend, duration):
+        self.backend = backend
+        self.duration = duration
+
+    def hit(self, key, limit, now):
+        """Count a hit; return (allowed, seconds until a retry could succeed)."""
+        window = int(now // self.duration)
+        counter_key = f'{key}:{window}'
+        count = self.backend.incr(counter_key, self.duration)
+        if count <= limit:
+            return True, 0
+        self.backend.incr(counter_key, self.duration, -1)  # A refused hit does not count
+        return False, (window + 1) * self.duration - now
+
+
+class SlidingWindow(FixedWindow):
+    """
+    Sliding window counter: the previous window's count is weighted by how
+    much of it still overlaps the last ``duration`` seconds.
+    """
+
+    def hit(self, key, limit, now):
+        window, elapsed = divmod(now, self.duration)
+        window = int(window)
+        counter_key = f'{key}:{window}'
+        current = self.backend.incr(counter_key, 2 * self.duration)
+        previous = self.backend.get(f'{key}:{window - 1}')
+        overlap = 1 - elapsed / self.duration
+        if previous * overlap + current <= limit:
+            return True, 0
+
+        self.backend.incr(counter_key, 2 * self.duration, -1)
+        current -= 1
+        # The retried hit itself must fit too, hence the "- 1" below
+        if current + 1 > limit:
+            # Wait for this window to become the previous one and decay enough
+            return False, (self.duration - elapsed) + (1 - (limit - 1) / max(current, 1)) * self.duration
+        # Wait for the previous window to decay below the remaining allowance
+        needed_overlap = (limit - current - 1) / previous
+        return False, max((1 - needed_overlap) * self.duration - elapsed, 0)
+
+
+WINDOWS = {
+    'fixed': FixedWindow,
+    'sliding': SlidingWindow,
+}
+
+
+def get_user_tier(user):
+    """Unregistered, free or paid; from the token claims, else the profile read at most once per user object."""
+    if not user.is_authenticated:
+        return 'unregistered'
+    is_paid = getattr(user, 'is_paid', None)
+    if is_paid is None:
+        is_paid = user.profile.is_paid
+    return 'paid' if is_paid else 'free'
+
+
+async def aget_user_tier(user):
+    if (user.is_authenticated and getattr(user, 'is_paid', None) is None
+            and not type(user).profile.related.is_cached(user)):
+        user.profile = await Profile.objects.aget(user_id=user.id)
+    return get_user_tier(user)
+
+
 class BlogAccessThrottle(BaseThrottle):
-    def get_cache_key(self, request, view):
-        # Determine user type: Unregistered, Free, or Paid
-        if request.user.is_authenticated:
-            user_type = "paid" if request.user.profile.is_paid else "free"
-        else:
-            user_type = "unregistered"
+    messages = {
+        'unregistered': "Access limit reached for unregistered users. Please register to get more access.",
+        'free': "Access limit reached for free users. Upgrade to a paid plan for unlimited access.",
+    }
 
+    def get_cache_key(self, request, view, user_type=None):
         # Use the user's ID or IP for anonymous users as the cache key
+        user_type = user_type or get_user_tier(request.user)
         return f"blog_access_{user_type}_{request.user.id if request.user.is_authenticated else self.get_ident(request)}"
 
+    def get_window(self, user_type):
+        """Return (window, limit), or None when the tier is not limited."""
+        config = get_throttle_settings()
+        limit = config['RATES'].get(user_type)
+        if limit is None:
+            return None
+        return WINDOWS[config['WINDOW']](get_counter_backend(config), config['DURATION']), limit
+
     def allow_request(self, request, view):
-        cache_key = self.get_cache_key(request, view)
-
-        # Limits for different user types
-        limits = {
-            "unregistered": 3,
-            "free": 10,
-            "paid": float('inf'),  # No limit for paid users
-        }
-
-        # Determine user type
-        if request.user.is_authenticated:
-            user_type = "paid" if request.user.profile.is_paid else "free"
-        else:
-            user_type = "unregistered"
+        user_type = get_user_tier(request.user)
+        rate = self.get_window(user_type)
 
         # Paid users are always allowed
-        if user_type == "paid":
+        if rate is None:
             return True
 
-        # Get access count from the cache
-        access_data = cache.get(cache_key, (0, time.time()))
-        access_count, first_access_time = access_data
+        window, limit = rate
+        allowed, self._wait = window.hit(self.get_cache_key(request, view, user_type), limit, time.time())
+        return allowed or self.throttle_failure(user_type)
 
-        # Reset count if a month has passed
-        one_month = 30 * 24 * 60 * 60  # seconds in a month
-        if time.time() - first_access_time > one_month:
-            access_count = 0
-            first_access_time = time.time()
-
-        # Check if access count exceeds the limit
-        if access_count < limits[user_type]:
-            # Increment the count and save to the cache
-            cache.set(cache_key, (access_count + 1, first_access_time), timeout=one_month)
+    async def aallow_request(self, request, view):
+        """allow_request for AsyncAPIView; only a shared cache backend leaves the event loop."""
+        user_type = await aget_user_tier(request.user)
+        rate = self.get_window(user_type)
+        if rate is None:
             return True
-        
-        # Raise a Throttled exception with a custom message
-        if user_type == "unregistered":
-            raise Throttled(detail="Access limit reached for unregistered users. Please register to get more access.")
-        elif user_type == "free":
-            raise Throttled(detail="Access limit reached for free users. Upgrade to a paid plan for unlimited access.")
+
+        window, limit = rate
+        key = self.get_cache_key(request, view, user_type)
+        if isinstance(window.backend, LocalCounterBackend):
+            allowed, self._wait = window.hit(key, limit, time.time())
         else:
-            raise Throttled(detail="Request limit exceeded.")
-        
-        
+            allowed, self._wait = await sync_to_async(window.hit, thread_sensitive=False)(key, limit, time.time())
+        return allowed or self.throttle_failure(user_type)
+
+    def throttle_failure(self, user_type):
+        # Raise a Throttled exception with a custom message; DRF turns wait into Retry-After
+        raise Throttled(wait=self._wait,
+                        detail=self.messages.get(user_type, "Request limit exceeded."))
 
-    
\ No newline at end of file
+    def wait(self):
+        return getattr(self, '_wait', None)
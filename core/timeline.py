@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from blogHub.utils import KeysetPagination
+from user.models import Profile
+from .content import BODY_FIELDS
+from .jobs import enqueue, job
+from .models import BlogModel, FollowModel, TimelineEntry
+from .serializers import GetAllBlogSerializer
+
+# Entries kept per reader; older ones are trimmed on every fan-out
+TIMELINE_LENGTH = getattr(settings, 'TIMELINE_LENGTH', 500)
+# Authors with more followers than this are not fanned out on write; their
+# blogs are merged into each reader's timeline at read time instead.
+TIMELINE_FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 5000)
+FANOUT_BATCH_SIZE = 1000
+TIMELINE_ORDERING = ('-created_at', '-blog_id')
+
+
+def is_fanout_on_read(author_id):
+    follower_count = Profile.objects.filter(user_id=author_id).values_list('follower_count', flat=True).first()
+    return (follower_count or 0) > TIMELINE_FANOUT_LIMIT
+
+
+def trim_timelines(reader_ids):
+    """Drop everything past the newest TIMELINE_LENGTH entries of each reader."""
+    ranked = (TimelineEntry.objects.filter(reader_id__in=reader_ids)
+              .annotate(position=Window(RowNumber(), partition_by=F('reader_id'),
+                                        order_by=[F('created_at').desc(), F('blog_id').desc()]))
+              .filter(position__gt=TIMELINE_LENGTH)
+              .values_list('id', flat=True))
+    stale = list(ranked)
+    for start in range(0, len(stale), FANOUT_BATCH_SIZE):
+        TimelineEntry.objects.filter(id__in=stale[start:start + FANOUT_BATCH_SIZE]).delete()
+
+
+def queue_fan_out(blog):
+    """Called when ``blog`` gets published; the job worker pushes it into the followers' timelines."""
+    enqueue('fan_out_timeline', {'blog_id': blog.pk})
+
+
+@job('fan_out_timeline')
+def fan_out_timeline(blog_id, after_follower_id=0):
+    """
+    Push a newly published blog into the timelines of the next
+    FANOUT_BATCH_SIZE followers of its author, by follower id, and queue
+    the rest as another job.
+    """
+    blog = BlogModel.objects.filter(pk=blog_id, status=1).only('id', 'author_id', 'created_at').first()
+    if blog is None or is_fanout_on_read(blog.author_id):
+        return  # Deleted or unpublished since, or merged on read
+
+    follower_ids = list(FollowModel.objects.filter(author_id=blog.author_id, follower_id__gt=after_follower_id)
+                        .order_by('follower_id').values_list('follower_id', flat=True)[:FANOUT_BATCH_SIZE])
+    if follower_ids:
+        _push(blog, follower_ids)
+    if len(follower_ids) == FANOUT_BATCH_SIZE:
+        enqueue('fan_out_timeline', {'blog_id': blog_id, 'after_follower_id': follower_ids[-1]})
+
+
+def _push(blog, reader_ids):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(reader_id=reader_id, blog_id=blog.pk, author_id=blog.author_id, created_at=blog.created_at)
+         for reader_id in reader_ids],
+        ignore_conflicts=True,
+    )
+    trim_timelines(reader_ids)
+
+
+def remove_blog(blog):
+    """Take an unpublished blog back out of every timeline."""
+    TimelineEntry.objects.filter(blog_id=blog.pk).delete()
+
+
+def backfill_follow(follower_id, author_id):
+    """Seed a new follower's timeline with the author's recent published blogs."""
+    if is_fanout_on_read(author_id):
+        return
+    recent = (BlogModel.objects.filter(author_id=author_id, status=1)
+              .order_by('-created_at', '-id').values_list('id', 'created_at')[:TIMELINE_LENGTH])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(reader_id=follower_id, blog_id=blog_id, author_id=author_id, created_at=created_at)
+         for blog_id, created_at in recent],
+        ignore_conflicts=True,
+    )
+    trim_timelines([follower_id])
+
+
+def remove_follow(follower_id, author_id):
+    TimelineEntry.objects.filter(reader_id=follower_id, author_id=author_id).delete()
+
+
+def get_timeline_response(request, page_size=10, max_page_size=50):
+    """
+    Keyset-paginated timeline of the requesting user: one range scan over
+    their materialized entries, merged with recent blogs of any followed
+    author that is served fan-out-on-read.
+    """
+    reader_id = request.user.id
+    paginator = KeysetPagination(TIMELINE_ORDERING, page_size=page_size, max_page_size=max_page_size)
+    entries = list(paginator.get_page_queryset(
+        TimelineEntry.objects.filter(reader_id=reader_id)
+        .select_related('blog').defer(*[f'blog__{field}' for field in BODY_FIELDS]).prefetch_related('blog__categories'),
+        request,
+    ))
+
+    on_read_authors = list(FollowModel.objects.filter(
+        follower_id=reader_id, author__profile__follower_count__gt=TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if on_read_authors:
+        # Same cursor, same key: (created_at, blog id)
+        blogs_paginator = KeysetPagination(('-created_at', '-id'), page_size=page_size, max_page_size=max_page_size)
+        blogs = blogs_paginator.get_page_queryset(
+            BlogModel.objects.filter(author_id__in=on_read_authors, status=1)
+            .defer(*BODY_FIELDS).prefetch_related('categories'),
+            request,
+        )
+        seen = {entry.blog_id for entry in entries}
+        entries += [TimelineEntry(reader_id=reader_id, blog=blog, author_id=blog.author_id, created_at=blog.created_at)
+                    for blog in blogs if blog.id not in seen]
+        entries.sort(key=lambda entry: (entry.created_at, entry.blog_id), reverse=not paginator.reverse)
+
+    rows = paginator.finish_page(entries)
+    serializer = GetAllBlogSerializer([entry.blog for entry in rows], many=True)
+    return paginator.get_paginated_response(serializer.data)
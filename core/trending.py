@@ -0,0 +1,167 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .caching import TRENDING_VERSION_KEY, aget_versions, bump_trending
+from .models import LikeModel, TrendingBlog
+
+# A like counts half as much after this many seconds
+TRENDING_HALF_LIFE = getattr(settings, 'TRENDING_HALF_LIFE', 24 * 60 * 60)
+# Blogs whose decayed score fell below this leave the board
+TRENDING_MIN_SCORE = getattr(settings, 'TRENDING_MIN_SCORE', 0.05)
+# Blogs each worker keeps in memory, and how often it reloads them (seconds)
+TRENDING_SIZE = 50
+TRENDING_MAX_AGE = 30
+TRENDING_LIMIT = 10
+# Scores are e^(t / tau) with t counted from here; storing their log keeps them finite
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+TRENDING_TAU = TRENDING_HALF_LIFE / math.log(2)
+# What is left of a score when its last like is taken out: e^-27, far under TRENDING_MIN_SCORE
+REMOVED_FLOOR = 1e-12
+REBUILD_CHUNK_SIZE = 1000
+
+
+def log_weight(at):
+    """log(e^(t / tau)) of a like made at ``at``."""
+    return (at - TRENDING_EPOCH).total_seconds() / TRENDING_TAU
+
+
+def log_floor(now=None):
+    """The lowest log_score still on the board at ``now``."""
+    return log_weight(now or timezone.now()) + math.log(TRENDING_MIN_SCORE)
+
+
+def _log_add(a, b):
+    return a + math.log1p(math.exp(b - a)) if a >= b else b + math.log1p(math.exp(a - b))
+
+
+def _combine(likes):
+    """{blog id: log of the summed weights} for (blog id, liked at) pairs."""
+    combined = {}
+    for blog_id, at in likes:
+        weight = log_weight(at)
+        combined[blog_id] = _log_add(combined[blog_id], weight) if blog_id in combined else weight
+    return combined
+
+
+def _db_log_add(weight):
+    # log(e^a + e^b) = max(a, b) + log(1 + e^-|a - b|), evaluated by the database against the current row
+    weight = Value(weight)
+    return Greatest(F('log_score'), weight) + Ln(Value(1.0) + Exp(-Abs(F('log_score') - weight)))
+
+
+def _db_log_sub(weight):
+    # log(e^a - e^b) = a + log(1 - e^(b - a)), floored for the last like of a blog
+    return F('log_score') + Ln(Greatest(Value(1.0) - Exp(Value(weight) - F('log_score')), Value(REMOVED_FLOOR)))
+
+
+def apply_likes(added=(), removed=()):
+    """
+    Fold likes into and out of the trending scores; ``added`` and
+    ``removed`` are (blog id, liked at) pairs. Each blog costs one UPDATE
+    computed by the database from the stored score, so concurrent likes
+    are never lost, and the like table is never counted.
+    """
+    for blog_id, weight in _combine(added).items():
+        trending = TrendingBlog.objects.filter(blog_id=blog_id)
+        if trending.update(log_score=_db_log_add(weight)):
+            continue
+        try:
+            with transaction.atomic():
+                TrendingBlog.objects.create(blog_id=blog_id, log_score=weight)
+        except IntegrityError:
+            # Created concurrently, or the blog is gone
+            trending.update(log_score=_db_log_add(weight))
+
+    for blog_id, weight in _combine(removed).items():
+        TrendingBlog.objects.filter(blog_id=blog_id).update(log_score=_db_log_sub(weight))
+
+
+def decay_trending(now=None):
+    """
+    The periodic decay pass. Every score decays at the same rate, so the
+    stored logs never need rewriting: blogs whose score has decayed below
+    TRENDING_MIN_SCORE are dropped and the workers reload their board.
+    Returns the number of blogs dropped.
+    """
+    dropped, _ = TrendingBlog.objects.filter(log_score__lt=log_floor(now)).delete()
+    bump_trending()
+    return dropped
+
+
+def rebuild_trending(now=None, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute every score from the likes still weighing at least
+    TRENDING_MIN_SCORE, read in chunks. Returns the number of blogs scored.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(seconds=TRENDING_TAU * math.log(1 / TRENDING_MIN_SCORE))
+    likes = LikeModel.objects.filter(created_at__gte=since).values_list('blog_id', 'created_at')
+    scores = _combine(likes.iterator(chunk_size=chunk_size))
+    with transaction.atomic():
+        TrendingBlog.objects.all().delete()
+        TrendingBlog.objects.bulk_create([TrendingBlog(blog_id=blog_id, log_score=score)
+                                          for blog_id, score in scores.items()], batch_size=chunk_size)
+    bump_trending()
+    return len(scores)
+
+
+class TrendingBoard:
+    """
+    The TRENDING_SIZE best published blogs by decayed like score, sorted
+    and held in this worker's memory.
+
+    It is reloaded every TRENDING_MAX_AGE seconds, or sooner when a decay
+    pass or rebuild bumps TRENDING_VERSION_KEY. A like does not bump it:
+    the board may lag by up to TRENDING_MAX_AGE, and a request costs one
+    cache get instead of a query.
+    """
+
+    def __init__(self, size=TRENDING_SIZE, max_age=TRENDING_MAX_AGE):
+        self.size = size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._state = (None, 0, [])  # version, loaded at, rows
+
+    def _queryset(self):
+        return (TrendingBlog.objects.filter(blog__status=1, log_score__gte=log_floor())
+                .order_by('-log_score')
+                .values('blog_id', 'log_score', title=F('blog__title'), slug=F('blog__slug'),
+                        excerpt=F('blog__excerpt'), like_count=F('blog__like_count'))[:self.size])
+
+    async def arows(self):
+        [version] = await aget_versions(TRENDING_VERSION_KEY)
+        loaded_version, loaded_at, rows = self._state
+        if version == loaded_version and time.monotonic() - loaded_at < self.max_age:
+            return rows
+        # The version was read before the rows, so a concurrent bump still triggers a reload
+        rows = [row async for row in self._queryset()]
+        with self._lock:
+            self._state = (version, time.monotonic(), rows)
+        return rows
+
+    async def atop(self, limit=TRENDING_LIMIT):
+        """The ``limit`` best blogs, each with its score decayed to now."""
+        now = log_weight(timezone.now())
+        top = []
+        for row in (await self.arows())[:limit]:
+            score = math.exp(row['log_score'] - now)
+            if score < TRENDING_MIN_SCORE:
+                break
+            top.append({'id': row['blog_id'], 'title': row['title'], 'slug': row['slug'], 'excerpt': row['excerpt'],
+                        'like_count': row['like_count'], 'score': round(score, 3)})
+        return top
+
+
+trending_board = TrendingBoard()
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import CategoryAPI, BlogAPI, BlogViewAPI
+from .views import (CategoryAPI, BlogAPI, BlogViewAPI, BlogSearchAPI, TimelineAPI, BlogImportAPI, TagAutocompleteAPI,
+                    RelatedBlogsAPI, TrendingBlogsAPI, LikeToggleAPI, FollowToggleAPI)
 
 urlpatterns = [
     path('blogs/category/', CategoryAPI.as_view(), name='category_api'),
@@ -7,12 +8,39 @@ urlpatterns = [
     # GET request for getting all blogs
     path('blogs/', BlogAPI.as_view(), name='get_all_blogs'),
     
+    # GET request for the public feed of published blogs
+    path('blogs/public/', BlogViewAPI.as_view(), name='public_blogs'),
+
+    # GET request for full-text search over published blogs
+    path('blogs/search/', BlogSearchAPI.as_view(), name='search_blogs'),
+
+    # GET request for the blogs liked the most lately
+    path('blogs/trending/', TrendingBlogsAPI.as_view(), name='trending_blogs'),
+
+    # GET request for tag suggestions by name prefix, most used first
+    path('blogs/tags/autocomplete/', TagAutocompleteAPI.as_view(), name='tag_autocomplete'),
+
+    # GET request for the blogs of followed authors
+    path('timeline/', TimelineAPI.as_view(), name='timeline'),
+
     # GET request for getting a single blog
     path('blog/<slug:slug>/', BlogViewAPI.as_view(), name='get_single_blog'),
 
+    # GET whether the user likes a blog, POST to like or unlike it
+    path('blog/<slug:slug>/like/', LikeToggleAPI.as_view(), name='toggle_like'),
+
+    # GET whether the user follows an author, POST to follow or unfollow them
+    path('authors/<int:author_id>/follow/', FollowToggleAPI.as_view(), name='toggle_follow'),
+
+    # GET request for the blogs related to a single blog
+    path('blog/<slug:slug>/related/', RelatedBlogsAPI.as_view(), name='related_blogs'),
+
     # POST request for creating a blog
     path('blogs/create/', BlogAPI.as_view(), name='create_blog'),
 
+    # POST request for importing many blogs at once (JSON list or NDJSON)
+    path('blogs/import/', BlogImportAPI.as_view(), name='import_blogs'),
+
     # DELETE request for deleting a blog
     path('blogs/delete/', BlogAPI.as_view(), name='delete_blog'),
 
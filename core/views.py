@@ -1,22 +1,34 @@
+from django.db import transaction
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from uuid import uuid4
-from blogHub.utils import get_paginated_response
-
-from django.db.models import Count
+from blogHub.async_views import AsyncAPIView
+from blogHub.bulk import report_response, rows_from_request
+from blogHub.utils import (KeysetPagination, get_paginated_response, aget_paginated_response, not_modified_response,
+                           set_validators)
 
 from user.permissions import IsAdmin, IsReader, IsAuthor
-from user.models import CustomUser
-from .serializers import CategorySerializer, GetCategorySerializer, GetBlogSerializer,TagsSerializer, PostBlogSerializer, GetAllBlogSerializer
-from .models import CategoryModel, BlogModel, TagsModel
+from user.models import CustomUser, Profile
+from .serializers import (CategorySerializer, TagsSerializer, PostBlogSerializer,
+                          FastGetAllBlogSerializer, FastGetCategorySerializer)
+from .models import CategoryModel, BlogModel, LikeModel, FollowModel
 from .throttling import BlogAccessThrottle
+from .caching import aget_blog_detail, ablog_detail_etag, ablog_list_etag, acategory_list_etag
+from .directory import category_directory
+from .related import get_related
+from .search import search_blogs
+from .tag_index import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, tag_index
+from .timeline import get_timeline_response
+from .trending import TRENDING_LIMIT, TRENDING_SIZE, trending_board
+from .bulk_import import import_blogs, resolve_tags
+from .write_buffer import FOLLOW, LIKE, toggle_buffer
 
 
 
-class CategoryAPI(APIView):
-    """API for Create, Read, and Delete Blog Categories"""
+class CategoryAPI(AsyncAPIView):
+    """API for Create, Read, and Delete Blog Categories (the read path is async)"""
     # permission_classes = [IsAuthenticated, IsAdmin]
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -43,11 +55,19 @@ class CategoryAPI(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    def get(self, request):
+    async def get(self, request):
         """Allow the Admin/Author/Reader to get all categories"""
         try:
-            categories = CategoryModel.objects.annotate(blog_count = Count('categories'))
-            return get_paginated_response(request, queryset=categories, page_size=10, serializer_class=GetCategorySerializer)
+            etag = await acategory_list_etag(request)
+            not_modified = not_modified_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+            # Served from this worker's category directory; no query while it is current
+            paginator = KeysetPagination(('id',), page_size=10)
+            page = paginator.paginate_list(await category_directory.arows(), request)
+            response = await paginator.aget_paginated_response(FastGetCategorySerializer.to_representation(page, {}))
+            return set_validators(response, etag=etag)
         except Exception as e:
             return Response({"Error": str(e)}, status= status.HTTP_400_BAD_REQUEST)
         
@@ -76,11 +96,12 @@ class BlogAPI(APIView):
     def get(self, request):
         """Allow the Author to get all blogs"""
         session_user = request.user
-        blogs = BlogModel.objects.filter(author=session_user)
+        blogs = BlogModel.objects.filter(author_id=session_user.id)
         page_size = 10
         return get_paginated_response(request, page_size, 
                                       queryset = blogs, 
-                                      serializer_class=GetAllBlogSerializer)
+                                      serializer_class=FastGetAllBlogSerializer,
+                                      ordering=('-created_at', '-id'))
         
     def post(self, request):
         data = request.data
@@ -96,8 +117,8 @@ class BlogAPI(APIView):
             return Response({"error": "Author not found"},status= status.HTTP_404_NOT_FOUND)
 
         # Fetch categories and tags 
-        blog_categories = CategoryModel.objects.filter(name__in=[cat.lower() for cat in categories]) 
-        blog_tags = [TagsModel.objects.get_or_create(name=tag.lower())[0] for tag in tags]
+        blog_categories = list(category_directory.resolve(categories).values())
+        blog_tags = list(resolve_tags(tags).values())
 
         blog_serializer = PostBlogSerializer(data = blogdata)
         if blog_serializer.is_valid():
@@ -120,7 +141,7 @@ class BlogAPI(APIView):
         blog_id = request.data.get('blog_id')
         session_user = request.user
         blog = BlogModel.objects.filter(id = blog_id).first()
-        if blog.author == session_user or session_user.user_type == "admin":
+        if blog and (blog.author_id == session_user.id or session_user.user_type == "admin"):
             blog.delete()
             return Response({"Message": f"Blog with id {blog_id} deleted successfully"}, status=status.HTTP_200_OK)
 
@@ -134,27 +155,172 @@ class BlogAPI(APIView):
         blog = BlogModel.objects.filter(id = blog_id).first()
         if blog:
             blog.status = blog_status
-            blog.save()
+            # The notification job is committed together with the new status
+            with transaction.atomic():
+                blog.save()
             blog_status = "Published" if blog_status == 1 else "Draft"
             return Response({"Message": f"Blog with id {blog_id} status changed to {blog_status}"})
     
 
 
-class BlogViewAPI(APIView):
+class BlogViewAPI(AsyncAPIView):
     permission_classes = [AllowAny]  # Allow any user (authenticated or not)
     throttle_classes = [BlogAccessThrottle]
 
-    def get(self, request, slug = None):
+    async def get(self, request, slug = None):
         # Fetch and return the blogs
         if slug:
-            try:
-                blog = BlogModel.objects.filter(slug = slug).first()
-                blog_serializer = GetBlogSerializer(blog)
-                return Response({"blogs": blog_serializer.data}, status=status.HTTP_200_OK)
-            
-            except BlogModel.DoesNotExist:
+            # The ETag is a cached version stamp, so a revalidation costs no query. There is no
+            # Last-Modified: tag and category changes never touch updated_at.
+            etag = await ablog_detail_etag(slug)
+            not_modified = not_modified_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+            blog = await aget_blog_detail(slug)
+            if blog is None:
                 return Response({"Message": "No such blog exists"}, status=status.HTTP_404_NOT_FOUND)
+            response = Response({"blogs": blog}, status=status.HTTP_200_OK)
+            return set_validators(response, etag=etag)
         
-        blogs = BlogModel.objects.all().order_by('-created_at')
-        blog_serializer = GetAllBlogSerializer(blogs, many=True)
-        return Response({"blogs": blog_serializer.data}, status=status.HTTP_200_OK)
\ No newline at end of file
+        # Public feed: published blogs only, one page at a time, categories in a single batch
+        blogs = BlogModel.objects.filter(status=1)
+        etag = await ablog_list_etag(request)
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = await aget_paginated_response(request, page_size=10,
+                                                 queryset=blogs,
+                                                 serializer_class=FastGetAllBlogSerializer,
+                                                 ordering=('-created_at', '-id'),
+                                                 max_page_size=50)
+        return set_validators(response, etag=etag)
+
+
+class RelatedBlogsAPI(AsyncAPIView):
+    """Published blogs sharing the most tags and categories with this one, read from the related table"""
+    permission_classes = [AllowAny]
+
+    async def get(self, request, slug):
+        results = [blog async for blog in get_related(slug)]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class TrendingBlogsAPI(AsyncAPIView):
+    """Published blogs with the most recent likes, older likes counting for less, from this worker's board"""
+    permission_classes = [AllowAny]
+
+    async def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', TRENDING_LIMIT)), TRENDING_SIZE))
+        except ValueError:
+            limit = TRENDING_LIMIT
+        return Response({"results": await trending_board.atop(limit)}, status=status.HTTP_200_OK)
+
+
+class LikeToggleAPI(APIView):
+    """Whether the user likes a published blog (GET), or like / unlike it (POST); the writes are buffered"""
+    permission_classes = [IsAuthenticated]
+
+    def respond(self, request, slug, toggle):
+        blog = BlogModel.objects.filter(slug=slug, status=1).values('id', 'like_count').first()
+        if blog is None:
+            return Response({"Message": "No such blog exists"}, status=status.HTTP_404_NOT_FOUND)
+
+        reader_id = request.user.id
+        persisted = LikeModel.objects.filter(reader_id=reader_id, blog_id=blog['id']).exists()
+        liked = (toggle_buffer.toggle if toggle else toggle_buffer.state)(LIKE, reader_id, blog['id'], persisted)
+        # The user's own pending toggle is counted; other users' once flushed
+        return Response({"liked": liked, "like_count": max(blog['like_count'] + liked - persisted, 0)},
+                        status=status.HTTP_200_OK)
+
+    def get(self, request, slug):
+        return self.respond(request, slug, toggle=False)
+
+    def post(self, request, slug):
+        return self.respond(request, slug, toggle=True)
+
+
+class FollowToggleAPI(APIView):
+    """Whether the user follows an author (GET), or follow / unfollow them (POST); the writes are buffered"""
+    permission_classes = [IsAuthenticated]
+
+    def respond(self, request, author_id, toggle):
+        follower_id = request.user.id
+        if author_id == follower_id:
+            return Response({"Message": "You cannot follow yourself"}, status=status.HTTP_400_BAD_REQUEST)
+        follower_count = (Profile.objects.filter(user_id=author_id, user__user_type='author')
+                          .values_list('follower_count', flat=True).first())
+        if follower_count is None:
+            return Response({"Message": "No such author exists"}, status=status.HTTP_404_NOT_FOUND)
+
+        persisted = FollowModel.objects.filter(follower_id=follower_id, author_id=author_id).exists()
+        following = (toggle_buffer.toggle if toggle else toggle_buffer.state)(FOLLOW, follower_id, author_id, persisted)
+        return Response({"following": following, "follower_count": max(follower_count + following - persisted, 0)},
+                        status=status.HTTP_200_OK)
+
+    def get(self, request, author_id):
+        return self.respond(request, author_id, toggle=False)
+
+    def post(self, request, author_id):
+        return self.respond(request, author_id, toggle=True)
+
+
+class BlogSearchAPI(APIView):
+    """Full-text search over published blogs"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"Message": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 50))
+        except ValueError:
+            limit = 20
+
+        results = search_blogs(query,
+                               category=request.query_params.get('category'),
+                               tag=request.query_params.get('tag', '').lower() or None,
+                               limit=limit)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class TimelineAPI(APIView):
+    """Blogs from the authors the user follows, newest first"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return get_timeline_response(request)
+
+
+class BlogImportAPI(APIView):
+    """Bulk import of blogs as a JSON list or NDJSON (one blog per line) by the Admin"""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request):
+        author_id = request.query_params.get('author_id')
+        author_id = int(author_id) if author_id and author_id.isdigit() else None
+
+        rows = rows_from_request(request)
+        if rows is None:
+            return Response({"error": "Expected a list of blogs or an NDJSON body"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return report_response(import_blogs(rows, default_author_id=author_id))
+
+
+class TagAutocompleteAPI(AsyncAPIView):
+    """Tags starting with ?q=, most used first, answered from this worker's tag index"""
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            return Response({"Message": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+
+        return Response({"results": await tag_index.acomplete(prefix, limit)}, status=status.HTTP_200_OK)
@@ -0,0 +1,264 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+
+from user.models import Profile
+from . import timeline, trending
+from .counters import apply_counter_deltas
+from .models import BlogModel, FollowModel, LikeModel
+
+logger = logging.getLogger('blogHub.write_buffer')
+
+DEFAULT_WRITE_BUFFER_SETTINGS = {
+    # Seconds between background flushes; None flushes only when full or drained
+    'FLUSH_INTERVAL': 1.0,
+    # Intents held before the request adding one flushes them itself
+    'MAX_PENDING': 1000,
+    # How long other workers see an intent that is not flushed yet (seconds)
+    'INTENT_TIMEOUT': 5 * 60,
+}
+FLUSH_CHUNK_SIZE = 500
+
+LIKE = 'like'
+FOLLOW = 'follow'
+
+
+def get_write_buffer_settings():
+    return {**DEFAULT_WRITE_BUFFER_SETTINGS, **getattr(settings, 'WRITE_BUFFER', {})}
+
+
+def _intent_key(key):
+    return 'toggle_intent_{}_{}_{}'.format(*key)
+
+
+def _chunks(items, size=FLUSH_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing(model, actor_field, target_field, pairs):
+    """{(actor id, target id): (row id, created_at)} of the rows among ``pairs`` that exist."""
+    rows = (model.objects.filter(**{f'{actor_field}__in': {actor for actor, _ in pairs},
+                                    f'{target_field}__in': {target for _, target in pairs}})
+            .values_list(actor_field, target_field, 'id', 'created_at'))
+    return {(actor, target): (row_id, created_at) for actor, target, row_id, created_at in rows
+            if (actor, target) in pairs}
+
+
+def _live(wanted, actor_model, target_model):
+    """``wanted`` without the likes or follows to add whose actor or target was deleted since the toggle."""
+    adding = [pair for pair, active in wanted.items() if active]
+    if not adding:
+        return wanted
+    actors = set(actor_model.objects.filter(pk__in={actor for actor, _ in adding})
+                 .values_list('pk', flat=True).order_by())
+    targets = set(target_model.objects.filter(pk__in={target for _, target in adding})
+                  .values_list('pk', flat=True).order_by())
+    return {(actor, target): active for (actor, target), active in wanted.items()
+            if not active or (actor in actors and target in targets)}
+
+
+def _insert(model, actor_field, target_field, pairs):
+    """
+    Insert the rows for ``pairs`` and return the ones this call wrote, as
+    _existing() does. A row another worker inserted meanwhile is skipped by
+    the insert and counted by that worker, so it is left out.
+    """
+    if not pairs:
+        return {}
+    model.objects.bulk_create([model(**{actor_field: actor, target_field: target}) for actor, target in pairs],
+                              ignore_conflicts=True)
+    return _existing(model, actor_field, target_field, pairs)
+
+
+def _delete(model, ids):
+    """DELETE the rows by id in one statement, without loading them or sending post_delete."""
+    if not ids:
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} "
+                       f"IN ({', '.join(['%s'] * len(ids))})", list(ids))
+
+
+def _write_likes(intents):
+    """
+    One transaction per chunk: the likes are inserted and deleted in bulk,
+    then like_count and the trending scores are updated per blog instead
+    of per like.
+    """
+    written = 0
+    for chunk in _chunks(intents.items()):
+        with transaction.atomic():
+            wanted = _live(dict(chunk), get_user_model(), BlogModel)
+            existing = _existing(LikeModel, 'reader_id', 'blog_id', wanted)
+            created = _insert(LikeModel, 'reader_id', 'blog_id',
+                              {pair for pair, active in wanted.items() if active and pair not in existing})
+            removed = {pair: existing[pair] for pair, active in wanted.items() if not active and pair in existing}
+            # The counters and scores follow below in bulk instead of per row
+            _delete(LikeModel, [like_id for like_id, _ in removed.values()])
+
+            deltas = Counter(blog_id for _, blog_id in created)
+            deltas.subtract(blog_id for _, blog_id in removed)
+            apply_counter_deltas(BlogModel, 'like_count', deltas)
+            trending.apply_likes(added=[(blog_id, created_at) for (_, blog_id), (_, created_at) in created.items()],
+                                 removed=[(blog_id, created_at) for (_, blog_id), (_, created_at) in removed.items()])
+        written += len(created) + len(removed)
+    return written
+
+
+def _write_follows(intents):
+    """Same as _write_likes for follows: bulk rows, per-profile counters, then the timelines."""
+    written = 0
+    for chunk in _chunks(intents.items()):
+        with transaction.atomic():
+            wanted = _live(dict(chunk), get_user_model(), get_user_model())
+            existing = _existing(FollowModel, 'follower_id', 'author_id', wanted)
+            created = _insert(FollowModel, 'follower_id', 'author_id',
+                              {pair for pair, active in wanted.items() if active and pair not in existing})
+            removed = [pair for pair, active in wanted.items() if not active and pair in existing]
+            _delete(FollowModel, [existing[pair][0] for pair in removed])
+
+            followers, following = Counter(), Counter()
+            for follower_id, author_id in created:
+                followers[author_id] += 1
+                following[follower_id] += 1
+            for follower_id, author_id in removed:
+                followers[author_id] -= 1
+                following[follower_id] -= 1
+            apply_counter_deltas(Profile, 'follower_count', followers, key='user_id')
+            apply_counter_deltas(Profile, 'following_count', following, key='user_id')
+
+            for follower_id, author_id in created:
+                timeline.backfill_follow(follower_id, author_id)
+            for follower_id, author_id in removed:
+                timeline.remove_follow(follower_id, author_id)
+        written += len(created) + len(removed)
+    return written
+
+
+WRITERS = {
+    LIKE: _write_likes,
+    FOLLOW: _write_follows,
+}
+
+
+class ToggleBuffer:
+    """
+    Like and follow toggles held in memory and written in batches.
+
+    A toggle only records the actor's latest intent for a target, so
+    repeated clicks coalesce and a like followed by an unlike writes
+    nothing. Intents are flushed every FLUSH_INTERVAL by a background
+    thread, by the request that fills the buffer to MAX_PENDING, and by
+    drain() at shutdown.
+
+    Every intent is also put in the shared cache. The actor then reads
+    their own writes on any worker, and a worker flushing an intent that
+    another worker has since superseded leaves it to that worker.
+    """
+
+    def __init__(self):
+        self._pending = {}  # (kind, actor id, target id): (active, token)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def state(self, kind, actor_id, target_id, persisted):
+        """Whether ``actor_id`` likes or follows ``target_id``; ``persisted`` is what the database says."""
+        key = (kind, actor_id, target_id)
+        intent = self._pending.get(key) or cache.get(_intent_key(key))
+        return persisted if intent is None else intent[0]
+
+    def toggle(self, kind, actor_id, target_id, persisted):
+        """Flip the actor's state for the target and return the new one."""
+        config = get_write_buffer_settings()
+        key = (kind, actor_id, target_id)
+        shared = None if key in self._pending else cache.get(_intent_key(key))
+        with self._lock:
+            intent = self._pending.get(key) or shared
+            active = not (persisted if intent is None else intent[0])
+            self._pending[key] = (active, uuid4().hex)
+            intent, full = self._pending[key], len(self._pending) >= config['MAX_PENDING']
+        cache.set(_intent_key(key), intent, timeout=config['INTENT_TIMEOUT'])
+
+        if full:
+            self.flush()
+        elif config['FLUSH_INTERVAL']:
+            self._start(config['FLUSH_INTERVAL'])
+        return active
+
+    def flush(self):
+        """Write every pending intent in bulk; returns the number of rows inserted or deleted."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            cache_keys = {key: _intent_key(key) for key in pending}
+            shared = cache.get_many(list(cache_keys.values()))
+            # Superseded on another worker: its intent is written there
+            current = {key: intent for key, intent in pending.items()
+                       if shared.get(cache_keys[key], intent)[1] == intent[1]}
+            try:
+                written = 0
+                for kind, write in WRITERS.items():
+                    intents = {(actor_id, target_id): active
+                               for (key_kind, actor_id, target_id), (active, _) in current.items() if key_kind == kind}
+                    if intents:
+                        written += write(intents)
+            except Exception:
+                # Put them back unless a newer intent came in meanwhile
+                with self._lock:
+                    for key, intent in pending.items():
+                        self._pending.setdefault(key, intent)
+                raise
+            # An intent toggled again meanwhile, here or on another worker, stays visible until it is flushed
+            shared = cache.get_many([cache_keys[key] for key in current])
+            cache.delete_many([cache_keys[key] for key, intent in current.items()
+                               if shared.get(cache_keys[key], intent)[1] == intent[1]])
+            return written
+
+    def _start(self, interval):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, args=(interval,), name='write-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered toggles failed; they are retried on the next flush")
+            finally:
+                close_old_connections()
+
+    def drain(self):
+        """Stop the background flushes and write what is left; the graceful shutdown hook."""
+        self._stopped.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        return self.flush()
+
+
+toggle_buffer = ToggleBuffer()
+# Gunicorn, uWSGI and runserver all exit the interpreter normally on a graceful shutdown
+atexit.register(toggle_buffer.drain)
@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.caching import aget_versions, bump_on_commit, get_versions
+from .blacklist import revoked_tokens
+
+# Claim holding the user version the other claims were read at
+USER_VERSION_CLAIM = 'user_version'
+
+
+def _user_version_key(user_id):
+    return f'user_version_{user_id}'
+
+
+def get_user_version(user_id):
+    return get_versions(_user_version_key(user_id))[0]
+
+
+async def aget_user_version(user_id):
+    return (await aget_versions(_user_version_key(user_id)))[0]
+
+
+def bump_user_version(*user_ids):
+    """
+    Make every token issued so far fall back to the database, once the
+    current transaction commits. Called by user.signals whenever a user or
+    profile is saved; code that changes user_type, is_active or is_paid
+    with queryset.update() must call it too.
+    """
+    bump_on_commit(*(_user_version_key(user_id) for user_id in user_ids))
+
+
+def load_user_claims(user_id):
+    """
+    What ClaimsUser needs to stand in for the user, or None if the user is
+    gone or inactive. The version is read before the row: a change committed
+    in between bumps it afterwards, so the claims are never newer-versioned
+    than the row they were read from.
+    """
+    version = get_user_version(user_id)
+    row = (get_user_model().objects.filter(pk=user_id, is_active=True)
+           .values('email', 'username', 'user_type', 'profile__is_paid').first())
+    if row is None:
+        return None
+    return {
+        'email': row['email'],
+        'username': row['username'],
+        'user_type': row['user_type'],
+        'is_paid': row['profile__is_paid'],
+        USER_VERSION_CLAIM: version,
+    }
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    A refresh token carrying load_user_claims(), which its access tokens copy.
+    An access token minted from a refresh token whose claims went stale
+    gets fresh ones from the database. The blacklist is checked through
+    user.blacklist's filter, so valid tokens cost no query.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        """The token of ``user``; without claims if it was deactivated meanwhile, so it always hits the database."""
+        token = super().for_user(user)
+        token.payload.update(load_user_claims(user.pk) or {})
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        version = access.get(USER_VERSION_CLAIM)
+        user_id = access.get(api_settings.USER_ID_CLAIM)
+        if version is not None and version != get_user_version(user_id):
+            claims = load_user_claims(user_id)
+            if claims is not None:
+                access.payload.update(claims)
+        return access
+
+    def check_blacklist(self):
+        if revoked_tokens.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        revoked_tokens.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+
+class ClaimsUser(TokenUser):
+    """
+    request.user rebuilt from a token's claims without touching the database.
+    It is not a model instance: compare and filter on ``.id``.
+    """
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def username(self):
+        return self.token.get('username')
+
+    @cached_property
+    def user_type(self):
+        return self.token['user_type']
+
+    @cached_property
+    def is_paid(self):
+        return self.token['is_paid']
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    simplejwt's JWTAuthentication plus a native async path used by
+    blogHub.async_views.AsyncAPIView.
+
+    Tokens issued by ClaimsRefreshToken authenticate as a ClaimsUser with
+    no query while their user version is current; any other token, or one
+    whose user has been saved since, loads the user from the database.
+    """
+
+    def get_user(self, validated_token):
+        version = validated_token.get(USER_VERSION_CLAIM)
+        if version is not None and version == get_user_version(validated_token.get(api_settings.USER_ID_CLAIM)):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """Same checks as get_user; the profile comes along so the throttle tier costs no extra query."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = validated_token.get(USER_VERSION_CLAIM)
+        if version is not None and version == await aget_user_version(user_id):
+            return ClaimsUser(validated_token)
+
+        try:
+            user = await (self.user_model.objects.select_related('profile')
+                          .aget(**{api_settings.USER_ID_FIELD: user_id}))
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
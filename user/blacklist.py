@@ -0,0 +1,150 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.caching import bump_version, get_versions
+
+BLACKLIST_VERSION_KEY = 'token_blacklist_version'
+# Seconds between full reloads, which also drop tokens that have expired since
+BLACKLIST_RELOAD_INTERVAL = getattr(settings, 'TOKEN_BLACKLIST_RELOAD_INTERVAL', 300)
+# Incremental loads also re-read the rows blacklisted this many seconds back
+BLACKLIST_RELOAD_OVERLAP = getattr(settings, 'TOKEN_BLACKLIST_RELOAD_OVERLAP', 60)
+BLACKLIST_FILTER_ERROR_RATE = 0.01
+BLACKLIST_FILTER_MIN_CAPACITY = 1024
+PRUNE_CHUNK_SIZE = 1000
+
+
+class BloomFilter:
+    """
+    Set membership in about 10 bits per item for a 1% error rate: ``in``
+    never misses an added item, and wrongly matches others at about
+    ``error_rate`` once ``capacity`` items have been added.
+    """
+
+    def __init__(self, capacity, error_rate=BLACKLIST_FILTER_ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevokedTokenFilter:
+    """
+    This process' Bloom filter of blacklisted, unexpired refresh token JTIs.
+
+    A JTI the filter does not contain is not blacklisted, so valid tokens
+    are cleared without a query; a match is confirmed against
+    BlacklistedToken. Every blacklisting bumps a cache version, on which
+    each process loads the rows added since (by id), along with those
+    blacklisted in the last BLACKLIST_RELOAD_OVERLAP seconds: a row
+    committed out of id order is picked up then, and re-adding the others
+    changes nothing. The whole filter is rebuilt every
+    BLACKLIST_RELOAD_INTERVAL seconds, which also drops expired tokens.
+    """
+
+    def __init__(self, reload_interval=BLACKLIST_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.bloom = None
+        self.version = None
+        self.last_id = 0
+        self.loaded_at = 0
+
+    def _rows(self, after_id=0):
+        recent = Q(id__gt=after_id)
+        if after_id:
+            recent |= Q(blacklisted_at__gte=timezone.now() - timedelta(seconds=BLACKLIST_RELOAD_OVERLAP))
+        return (BlacklistedToken.objects.filter(recent, token__expires_at__gt=timezone.now())
+                .order_by('id').values_list('id', 'token__jti').iterator(chunk_size=10000))
+
+    def _load(self, bloom, after_id):
+        for row_id, jti in self._rows(after_id):
+            bloom.add(jti)
+            self.last_id = max(self.last_id, row_id)
+
+    def refresh(self):
+        version = get_versions(BLACKLIST_VERSION_KEY)[0]
+        stale = self.bloom is None or time.monotonic() - self.loaded_at >= self.reload_interval
+        if not stale and version == self.version:
+            return
+        with self._lock:
+            stale = self.bloom is None or time.monotonic() - self.loaded_at >= self.reload_interval
+            if stale or self.bloom.count >= self.bloom.capacity:
+                live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).count()
+                bloom = BloomFilter(max(2 * live, BLACKLIST_FILTER_MIN_CAPACITY))
+                self.last_id = 0
+                self._load(bloom, 0)
+                self.bloom, self.loaded_at = bloom, time.monotonic()
+            elif version != self.version:
+                self._load(self.bloom, self.last_id)
+            self.version = version
+
+    def add(self, jti):
+        """Take a token this process has just blacklisted into account before the next load."""
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def is_revoked(self, jti):
+        self.refresh()
+        if jti not in self.bloom:
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+revoked_tokens = RevokedTokenFilter()
+
+
+def bump_blacklist_version():
+    bump_version(BLACKLIST_VERSION_KEY)
+
+
+def prune_expired_tokens(chunk_size=PRUNE_CHUNK_SIZE, pause=0, now=None):
+    """
+    Delete expired OutstandingToken rows and their BlacklistedToken rows,
+    ``chunk_size`` tokens per short transaction, pausing ``pause`` seconds
+    between chunks. Expired tokens fail validation before the blacklist is
+    consulted, so nothing they protect is lost.
+    Returns (outstanding, blacklisted) deleted.
+    """
+    now = now or timezone.now()
+    outstanding = blacklisted = 0
+    last_id = 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(id__gt=last_id, expires_at__lte=now)
+                   .order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return outstanding, blacklisted
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_LOGIN_GATE_SETTINGS = {
+    # Password hashes computed at once; each keeps a CPU busy for the hasher's work factor
+    'WORKERS': 4,
+    # Logins allowed to wait for a worker; any more are answered 503 right away
+    'QUEUE_DEPTH': 32,
+    'RETRY_AFTER': 1,  # seconds, sent with the 503
+    # Failed attempts within FAILURE_WINDOW before the backoff starts, per account and per client IP
+    'ACCOUNT_FREE_FAILURES': 5,
+    'IP_FREE_FAILURES': 50,
+    'FAILURE_WINDOW': 15 * 60,
+    'MAX_BACKOFF': 15 * 60,
+}
+
+
+def get_login_gate_settings():
+    return {**DEFAULT_LOGIN_GATE_SETTINGS, **getattr(settings, 'LOGIN_GATE', {})}
+
+
+class LoginOverloaded(Exception):
+    """Every hashing worker is busy and the queue in front of them is full."""
+
+
+class HashingPool:
+    """
+    A fixed number of threads for password hashing behind a bounded queue.
+
+    A login storm then costs at most ``workers`` CPUs, blog reads keep the
+    rest, and logins beyond the queue are refused at once instead of
+    piling up behind one another.
+    """
+
+    def __init__(self, workers, queue_depth):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hashing')
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise LoginOverloaded()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def arun(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_hashing_pool(config=None):
+    """The process' pool for the configured size."""
+    config = config or get_login_gate_settings()
+    size = (config['WORKERS'], config['QUEUE_DEPTH'])
+    with _pools_lock:
+        if size not in _pools:
+            _pools[size] = HashingPool(*size)
+        return _pools[size]
+
+
+class LoginBackoff:
+    """
+    Exponential backoff once an account or a client IP has failed more than
+    its free attempts within the failure window: 1s, 2s, 4s... up to
+    MAX_BACKOFF. It is checked before any password is hashed.
+    """
+
+    def __init__(self, email, ip, config=None):
+        self.config = config or get_login_gate_settings()
+        account = hashlib.md5((email or '').strip().lower().encode()).hexdigest()
+        self.scopes = {
+            'account': (f'login_failures_account_{account}', self.config['ACCOUNT_FREE_FAILURES']),
+            'ip': (f'login_failures_ip_{ip}', self.config['IP_FREE_FAILURES']),
+        }
+
+    async def aretry_after(self):
+        """Seconds until another attempt is allowed, or None."""
+        blocked = await cache.aget_many([f'{key}_until' for key, _ in self.scopes.values()])
+        wait = max(blocked.values(), default=0) - time.time()
+        return wait if wait > 0 else None
+
+    async def _aincr(self, key):
+        await cache.aadd(key, 0, timeout=self.config['FAILURE_WINDOW'])
+        try:
+            return await cache.aincr(key)
+        except ValueError:
+            # Expired between add() and incr(); start a fresh window
+            await cache.aset(key, 1, timeout=self.config['FAILURE_WINDOW'])
+            return 1
+
+    async def afailed(self):
+        for key, free in self.scopes.values():
+            failures = await self._aincr(key)
+            if failures > free:
+                delay = min(2 ** (failures - free - 1), self.config['MAX_BACKOFF'])
+                await cache.aset(f'{key}_until', time.time() + delay, timeout=delay + 1)
+
+    async def asucceeded(self):
+        key, _ = self.scopes['account']
+        await cache.adelete_many([key, f'{key}_until'])
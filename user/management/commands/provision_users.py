@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blogHub.bulk import rows_from_file, write_errors
+from user.provisioning import PROVISION_CHUNK_SIZE, provision_users
+
+
+class Command(BaseCommand):
+    help = "Create users and their profiles in bulk from a JSON list or an NDJSON file (one user per line)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to a .json or .ndjson file")
+        parser.add_argument('--chunk-size', type=int, default=PROVISION_CHUNK_SIZE,
+                            help="Users written per transaction")
+
+    def handle(self, *args, **options):
+        rows = rows_from_file(options['path'])
+        report = provision_users(rows, chunk_size=options['chunk_size'])
+        write_errors(self, report)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users, rejected {len(report['errors'])} rows "
+            f"({len(report['duplicates'])} duplicate emails)"))
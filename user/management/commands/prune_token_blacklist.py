@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from user.blacklist import PRUNE_CHUNK_SIZE, prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted JWT refresh tokens in short, chunked transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=PRUNE_CHUNK_SIZE,
+                            help="Number of tokens deleted per transaction")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to sleep between chunks, to leave room for other writers")
+
+    def handle(self, *args, **options):
+        outstanding, blacklisted = prune_expired_tokens(chunk_size=options['chunk_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {outstanding} expired outstanding tokens and {blacklisted} blacklisted tokens"))
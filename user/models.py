@@ -62,4 +62,7 @@ class CustomUser(AbstractBaseUser,PermissionsMixin):
 class Profile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     is_paid = models.BooleanField(default=False)
+    # Denormalized FollowModel counts, kept in sync by core.signals
+    follower_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
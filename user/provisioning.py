@@ -0,0 +1,87 @@
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from blogHub.bulk import create_in_chunks, number_rows, select_valid
+from .models import CustomUser, Profile
+
+PROVISION_CHUNK_SIZE = 1000
+USER_TYPES = dict(CustomUser.USER_TYPE_CHOICES)
+USERNAME_MAX_LENGTH = CustomUser._meta.get_field('username').max_length
+BIO_MAX_LENGTH = CustomUser._meta.get_field('bio').max_length
+DUPLICATE_EMAIL = "user with this email already exists."
+
+
+def _normalize_email(row):
+    if isinstance(row, dict) and isinstance(row.get('email'), str):
+        return {**row, 'email': CustomUser.objects.normalize_email(row['email'].strip())}
+    return row
+
+
+def _validate(row):
+    errors = {}
+    if not isinstance(row, dict):
+        return {'row': "Expected an object"}
+
+    email = row.get('email')
+    try:
+        validate_email(email)
+    except ValidationError:
+        errors['email'] = "Enter a valid email address."
+
+    if row.get('user_type', 'reader') not in USER_TYPES:
+        errors['user_type'] = f"\"{row.get('user_type')}\" is not a valid choice."
+    for field, max_length in (('username', USERNAME_MAX_LENGTH), ('bio', BIO_MAX_LENGTH)):
+        value = row.get(field)
+        if value is not None and (not isinstance(value, str) or len(value) > max_length):
+            errors[field] = f"Expected a string of at most {max_length} characters."
+    if not isinstance(row.get('is_paid', False), bool):
+        errors['is_paid'] = "Must be a valid boolean."
+
+    if 'password' in row:
+        errors['password'] = "Raw passwords are not accepted in bulk; send password_hash or nothing."
+    password_hash = row.get('password_hash')
+    if password_hash is not None:
+        try:
+            identify_hasher(password_hash)
+        except (TypeError, ValueError):
+            errors['password_hash'] = "Not a hash produced by an installed password hasher."
+    return errors
+
+
+def _create_chunk(chunk):
+    with transaction.atomic():
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=row['email'], username=row.get('username'), user_type=row.get('user_type', 'reader'),
+                       bio=row.get('bio') or 'No Bio Added',
+                       # Pre-hashed, or unusable until the user sets one through a reset
+                       password=row.get('password_hash') or make_password(None))
+            for row in chunk
+        ])
+        # bulk_create sends no post_save, so user.signals does not create these one by one
+        Profile.objects.bulk_create([Profile(user_id=user.pk, is_paid=row.get('is_paid', False))
+                                     for user, row in zip(users, chunk)])
+    return users
+
+
+def provision_users(rows, chunk_size=PROVISION_CHUNK_SIZE):
+    """
+    Bulk-create users and their profiles from dicts shaped like
+    ``{"email", "username", "user_type", "bio", "is_paid", "password_hash"}``.
+
+    No password is hashed here: ``password_hash`` must come pre-hashed, and
+    users without one get an unusable password. ``rows`` may contain
+    parse_ndjson's error tuples. Each chunk of users and its profiles are
+    written in one transaction. Returns the number created, the errors of
+    every rejected row and the duplicate emails, whether already registered
+    or repeated in the import.
+    """
+    errors = []
+    numbered = number_rows(rows, errors, normalize=_normalize_email)
+    emails = [row['email'] for _, row in numbered if isinstance(row, dict) and isinstance(row.get('email'), str)]
+    taken = set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+
+    valid, duplicates = select_valid(numbered, _validate, errors, 'email', taken, DUPLICATE_EMAIL)
+    created = create_in_chunks(valid, _create_chunk, errors, chunk_size)
+    return {'created': created, 'errors': errors, 'duplicates': sorted(duplicates)}
@@ -1,5 +1,7 @@
 # from rest_framework.serializers import ModelSerializer
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from user.authentication import ClaimsRefreshToken
 from user.models import CustomUser
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -18,4 +20,8 @@ class SignupSerializer(serializers.ModelSerializer):
               password = validated_data['password']
          )
 
-         return user
\ No newline at end of file
+         return user
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
@@ -1,9 +1,32 @@
 # Signal to create a profile when a user is created
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from user.authentication import bump_user_version
+from user.blacklist import bump_blacklist_version
 from user.models import CustomUser, Profile
 
 @receiver(post_save, sender=CustomUser)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+
+# Tokens carry user_type and is_paid; a save makes the old claims fall back to the database
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_claims(sender, instance, **kwargs):
+    bump_user_version(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_claims(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+
+
+# Every process loads new blacklist rows when the version moves; bumped once the row is visible
+@receiver(post_save, sender=BlacklistedToken)
+def invalidate_revoked_tokens(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(bump_blacklist_version)
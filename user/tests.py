@@ -1,3 +1,331 @@
-from django.test import TestCase
+import hashlib
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import BlogModel, CategoryModel, TagsModel
+from .authentication import USER_VERSION_CLAIM, ClaimsRefreshToken, ClaimsUser, get_user_version
+from .blacklist import BloomFilter, revoked_tokens
+from .login_gate import get_hashing_pool, get_login_gate_settings
+from .models import CustomUser, Profile
+
+
+# The throttle counters keep the shipped cache
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+               'throttle': settings.CACHES['throttle']}
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(CACHES=TEST_CACHES, PASSWORD_HASHERS=FAST_HASHERS)
+class UserTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        revoked_tokens.reset()
+        self.user = CustomUser.objects.create_user(email='reader@bloghub.com', password='pass', username='reader')
+        self.seeded = 0
+
+    def seed(self, count):
+        """Add ``count`` users, each with a published blog, category and tag."""
+        for i in range(self.seeded, self.seeded + count):
+            author = CustomUser.objects.create_user(email=f'author{i}@bloghub.com', password='pass', user_type='author')
+            blog = BlogModel.objects.create(title=f'Blog {i}', content='content', status=1, author=author)
+            blog.categories.add(CategoryModel.objects.create(name=f'category {i}'))
+            blog.tags.add(TagsModel.objects.create(name=f'tag {i}'))
+        self.seeded += count
+
+    def assertQueryBudget(self, budget, request, prepare=lambda: None, grow=5):
+        """Same fixed budget before and after the tables grow."""
+        for _ in range(2):
+            cache.clear()
+            argument = prepare()
+            with self.assertNumQueries(budget):
+                response = request(argument)
+            self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            self.seed(grow)
+        return response
+
+
+class UserQueryBudgetTests(UserTestCase):
+
+    def test_signup(self):
+        counter = iter(range(100))
+        self.assertQueryBudget(3, lambda i: self.client.post(reverse('signup'), {
+            'username': f'new{i}', 'email': f'new{i}@bloghub.com', 'password': 'pass'}, format='json'),
+            prepare=lambda: next(counter))
+        self.assertEqual(Profile.objects.filter(user__email='new0@bloghub.com').count(), 1)
+
+    def test_login(self):
+        # The claims are read again after the password hash
+        self.assertQueryBudget(3, lambda _: self.client.post(reverse('login'), {
+            'email': 'reader@bloghub.com', 'password': 'pass'}, format='json'))
+
+    def test_refresh(self):
+        self.assertQueryBudget(1, lambda refresh: self.client.post(reverse('token_refresh'), {
+            'refresh': refresh}, format='json'),
+            prepare=lambda: str(RefreshToken.for_user(self.user)))
+
+    def test_logout(self):
+        def prepare():
+            refresh = RefreshToken.for_user(self.user)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+            revoked_tokens.refresh()
+            return str(refresh)
+        self.assertQueryBudget(6, lambda refresh: self.client.post(reverse('logout'), {
+            'refresh': refresh}, format='json'), prepare=prepare)
+
+    def test_userinfo(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        response = self.assertQueryBudget(1, lambda _: self.client.get(reverse('userinfo')))
+        self.assertEqual(response.data['email'], 'reader@bloghub.com')
+
+
+class ClaimsAuthenticationTests(UserTestCase):
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'email': 'reader@bloghub.com', 'password': 'pass'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data['refresh']
+
+    def test_no_user_lookup_while_claims_are_current(self):
+        self.login()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('userinfo'))
+        self.assertEqual((response.data['email'], response.data['username'], response.data['user-type']),
+                         ('reader@bloghub.com', 'reader', 'reader'))
+
+    def test_saving_the_user_falls_back_to_the_database(self):
+        self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_type = 'author'
+            self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('userinfo')).data['user-type'], 'author')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('userinfo')).status_code, 401)
+
+    def test_upgrade_reaches_the_throttle(self):
+        self.login()
+        profile = Profile.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.is_paid = True
+            profile.save()
+        blog = BlogModel.objects.create(title='Paid', content='content', status=1, author=self.user)
+        for _ in range(12):
+            self.assertEqual(self.client.get(reverse('get_single_blog', args=[blog.slug])).status_code, 200)
+
+    def test_refresh_restamps_stale_claims(self):
+        refresh = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_type = 'author'
+            self.user.save()
+        # reverse('token_refresh') resolves to dj_rest_auth's view of the same name
+        access = self.client.post('/api/auth/refresh/', {'refresh': refresh}, format='json').data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('userinfo')).data['user-type'], 'author')
+
+    def test_claims_are_read_after_the_version(self):
+        loaded = CustomUser.objects.get(pk=self.user.pk)
+        # Demoted, then deactivated, while the login was hashing the password
+        CustomUser.objects.filter(pk=self.user.pk).update(user_type='author')
+        self.assertEqual(ClaimsRefreshToken.for_user(loaded)['user_type'], 'author')
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertNotIn(USER_VERSION_CLAIM, ClaimsRefreshToken.for_user(loaded))
+
+    def test_version_moves_once_the_save_commits(self):
+        version = get_user_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.user_type = 'author'
+            self.user.save()
+            self.assertEqual(get_user_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_user_version(self.user.pk), version)
+
+    def test_claims_user(self):
+        token = ClaimsRefreshToken.for_user(self.user).access_token
+        user = ClaimsUser(token)
+        self.assertEqual((user.id, user.user_type, user.is_paid, user.is_authenticated), (self.user.id, 'reader', False, True))
+
+
+class TokenBlacklistTests(UserTestCase):
+    refresh_url = '/api/auth/refresh/'  # reverse('token_refresh') is dj_rest_auth's view
+
+    def refresh(self, token):
+        return self.client.post(self.refresh_url, {'refresh': str(token)}, format='json')
+
+    def test_valid_tokens_skip_the_blacklist_table(self):
+        revoked = ClaimsRefreshToken.for_user(self.user)
+        revoked.blacklist()
+        token = ClaimsRefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)  # loads the filter
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_logout_revokes_in_every_process(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertEqual(self.client.post(reverse('logout'), {'refresh': str(token)}, format='json').status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+        # Blacklisted elsewhere: the version bump makes this process load the new row
+        other = ClaimsRefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(other).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=other['jti']))
+        self.assertEqual(self.refresh(other).status_code, 401)
+
+    def test_rows_committed_out_of_id_order_are_loaded(self):
+        now = timezone.now()
+        late, early = (OutstandingToken.objects.create(user=self.user, jti=jti, token='t',
+                                                       expires_at=now + timedelta(days=1))
+                       for jti in ('late', 'early'))
+        BlacklistedToken.objects.create(id=10, token=late)
+        revoked_tokens.refresh()
+        # A transaction that took a lower id commits after the row above was loaded
+        with self.captureOnCommitCallbacks(execute=True):
+            BlacklistedToken.objects.create(id=5, token=early)
+        self.assertTrue(revoked_tokens.is_revoked('early'))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'added {i}')
+        self.assertTrue(all(f'added {i}' in bloom for i in range(1000)))
+        self.assertLess(sum(f'other {i}' in bloom for i in range(10000)), 300)
+
+    def test_prune(self):
+        now = timezone.now()
+        for i in range(5):
+            token = OutstandingToken.objects.create(user=self.user, jti=f'expired {i}', token='t',
+                                                    expires_at=now - timedelta(minutes=1))
+            if i % 2:
+                BlacklistedToken.objects.create(token=token)
+        live = OutstandingToken.objects.create(user=self.user, jti='live', token='t', expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=live)
+
+        out = StringIO()
+        call_command('prune_token_blacklist', '--chunk-size=2', stdout=out)
+        self.assertIn('Deleted 5 expired outstanding tokens and 2 blacklisted tokens', out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(BlacklistedToken.objects.get().token_id, live.id)
+
+
+class LoginGateTests(UserTestCase):
+
+    def login(self, password='pass', **extra):
+        return self.client.post(reverse('login'), {'email': 'reader@bloghub.com', 'password': password},
+                                format='json', **extra)
+
+    @override_settings(LOGIN_GATE={'ACCOUNT_FREE_FAILURES': 2})
+    def test_account_backoff_is_checked_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        cache.delete_many(['login_failures_account_' + hashlib.md5(b'reader@bloghub.com').hexdigest() + '_until'])
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(LOGIN_GATE={'IP_FREE_FAILURES': 1})
+    def test_ip_backoff(self):
+        self.client.post(reverse('login'), {'email': 'nobody@bloghub.com', 'password': 'x'}, format='json')
+        self.client.post(reverse('login'), {'email': 'nobody2@bloghub.com', 'password': 'x'}, format='json')
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(LOGIN_GATE={'WORKERS': 1, 'QUEUE_DEPTH': 0, 'RETRY_AFTER': 2})
+    def test_sheds_load_when_the_pool_is_full(self):
+        release = threading.Event()
+        busy = get_hashing_pool(get_login_gate_settings()).submit(release.wait)
+        try:
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '2')
+        finally:
+            release.set()
+            busy.result()
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher',
+                                         'django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+    def test_rehashes_when_the_hasher_changes(self):
+        hasher = PBKDF2PasswordHasher()
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            password=hasher.encode('pass', hasher.salt(), iterations=1000))
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('md5$'))
+        self.assertTrue(self.user.check_password('pass'))
+
+    def test_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.login().status_code, 401)
+
+
+class UserProvisioningTests(UserTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_user(email='admin@bloghub.com', password='pass', user_type='admin')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.admin).access_token}')
+
+    def rows(self, count, prefix='new'):
+        return [{'email': f'{prefix}{i}@Example.com', 'username': f'{prefix}{i}', 'user_type': 'author',
+                 'is_paid': i % 2 == 0} for i in range(count)]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for prefix, count in (('small', 5), ('large', 50)):
+            with self.assertNumQueries(5):
+                response = self.client.post(reverse('provision_users'), self.rows(count, prefix), format='json')
+            self.assertEqual(response.data, {'created': count, 'errors': [], 'duplicates': []})
+        user = CustomUser.objects.get(email='large4@example.com')
+        self.assertEqual((user.user_type, user.profile.is_paid, user.has_usable_password()), ('author', True, False))
+
+    def test_pre_hashed_passwords_and_duplicates(self):
+        rows = [{'email': 'reader@bloghub.com'},
+                {'email': 'hashed@bloghub.com', 'password_hash': make_password('secret')},
+                {'email': 'hashed@bloghub.com'},
+                {'email': 'raw@bloghub.com', 'password': 'secret'},
+                {'email': 'not an email'}]
+        body = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n'
+        response = self.client.post(reverse('provision_users'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['duplicates'], ['hashed@bloghub.com', 'reader@bloghub.com'])
+        self.assertEqual([(error['row'], list(error['errors'])) for error in response.data['errors']],
+                         [(1, ['email']), (3, ['email']), (4, ['password']), (5, ['email']), (6, ['row'])])
+        self.assertTrue(CustomUser.objects.get(email='hashed@bloghub.com').check_password('secret'))
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as handle:
+            json.dump(self.rows(3), handle)
+            handle.flush()
+            out = StringIO()
+            call_command('provision_users', handle.name, '--chunk-size=2', stdout=out)
+        self.assertIn('Created 3 users, rejected 0 rows (0 duplicate emails)', out.getvalue())
+        self.assertEqual(Profile.objects.filter(user__email__startswith='new').count(), 3)
+
+    def test_admin_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(self.client.post(reverse('provision_users'), self.rows(1), format='json').status_code, 403)
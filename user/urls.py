@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import SignupView, LoginView, LogoutView, CustomTokenRefreshView, GetUserInfoView
+from .views import SignupView, LoginView, LogoutView, CustomTokenRefreshView, GetUserInfoView, UserProvisionAPI
 
 urlpatterns = [
     path('signup/', SignupView.as_view(), name='signup'),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
     path('refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     path('userinfo/', GetUserInfoView.as_view(), name='userinfo'),
+    path('provision/', UserProvisionAPI.as_view(), name='provision_users'),
 ]
@@ -1,14 +1,23 @@
+import math
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError
-
-from django.contrib.auth import authenticate
-from .serilalizers import SignupSerializer
+from rest_framework.throttling import BaseThrottle
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password, verify_password
+from blogHub.async_views import AsyncAPIView
+from blogHub.bulk import report_response, rows_from_request
+from .authentication import USER_VERSION_CLAIM, ClaimsRefreshToken
+from .login_gate import LoginBackoff, LoginOverloaded, get_hashing_pool, get_login_gate_settings
+from .permissions import IsAdmin
+from .provisioning import provision_users
+from .serilalizers import ClaimsTokenRefreshSerializer, SignupSerializer
 from django.contrib.auth import get_user_model
 
 UserModel =get_user_model()
@@ -30,27 +39,65 @@ class SignupView(APIView):
     
 
 
-class LoginView(APIView):
-    def post(self, request):
+class LoginView(AsyncAPIView):
+    """
+    Password hashing runs in the bounded pool of user.login_gate: a login
+    storm is answered 503 once the pool's queue is full, and repeated
+    failures back off per account and IP before anything is hashed.
+    """
+
+    async def post(self, request):
         email = request.data.get('email')
         password = request.data.get('password')
 
-        user = authenticate(email = email,
-                            password = password)
-        
-        if user:
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-                'message':"user logged in"
-            }, status= status.HTTP_200_OK)
-        
-        return Response({"error": "Invalid credentials"}, status= status.HTTP_401_UNAUTHORIZED)
+        config = get_login_gate_settings()
+        backoff = LoginBackoff(email, BaseThrottle().get_ident(request), config)
+        wait = await backoff.aretry_after()
+        if wait:
+            return Response({"error": "Too many failed login attempts. Try again later."},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(math.ceil(wait))})
+
+        # Same lookup as ModelBackend
+        user = None
+        if email:
+            user = await UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: email}).afirst()
+
+        pool = get_hashing_pool(config)
+        try:
+            # A missing user still costs one hash, so response times do not reveal accounts
+            is_correct, must_update = await pool.arun(verify_password, password,
+                                                         user.password if user else UNUSABLE_PASSWORD_PREFIX)
+        except LoginOverloaded:
+            return Response({"error": "Too many logins in progress. Try again shortly."},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(config['RETRY_AFTER'])})
+
+        if not (is_correct and user.is_active):
+            await backoff.afailed()
+            return Response({"error": "Invalid credentials"}, status= status.HTTP_401_UNAUTHORIZED)
+
+        await backoff.asucceeded()
+        if must_update:
+            # The hasher or its work factor changed since this password was set
+            try:
+                user.password = await pool.arun(make_password, password)
+                await user.asave(update_fields=['password'])
+            except LoginOverloaded:
+                pass  # Upgraded on a later login
+
+        # user_type and is_paid ride along in the token, see user.authentication. They are
+        # read again after the hash, so a demotion or deactivation meanwhile is not lost.
+        refresh = await sync_to_async(ClaimsRefreshToken.for_user)(user)
+        if USER_VERSION_CLAIM not in refresh:
+            return Response({"error": "Invalid credentials"}, status= status.HTTP_401_UNAUTHORIZED)
+        return Response({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'message':"user logged in"
+        }, status= status.HTTP_200_OK)
 
 
 class CustomTokenRefreshView(TokenRefreshView):
-    pass
+    serializer_class = ClaimsTokenRefreshSerializer
 
 
 class LogoutView(APIView):
@@ -63,7 +110,7 @@ class LogoutView(APIView):
 
         try:
             # Blacklist the refresh token
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
 
             # Flush session data
@@ -79,10 +126,10 @@ class LogoutView(APIView):
 
 
 
-class GetUserInfoView(APIView):
+class GetUserInfoView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    async def get(self, request):
         user = request.user
         return Response({
             "username": user.username,
@@ -93,7 +140,13 @@ class GetUserInfoView(APIView):
 
 
 
+class UserProvisionAPI(APIView):
+    """Bulk creation of accounts as a JSON list or NDJSON (one user per line) by the Admin"""
+    permission_classes = [IsAuthenticated, IsAdmin]
 
-
-
-
+    def post(self, request):
+        rows = rows_from_request(request)
+        if rows is None:
+            return Response({"error": "Expected a list of users or an NDJSON body"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return report_response(provision_users(rows))